@@ -1,101 +1,98 @@
 # -*- coding: utf-8 -*-
+# Importações pesadas (plotly, jinja2) são feitas sob demanda: o Streamlit reexecuta este script a cada
+# interação, e o que não muda entre reruns (templates, classificação) fica em st.cache_resource.
 import streamlit as st
 import pandas as pd
-import io
-import json
 import traceback
 import os
-import locale
-from jinja2 import Environment, FileSystemLoader, select_autoescape # Para renderizar HTML
-import html # Para escapar HTML (usado no template)
-import plotly.express as px # Para gráficos
+import time
+from contextlib import ExitStack
 import streamlit.components.v1 as components # Para exibir HTML
 
-# --- Configurar Locale e Jinja2 Environment ---
 st.set_page_config(page_title="Ranking de FIIs", layout="wide")
 
-LOCALE_CONFIGURED = False
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-    LOCALE_CONFIGURED = True
-except locale.Error:
-    try:
-        locale.setlocale(locale.LC_ALL, 'Portuguese_Brazil') # Fallback para Windows
-        LOCALE_CONFIGURED = True
-    except locale.Error:
-        pass # Fallback manual na formatação
+# --- Templates Jinja2 (ambiente e templates compilados uma vez por processo) ---
+TEMPLATE_FILES = ('fii_template.html', 'fii_template_tabs.html')
+
+@st.cache_resource(show_spinner=False)
+def get_jinja_env():
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+    jinja_env = Environment(loader=FileSystemLoader('.'), autoescape=select_autoescape(['html', 'xml']), auto_reload=False)
+    for name in TEMPLATE_FILES: jinja_env.get_template(name) # Compila agora; get_template depois só consulta o cache
+    return jinja_env
 
-# Configura Jinja2
 try:
-    jinja_env = Environment(
-        loader=FileSystemLoader('.'),
-        autoescape=select_autoescape(['html', 'xml'])
-    )
-    jinja_env.get_template('fii_template.html')
+    jinja_env = get_jinja_env()
     TEMPLATE_LOADED = True
 except Exception as e_jinja:
-    st.error(f"Erro Crítico: Não foi possível carregar o template Jinja2 'fii_template.html'.")
+    st.error(f"Erro Crítico: Não foi possível carregar os templates Jinja2 ('fii_template.html' / 'fii_template_tabs.html').")
     st.error(f"Detalhe: {e_jinja}")
-    TEMPLATE_LOADED = False
-    # st.stop()
+    jinja_env = None; TEMPLATE_LOADED = False
 
 # --- Importar de rank_fiis ---
 try:
-    from rank_fiis import ( fetch_summary_data, process_data, URL_FII_LIST, FII_TYPES_JSON_FILE, carregar_tipos_do_json, SCRIPT_VERSION as RANK_FIIS_VERSION, FII_SEGMENT_DATA )
+    import rank_fiis
+    import fii_http
+    import fii_diff
+    import fii_export
+    import fii_format
+    import fii_ranking
+    import fii_sensitivity
+    import fii_snapshots
+    import fii_service
+    import fii_metrics
     RANK_FIIS_IMPORTED = True
-    carregar_tipos_do_json(FII_TYPES_JSON_FILE)
 except ImportError as e:
     st.error(f"Erro CRÍTICO ao importar 'rank_fiis'. Verifique se 'rank_fiis.py' está na pasta.")
     st.error(f"Path: {os.getcwd()}, Erro: {e}")
     st.stop()
 
+@st.cache_resource(show_spinner=False)
+def carregar_classificacao():
+    # Uma vez por processo; mudanças no fii_types.json são detectadas pelo próprio rank_fiis (mtime) ao preparar o universo
+    return rank_fiis.carregar_tipos_do_json(rank_fiis.FII_TYPES_JSON_FILE)
+
+carregar_classificacao()
+
+# --- Serviço de dados compartilhado ---
+@st.cache_resource(show_spinner=False)
+def get_universe_service():
+    # Um serviço por processo: todas as sessões leem o mesmo universo; atualizações simultâneas viram uma busca só
+    return fii_service.UniverseService().start()
+
+universe_service = get_universe_service()
+
+@st.cache_resource(show_spinner=False)
+def iniciar_api(porta):
+    # API HTTP (fii_api) no mesmo processo, lendo o mesmo serviço: dashboards não disparam outra raspagem
+    import fii_api
+    return fii_api.ApiServer(fii_api.FiiApi(get_universe_service()), port=porta).start()
+
+if os.environ.get('FII_API_PORT'): iniciar_api(int(os.environ['FII_API_PORT'])) # Opcional: FII_API_PORT=8502 streamlit run app.py
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def mudancas_desde_snapshot(_universe, universe_version, data_anterior, filtros, pesos):
+    # Conjunto de mudanças contra o último snapshot de um dia anterior (memoizado por versão do universo + filtros/pesos)
+    anterior = fii_snapshots.read_snapshots(start=data_anterior, end=data_anterior)
+    return fii_diff.diff_snapshots(anterior, rank_fiis.snapshot_frame(_universe), filtros, pesos)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def sensibilidade_pesos(_df, universe_version, filtros, pesos, amostras, variacao):
+    # Estabilidade do ranking sob milhares de vetores de pesos (memoizada por versão do universo + filtros/pesos/opções)
+    return fii_sensitivity.analyze(_df, pesos, amostras, variacao)
+
 # --- Constantes de Texto ---
 DISCLAIMER_TEXT = """**AVISO IMPORTANTE:**\nEste script foi gerado somente para fins de estudo e análise pessoal.\nAs informações apresentadas **NÃO** constituem recomendação de compra ou venda de ativos financeiros.\nEsta é apenas uma ferramenta para auxiliar na sua própria análise e tomada de decisão.\n*Este script não pode ser vendido ou alterado sem autorização prévia dos autores.*\nQualquer dúvida ou sugestão, entre em contato."""
-FOOTER_TEXT = f"""Script feito por Augusto Severo - [@guteco](https://www.instagram.com/guteco) e pela IA do Google.<br>Este trabalho foi carinhosamente pago com a promessa de excelentes pizzas! 🍕 - Versão App: {RANK_FIIS_VERSION} (rank_fiis)"""
+FOOTER_TEXT = f"""Script feito por Augusto Severo - [@guteco](https://www.instagram.com/guteco) e pela IA do Google.<br>Este trabalho foi carinhosamente pago com a promessa de excelentes pizzas! 🍕 - Versão App: {rank_fiis.SCRIPT_VERSION} (rank_fiis)"""
 
 # --- Título e Subtítulo ---
 st.title("🏢 Ranking de Fundos Imobiliários (FIIs)")
 st.markdown("Análise automatizada com dados do [Fundamentus](https://www.fundamentus.com.br/).")
 
-# --- Funções Auxiliares para Formatação ---
-def format_brl(value, decimals=0):
-    if pd.isna(value): return "N/A"
-    try:
-        if LOCALE_CONFIGURED: num_str_locale = f"{float(value):n}";
-        else: raise locale.Error
-        if 'e' not in num_str_locale.lower():
-             if decimals == 0:
-                 if ',' in num_str_locale: return num_str_locale.split(',')[0]
-                 else: return num_str_locale
-             elif decimals > 0:
-                 if ',' not in num_str_locale: return num_str_locale + ',' + '0' * decimals
-                 else:
-                     parts = num_str_locale.split(',')
-                     if len(parts[1]) < decimals: parts[1] = parts[1].ljust(decimals, '0')
-                     elif len(parts[1]) > decimals: parts[1] = parts[1][:decimals]
-                     return parts[0] + ',' + parts[1]
-             return num_str_locale
-        raise locale.Error
-    except (ValueError, TypeError, locale.Error):
-         try:
-             if decimals == 0: formatted_int = "{:,.0f}".format(float(value)).replace(',', '#').replace('.', ',').replace('#', '.'); return formatted_int
-             else: formatted_float = "{:,.{prec}f}".format(float(value), prec=decimals).replace(',', '#').replace('.', ',').replace('#', '.'); return formatted_float
-         except: return str(value)
-
-def format_brl_cotacao(value):
-    return format_brl(value, decimals=2)
-
-def format_percent(value):
-    if pd.isna(value): return "N/A"
-    try: return f"{float(value) * 100:.2f}".replace('.', ',') + "%"
-    except (ValueError, TypeError): return str(value)
-# --- Fim Funções Formatação ---
-
 # --- Sidebar com Filtros E Pesos ---
 with st.sidebar:
     st.header("🔍 Filtros Principais")
-    try: from rank_fiis import MIN_PVP as DEFAULT_MIN_PVP, MAX_PVP as DEFAULT_MAX_PVP, MIN_DY as DEFAULT_MIN_DY, MAX_DY as DEFAULT_MAX_DY, MIN_LIQUIDEZ as DEFAULT_MIN_LIQ
-    except ImportError: DEFAULT_MIN_PVP=0.7; DEFAULT_MAX_PVP=1.05; DEFAULT_MIN_DY=0.08; DEFAULT_MAX_DY=0.135; DEFAULT_MIN_LIQ=400000; st.warning("Constantes de filtro padrão não encontradas.", icon="⚠️")
+    DEFAULT_MIN_PVP = rank_fiis.MIN_PVP; DEFAULT_MAX_PVP = rank_fiis.MAX_PVP; DEFAULT_MIN_DY = rank_fiis.MIN_DY; DEFAULT_MAX_DY = rank_fiis.MAX_DY; DEFAULT_MIN_LIQ = rank_fiis.MIN_LIQUIDEZ
     DEFAULT_MIN_DY_PERCENT = DEFAULT_MIN_DY * 100; DEFAULT_MAX_DY_PERCENT = DEFAULT_MAX_DY * 100
 
     min_pvp = st.slider("P/VP mínimo", 0.0, 2.5, DEFAULT_MIN_PVP, 0.01, key="min_pvp", help="Preço/Valor Patrimonial mínimo.")
@@ -108,7 +105,7 @@ with st.sidebar:
     if min_dy_percent > max_dy_percent: st.warning("DY mínimo > DY máximo.")
 
     st.write("") # Espaço
-    atualizar = st.button("🔄 Atualizar Ranking e Score", help="Buscar dados e calcular score com os pesos definidos.")
+    atualizar = st.button("🔄 Atualizar Ranking e Score", help="Buscar dados do Fundamentus. Filtros e pesos são aplicados na hora sobre os dados já carregados.")
     st.write("") # Espaço
 
     st.divider()
@@ -118,151 +115,189 @@ with st.sidebar:
     peso_dy = st.slider("Peso DY (Maior é Melhor)", 0, 10, 10, key="peso_dy", help="Importância dada a um Dividend Yield alto.")
     peso_liq = st.slider("Peso Liquidez (Maior é Melhor)", 0, 10, 3, key="peso_liq", help="Importância dada à liquidez diária.")
     peso_vac = st.slider("Peso Vacância (Menor é Melhor)", 0, 10, 2, key="peso_vac", help="Importância dada a uma baixa taxa de vacância.")
+
+    st.divider()
+    tabela_unica = st.toggle("Tabela única (abas no navegador)", value=True, key="tabela_unica", help="Envia os dados uma única vez; abas por segmento, ordenação e paginação acontecem no navegador. Desligue para o modo antigo (uma tabela renderizada por aba).")
+    modo_paginado = st.toggle("Modo Top N (paginado)", value=False, key="modo_paginado", help="Seleciona só os N melhores pelo score (seleção parcial), formata/renderiza apenas a página visível e busca detalhes apenas dos FIIs exibidos. Útil com filtros amplos.")
+    if modo_paginado:
+        top_n = st.number_input("Top N (0 = todos os filtrados)", min_value=0, max_value=5000, value=100, step=10, key="top_n")
+        tamanho_pagina = st.selectbox("FIIs por página", [10, 25, 50, 100], index=1, key="tamanho_pagina")
+    modo_sensibilidade = st.toggle("🎲 Sensibilidade aos pesos", value=False, key="modo_sensibilidade", help="Avalia milhares de combinações de pesos de uma vez e mostra, por FII, a distribuição da posição, a frequência no Top 10 e a volatilidade da posição.")
+    if modo_sensibilidade:
+        amostras_sensibilidade = st.selectbox("Combinações de pesos", [1000, 10000, 50000], index=1, key="amostras_sensibilidade", format_func=lambda n: f"{n:_}".replace('_', '.'))
+        variacao_sensibilidade = st.select_slider("Variação dos pesos", options=[1, 2, 3, 0], value=fii_sensitivity.DEFAULT_SPREAD, key="variacao_sensibilidade", format_func=lambda v: f"±{v} em torno dos atuais" if v else "Qualquer (0–10)") # 0 = pesos sorteados na faixa toda
+    modo_debug = st.toggle("🛠️ Painel de debug", value=False, key="modo_debug", help="Mostra tempo por estágio, latência das requisições e bytes baixados (métricas do processo).")
+    perfilar = st.selectbox("Perfilar esta execução", ["Não", "cProfile", "pyinstrument"], key="perfilar", help="Roda esta execução sob um profiler e mostra o relatório no painel de debug.") if modo_debug else "Não"
 # --- Fim Sidebar ---
 
+# Perfilamento opcional (uma execução do script): fechado antes do painel de debug
+profiling = ExitStack()
+profile_result = profiling.enter_context(fii_metrics.profile_run(perfilar.lower())) if perfilar != "Não" else None
+
 # --- Lógica Principal e Exibição ---
 df_original_num = pd.DataFrame()
 show_help_footer_disclaimer = True
 
 if atualizar:
-    with st.spinner("Buscando e processando dados... ⏳"):
-        prog_bar = st.progress(0, text="Iniciando...")
-        df = None
-        error_occurred = False; error_message = ""
+    # Estágio 1 (rede): o botão pede uma atualização ao serviço compartilhado (single-flight; dado com menos de
+    # MIN_REFRESH_INTERVAL s é reaproveitado); filtros/pesos trabalham sobre o universo em memória
+    with st.spinner("Buscando dados de resumo... ⏳"):
         try:
-            import rank_fiis # Reimporta
-            prog_bar.progress(5, text="Configurando filtros...")
-            rank_fiis.MIN_PVP = min_pvp; rank_fiis.MAX_PVP = max_pvp
-            rank_fiis.MIN_DY = min_dy_percent / 100.0; rank_fiis.MAX_DY = max_dy_percent / 100.0
-            rank_fiis.MIN_LIQUIDEZ = min_liq
-
-            prog_bar.progress(15, text="Buscando dados de resumo...")
-            df_raw = fetch_summary_data(URL_FII_LIST)
-            prog_bar.progress(30, text="Processando dados e buscando detalhes...")
-            df = process_data(df_raw)
-            prog_bar.progress(90, text="Finalizando processamento...")
-
+            refreshed = universe_service.refresh(wait=True, min_interval=fii_service.MIN_REFRESH_INTERVAL)
+            if refreshed is None: st.error("Não foi possível obter os dados de resumo do Fundamentus.", icon="❌")
+            else: st.session_state['fii_universe_loaded'] = True
         except Exception as e:
-            error_occurred = True; error_message = f"Erro durante execução: {e}"
-            st.error(error_message, icon="❌"); st.code(traceback.format_exc())
-        finally:
-            prog_bar.progress(100, text="Concluído!"); prog_bar.empty()
-
-    if not error_occurred and df is not None:
+            st.error(f"Erro durante execução: {e}", icon="❌"); st.code(traceback.format_exc())
+
+# Detalhes só para tickers nunca vistos; a barra conta páginas realmente concluídas
+# (inclusive as já em memória) e os bytes efetivamente baixados
+def buscar_detalhes_com_progresso(papeis):
+    pendentes = rank_fiis.missing_details(papeis)
+    if not pendentes: return
+    total_detalhes = pd.Series(papeis).nunique(); ja_prontos = total_detalhes - len(pendentes)
+    bytes_inicio = fii_metrics.METRICS.downloaded_bytes()
+    prog_bar = st.progress(ja_prontos / total_detalhes, text=f"Buscando detalhes de {len(pendentes)} FIIs...")
+    def atualizar_progresso(done, total):
+        baixados = fii_metrics.METRICS.downloaded_bytes() - bytes_inicio
+        prog_bar.progress((ja_prontos + done) / total_detalhes, text=f"Detalhes {ja_prontos + done}/{total_detalhes} · {baixados / 1024:.0f} KB baixados")
+    rank_fiis.fetch_missing_details(pendentes, progress_callback=atualizar_progresso)
+    prog_bar.empty()
+
+def com_detalhes(frame):
+    # Modo paginado: detalhes só dos FIIs deste recorte (busca apenas os que faltam), preservando o score
+    buscar_detalhes_com_progresso(frame['Papel'].tolist())
+    return rank_fiis.order_columns(rank_fiis.attach_details(frame, fetch_missing=False)).assign(**{fii_ranking.SCORE_COLUMN: frame[fii_ranking.SCORE_COLUMN]})
+
+# Leitura sem bloqueio: dado vencido é servido enquanto o serviço atualiza em segundo plano
+universe, universe_timestamp, universe_version = universe_service.snapshot() if st.session_state.get('fii_universe_loaded') else (None, None, None)
+if universe is not None:
+    df = None
+    try:
+        # Estágio 2 (sem rede): filtro + ranks vetorizados sobre o universo memoizado
+        df = rank_fiis.filter_and_rank(universe, min_pvp, max_pvp, min_dy_percent / 100.0, max_dy_percent / 100.0, min_liq)
+        if df is not None and not df.empty and not modo_paginado:
+            buscar_detalhes_com_progresso(df['Papel'])
+            df = rank_fiis.order_columns(rank_fiis.attach_details(df, fetch_missing=False))
+    except Exception as e:
+        df = None; st.error(f"Erro durante execução: {e}", icon="❌"); st.code(traceback.format_exc())
+
+    if df is not None:
         if not df.empty:
             st.success(f"{len(df)} FIIs encontrados após filtragem inicial.", icon="✅")
-            df_original_num = df.copy()
-
-            # CALCULAR SCORE PERSONALIZADO
-            df_original_num['Score_Ponderado'] = 0
-            max_rank = len(df_original_num) + 1
-            if peso_pvp > 0 and 'Rank_PVP' in df_original_num.columns: df_original_num['Score_Ponderado'] += peso_pvp * df_original_num['Rank_PVP'].fillna(max_rank)
-            if peso_dy > 0 and 'Rank_DY' in df_original_num.columns: df_original_num['Score_Ponderado'] += peso_dy * df_original_num['Rank_DY'].fillna(max_rank)
-            if peso_liq > 0 and 'Rank_Liquidez' in df_original_num.columns: df_original_num['Score_Ponderado'] += peso_liq * df_original_num['Rank_Liquidez'].fillna(max_rank)
-            if peso_vac > 0 and 'Rank_Vacancia' in df_original_num.columns: df_original_num['Score_Ponderado'] += peso_vac * df_original_num['Rank_Vacancia'].fillna(max_rank)
-            df_original_num['Score_Ponderado'] = df_original_num['Score_Ponderado'].astype('Int64')
-
-            # ORDENAR PELO SCORE
-            df_original_num.sort_values(by='Score_Ponderado', ascending=True, inplace=True, na_position='last')
-
-            df_display = df_original_num.copy()
-
-            # Adicionar/Verificar colunas Tipo e Segmento
-            if 'Tipo' not in df_display.columns:
-                 if FII_SEGMENT_DATA: df_display['Tipo'] = df_display['Papel'].apply(lambda x: FII_SEGMENT_DATA.get(str(x), {}).get('tipo', 'Indefinido'))
-                 else: df_display['Tipo'] = 'Indefinido'
-            if 'Segmento' not in df_display.columns:
-                if FII_SEGMENT_DATA: df_display['Segmento'] = df_display['Papel'].apply(lambda x: FII_SEGMENT_DATA.get(str(x), {}).get('segmento_original', 'Não Classificado'))
-                else: df_display['Segmento'] = 'Não Classificado'
-            if 'Segmento' not in df_display.columns: df_display['Segmento'] = 'Não Classificado'
-
-            # AGREGAÇÃO DE SEGMENTOS
-            segmento_industrial = "Imóveis Industriais e Logísticos"; segmento_logistica = "Logística"; segmentos_a_unir = [segmento_industrial, segmento_logistica]
-            if any(seg in df_display['Segmento'].unique() for seg in segmentos_a_unir):
-                replace_map = {seg: segmento_logistica for seg in segmentos_a_unir}
-                df_display['Segmento'] = df_display['Segmento'].replace(replace_map)
-                if 'Segmento' in df_original_num.columns: df_original_num['Segmento'] = df_original_num['Segmento'].replace(replace_map)
-
-            # PREPARAÇÃO DE DADOS PARA O TEMPLATE JINJA2
-            data_for_template = []
-            cols_for_render = ['Papel', 'URL Detalhes', 'Segmento', 'Tipo', 'Cotação', 'Dividend Yield', 'P/VP', 'Liquidez', 'FFO Yield', 'Valor de Mercado', 'Qtd de imóveis', 'Vacância Média', 'Osc. Dia', 'Osc. Mês', 'Osc. 12 Meses', 'Data Último Relatório', 'Link Download Relatório', 'Link Documentos FNET']
-            cols_present = [col for col in cols_for_render if col in df_display.columns]
-            df_subset = df_display[cols_present]
-
-            for idx, row in df_subset.iterrows():
-                fii_data = {}
-                for col in cols_present: fii_data[col] = row[col]
-                # Formatação
-                fii_data['Cotação_fmt'] = "R$ " + format_brl_cotacao(fii_data.get('Cotação'))
-                fii_data['DY_fmt'] = format_percent(fii_data.get('Dividend Yield'))
-                fii_data['PVP_fmt'] = f"{fii_data.get('P/VP'):.2f}".replace('.', ',') if pd.notna(fii_data.get('P/VP')) else "N/A"
-                fii_data['Liquidez_fmt'] = "R$ " + format_brl(fii_data.get('Liquidez'), decimals=0)
-                fii_data['FFOYield_fmt'] = format_percent(fii_data.get('FFO Yield'))
-                fii_data['ValorMercado_fmt'] = "R$ " + format_brl(fii_data.get('Valor de Mercado'), decimals=0)
-                fii_data['QtdImoveis_fmt'] = format_brl(fii_data.get('Qtd de imóveis'), decimals=0) if pd.notna(fii_data.get('Qtd de imóveis')) else "N/A"
-                fii_data['Vacancia_fmt'] = format_percent(fii_data.get('Vacância Média'))
-                fii_data['OscDia_fmt'] = format_percent(fii_data.get('Osc. Dia'))
-                fii_data['OscMes_fmt'] = format_percent(fii_data.get('Osc. Mês'))
-                fii_data['Osc12M_fmt'] = format_percent(fii_data.get('Osc. 12 Meses'))
-                fii_data['Segmento'] = fii_data.get('Segmento', 'N/A')
-                fii_data['Tipo'] = fii_data.get('Tipo', 'N/A')
-                fii_data['Data Último Relatório'] = fii_data.get('Data Último Relatório', 'N/A')
-                fii_data['Link Download Relatório'] = fii_data.get('Link Download Relatório')
-                fii_data['Link_FNET'] = fii_data.get('Link Documentos FNET')
-                data_for_template.append(fii_data)
+            service_status = universe_service.status()
+            st.caption(f"Dados de {time.strftime('%d/%m/%Y %H:%M', time.localtime(universe_timestamp))} (atualizados automaticamente a cada {fii_service.REFRESH_INTERVAL // 60} min)" + (" · atualizando em segundo plano..." if service_status['refreshing'] else ""))
+            cache_stats = fii_http.cache_stats()
+            if cache_stats: st.caption(f"Cache HTTP: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['revalidated']} revalidados (304) · {cache_stats['entries']} páginas em disco ({cache_stats['bytes'] / 1024:.0f} KB).")
+            # SCORE PERSONALIZADO + ORDENAÇÃO: motor de ranking memoizado por (versão do universo, filtros), sem rehash a cada rerun;
+            # mudar pesos = produto matriz-vetor + argsort (permutação em cache por vetor de pesos)
+            ranking_engine = fii_ranking.get_engine(df, key=(universe_version, min_pvp, max_pvp, min_dy_percent, max_dy_percent, min_liq)); pesos = (peso_pvp, peso_dy, peso_liq, peso_vac)
+            if modo_paginado:
+                # Top N por seleção parcial (argpartition) e só a página visível formatada/renderizada, com
+                # detalhes buscados apenas para os FIIs dela. Gráficos/exportação usam o Top N (sem formatar).
+                limite = int(top_n) or None; total_paginado = ranking_engine.n if limite is None else min(limite, ranking_engine.n)
+                n_paginas = max(1, -(-total_paginado // tamanho_pagina))
+                st.session_state.setdefault('pagina', 1) # Valor só pela Session State (sem value= no widget)
+                if st.session_state['pagina'] > n_paginas: st.session_state['pagina'] = n_paginas # Filtros mudaram: página além do fim
+                col_pagina, col_info_pagina = st.columns([1, 3])
+                pagina = col_pagina.number_input("Página", min_value=1, max_value=n_paginas, step=1, key="pagina")
+                with fii_metrics.stage('ranking'):
+                    df_pagina, total_paginado = ranking_engine.ranked_page(df, pesos, pagina - 1, tamanho_pagina, top_n=limite)
+                    df_original_num = ranking_engine.ranked_frame(df, pesos, top_n=limite)
+                inicio = (pagina - 1) * tamanho_pagina
+                col_info_pagina.caption(f"Página {pagina}/{n_paginas}: posições {inicio + 1}–{inicio + len(df_pagina)} de {total_paginado}" + (f" (Top {limite} de {len(df)} filtrados)" if limite and limite < len(df) else ""))
+                df_display = com_detalhes(df_pagina)
+            else:
+                with fii_metrics.stage('ranking'): df_original_num = ranking_engine.ranked_frame(df, pesos)
+                df_display = df_original_num # Só leitura daqui em diante: sem cópia defensiva
+            data_anterior = fii_snapshots.latest_snapshot_date(before=time.strftime('%Y-%m-%d'))
+            if data_anterior is not None:
+                mudancas = mudancas_desde_snapshot(universe, universe_version, data_anterior, (min_pvp, max_pvp, min_dy_percent / 100.0, max_dy_percent / 100.0, min_liq), pesos)
+                resumo_mudancas = fii_diff.summarize(mudancas)
+                with st.expander(f"🔔 Mudanças desde {data_anterior:%d/%m/%Y}: {resumo_mudancas.get('entraram', 0)} entraram, {resumo_mudancas.get('sairam', 0)} saíram, {resumo_mudancas.get('saltos', 0)} saltos no ranking, {resumo_mudancas.get('novos_relatorios', 0)} relatórios novos"):
+                    col_m1, col_m2 = st.columns(2)
+                    with col_m1:
+                        if mudancas.get('entraram'): st.markdown("**Entraram no filtro**"); st.dataframe(pd.DataFrame(mudancas['entraram']).rename(columns={'posicao': 'Posição'}), hide_index=True, use_container_width=True)
+                        if mudancas.get('sairam'): st.markdown("**Saíram do filtro**"); st.dataframe(pd.DataFrame(mudancas['sairam']).rename(columns={'posicao_anterior': 'Posição anterior'}), hide_index=True, use_container_width=True)
+                        if mudancas.get('saltos'): st.markdown(f"**Saltos no ranking** (≥ {fii_diff.RANK_JUMP_MIN} posições; + = subiu)"); st.dataframe(pd.DataFrame(mudancas['saltos']).rename(columns={'antes': 'Antes', 'depois': 'Depois', 'delta': 'Variação'}), hide_index=True, use_container_width=True)
+                    with col_m2:
+                        if mudancas.get('variacoes'): st.markdown("**Variações de DY / P/VP**"); st.dataframe(pd.DataFrame(mudancas['variacoes']).rename(columns={'campo': 'Indicador', 'antes': 'Antes', 'depois': 'Depois', 'delta': 'Variação'}), hide_index=True, use_container_width=True)
+                        if mudancas.get('novos_relatorios'): st.markdown("**Relatórios novos**"); st.dataframe(pd.DataFrame(mudancas['novos_relatorios']).rename(columns={'antes': 'Anterior', 'depois': 'Novo'}), hide_index=True, use_container_width=True)
+                    st.caption(f"{resumo_mudancas['alterados']} FIIs com dados do resumo alterados, {resumo_mudancas['novos']} novos e {resumo_mudancas['removidos']} removidos do Fundamentus.")
+            if modo_sensibilidade:
+                try: estabilidade, info_estabilidade = sensibilidade_pesos(df, universe_version, (min_pvp, max_pvp, min_dy_percent / 100.0, max_dy_percent / 100.0, min_liq), pesos, amostras_sensibilidade, variacao_sensibilidade or None)
+                except ValueError as e: st.info(str(e), icon="🎲")
+                else:
+                    top_k = fii_sensitivity.TOP_K; freq_col = f"Freq. Top {top_k}"; nucleo = fii_sensitivity.top_k_stability(estabilidade)
+                    with st.expander(f"🎲 Estabilidade do ranking: {nucleo['sempre']} FIIs no Top {top_k} em todas as combinações, {nucleo['alguma_vez']} em alguma", expanded=True):
+                        st.caption(f"{info_estabilidade['amostras']:_} combinações de pesos".replace('_', '.') + (f" (cada peso ±{variacao_sensibilidade} em torno dos atuais, limitado a 0–10)" if variacao_sensibilidade else " (pesos sorteados entre 0 e 10)") + f" × {info_estabilidade['fiis']} FIIs em {info_estabilidade['segundos']:.2f} s. Posições: 1 = melhor; P5–P95 = faixa da posição em 90% das combinações.")
+                        st.dataframe(estabilidade.head(50).assign(**{freq_col: estabilidade[freq_col].head(50) * 100}), hide_index=True, use_container_width=True,
+                                     column_config={freq_col: st.column_config.ProgressColumn(freq_col, min_value=0, max_value=100, format="%.0f%%"), 'Volatilidade': st.column_config.NumberColumn('Volatilidade', format="%.1f", help="Desvio-padrão da posição entre as combinações")})
+
+            falhas_detalhes = rank_fiis.detail_failures(df_display['Papel'])
+            if falhas_detalhes: st.warning(f"Detalhes indisponíveis para {len(falhas_detalhes)} FIIs ({', '.join(sorted(falhas_detalhes)[:8])}{'...' if len(falhas_detalhes) > 8 else ''}): falha temporária no Fundamentus. Serão buscados de novo na próxima atualização.", icon="⚠️")
 
             # --- Exibição da Tabela HTML ---
             segmentos_brutos = sorted(df_display['Segmento'].dropna().unique()) if 'Segmento' in df_display.columns else []
             segmentos_ordenados = sorted([s for s in segmentos_brutos if s != 'Outros' and s != 'Não Classificado']);
             if 'Não Classificado' in segmentos_brutos: segmentos_ordenados.append('Não Classificado')
             if 'Outros' in segmentos_brutos: segmentos_ordenados.append('Outros')
-            table_height = min(max(len(data_for_template) * 38 + 60, 250), 700)
-
-            if len(segmentos_ordenados) > 0 and TEMPLATE_LOADED:
-                st.write("---"); st.subheader("Resultados por Segmento")
-                tabs = st.tabs(["🏆 Todos"] + segmentos_ordenados)
-                template = jinja_env.get_template('fii_template.html')
-                with tabs[0]:
-                    html_table = template.render(fiis=data_for_template)
-                    components.html(html_table, height=table_height, scrolling=True)
-                for i, seg in enumerate(segmentos_ordenados):
-                    with tabs[i+1]:
-                        data_seg = [fii for fii in data_for_template if fii.get('Segmento') == seg]
-                        html_table_seg = template.render(fiis=data_seg)
-                        seg_table_height = min(max(len(data_seg) * 38 + 60, 200), 700)
-                        components.html(html_table_seg, height=seg_table_height, scrolling=True)
-            elif TEMPLATE_LOADED:
-                st.write("---"); st.subheader("Resultados")
-                template = jinja_env.get_template('fii_template.html')
-                html_table = template.render(fiis=data_for_template);
-                components.html(html_table, height=table_height, scrolling=True)
-            elif not TEMPLATE_LOADED:
+
+            if not TEMPLATE_LOADED:
                  st.error("Template HTML não carregado. Não é possível exibir a tabela.")
+            elif tabela_unica:
+                # Renderização única: linhas serializadas uma vez em JSON; abas/ordenação/paginação no cliente
+                st.write("---"); st.subheader("Resultados por Segmento" if segmentos_ordenados else "Resultados")
+                with fii_metrics.stage('formatacao'): payload = fii_format.build_table_payload(df_display, segmentos_ordenados, page_size=tamanho_pagina if modo_paginado else fii_format.PAYLOAD_PAGE_SIZE)
+                visible_rows = min(len(df_display), payload['pageSize'])
+                table_height = min(max(visible_rows * 38 + 130, 280), 800)
+                with fii_metrics.stage('render'):
+                    html_table = jinja_env.get_template('fii_template_tabs.html').render(payload=payload)
+                    components.html(html_table, height=table_height, scrolling=True)
+            else:
+                # Modo antigo: uma renderização (e um iframe) por aba
+                # PREPARAÇÃO DE DADOS PARA O TEMPLATE JINJA2 (colunas *_fmt formatadas por coluna inteira)
+                with fii_metrics.stage('formatacao'): data_for_template = fii_format.build_template_records(df_display)
+                table_height = min(max(len(data_for_template) * 38 + 60, 250), 700)
+                template = jinja_env.get_template('fii_template.html'); render_start = time.perf_counter()
+                if len(segmentos_ordenados) > 0:
+                    st.write("---"); st.subheader("Resultados por Segmento")
+                    tabs = st.tabs(["🏆 Todos"] + segmentos_ordenados)
+                    with tabs[0]:
+                        html_table = template.render(fiis=data_for_template)
+                        components.html(html_table, height=table_height, scrolling=True)
+                    for i, seg in enumerate(segmentos_ordenados):
+                        with tabs[i+1]:
+                            data_seg = [fii for fii in data_for_template if fii.get('Segmento') == seg]
+                            html_table_seg = template.render(fiis=data_seg)
+                            seg_table_height = min(max(len(data_seg) * 38 + 60, 200), 700)
+                            components.html(html_table_seg, height=seg_table_height, scrolling=True)
+                else:
+                    st.write("---"); st.subheader("Resultados")
+                    html_table = template.render(fiis=data_for_template);
+                    components.html(html_table, height=table_height, scrolling=True)
+                fii_metrics.METRICS.add_stage('render', time.perf_counter() - render_start)
             # --- Fim Exibição Tabela HTML ---
 
-            # --- Download Excel MOVIDO PARA CÁ ---
+            # --- Exportação (gerada só quando pedida; bytes em cache por hash de dados + pesos) ---
             st.write("") # Adiciona um pequeno espaço vertical
-            output = io.BytesIO();
-            cols_to_drop_excel = ['URL Detalhes']
-            df_excel = df_original_num.drop(columns=[col for col in cols_to_drop_excel if col in df_original_num.columns], errors='ignore')
-            df_excel.rename(columns={ 'Rank_PVP': 'Rank P/VP (Menor Melhor)', 'Rank_DY': 'Rank DY (Maior Melhor)', 'Rank_Liquidez': 'Rank Liquidez (Maior Melhor)', 'Rank_Vacancia': 'Rank Vacancia (Menor Melhor)', 'Score_Ponderado': 'Score Personalizado (Menor Melhor)' }, inplace=True)
-            try:
-                # --- Bloco de Geração do Excel CORRIGIDO --- <--- CORREÇÃO INDENTAÇÃO
-                with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                    df_excel.to_excel(writer, index=False, sheet_name='Ranking FIIs')
-                # Agora `output` contém os dados do Excel
-                st.download_button(
-                    label="📥 Baixar Tabela Completa (Excel)",
-                    data=output.getvalue(), # Pega os bytes do buffer após salvar
-                    file_name="ranking_fiis_completo.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            df_export = fii_export.export_frame(df_original_num, drop=['URL Detalhes'])
+            export_key = fii_export.fingerprint(df_export, pesos)
+            col_formato, col_exportar = st.columns([1, 2])
+            formato = col_formato.selectbox("Formato", list(fii_export.EXPORT_FORMATS), format_func=lambda f: fii_export.EXPORT_FORMATS[f]['label'], key="formato_exportacao", label_visibility="collapsed")
+            export_data = fii_export.cached_export(export_key, formato)
+            if export_data is None and col_exportar.button(f"⚙️ Gerar arquivo {fii_export.EXPORT_FORMATS[formato]['label']}", key="gerar_exportacao"):
+                try:
+                    if modo_paginado: df_export = fii_export.export_frame(com_detalhes(df_original_num), drop=['URL Detalhes']) # Detalhes do Top N só ao exportar
+                    with fii_metrics.stage('exportacao'): export_data = fii_export.export_bytes(df_export, formato, key=export_key)
+                except Exception as e: st.error(f"Erro ao gerar arquivo {formato}: {e}", icon="❌")
+            if export_data is not None:
+                col_exportar.download_button(
+                    label=f"📥 Baixar Tabela Completa ({fii_export.EXPORT_FORMATS[formato]['label']})",
+                    data=export_data, file_name=f"ranking_fiis_completo.{formato}",
+                    mime=fii_export.EXPORT_FORMATS[formato]['mime'],
                     key="download_excel_button_main" # Chave única
                 )
-                # --- Fim Bloco Corrigido ---
-
-            except Exception as e:
-                st.error(f"Erro ao gerar Excel: {e}", icon="❌")
-            # --- Fim Download Excel ---
+            # --- Fim Exportação ---
 
             # --- SEÇÃO DE GRÁFICOS ---
             st.write("---"); st.subheader("📊 Visualizações Gráficas") # Divisor antes dos gráficos
@@ -271,7 +306,7 @@ if atualizar:
                 with col1:
                     st.markdown("##### Distribuição por Segmento")
                     if 'Segmento' in df_original_num.columns:
-                        segment_counts = df_original_num['Segmento'].value_counts()
+                        segment_counts = df_original_num['Segmento'].value_counts(); segment_counts = segment_counts[segment_counts > 0] # Categórico: sem categorias vazias
                         if not segment_counts.empty: st.bar_chart(segment_counts)
                         else: st.caption("Sem dados de segmento.")
                     else: st.caption("Coluna 'Segmento' ausente.")
@@ -282,6 +317,7 @@ if atualizar:
                         df_scatter = df_original_num.dropna(subset=['P/VP', 'Dividend Yield']).copy()
                         if not df_scatter.empty:
                             df_scatter['DY_Percent'] = df_scatter['Dividend Yield'] * 100
+                            import plotly.express as px # Sob demanda: só quando há gráfico a exibir
                             fig = px.scatter(df_scatter, x='P/VP', y='DY_Percent', color='Segmento', hover_name='Papel', hover_data={'Segmento': True, 'DY_Percent': ':.2f%', 'P/VP': ':.2f'}, labels={'DY_Percent': 'Dividend Yield (%)', 'P/VP': 'P/VP'})
                             fig.update_layout(yaxis_tickformat='.0f%', legend_title_text='Segmento', margin=dict(l=20, r=20, t=30, b=20))
                             st.plotly_chart(fig, use_container_width=True)
@@ -297,6 +333,34 @@ else:
     st.info("⬅️ Configure filtros e pesos na barra lateral, depois clique '🔄 Atualizar'.", icon="💡");
     show_help_footer_disclaimer = True
 
+# --- Painel de Debug (métricas do processo + perfil desta execução) ---
+profiling.close()
+if modo_debug:
+    st.divider(); st.subheader("🛠️ Debug")
+    metricas = fii_metrics.METRICS.to_dict(); req = metricas['requests']
+    st.caption(f"Métricas acumuladas desde {time.strftime('%d/%m/%Y %H:%M:%S', time.localtime(metricas['since']))} (todas as sessões deste processo).")
+    col_a, col_b, col_c, col_d = st.columns(4)
+    col_a.metric("Requisições (rede)", req['network']); col_b.metric("Servidas do cache", req['cached'])
+    col_c.metric("Baixado", f"{req['bytes'] / 1024:.0f} KB"); col_d.metric("Latência média", f"{req['mean_latency'] * 1000:.0f} ms" if req['mean_latency'] else "—")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("##### Tempo por estágio")
+        if metricas['stages']: st.dataframe(pd.DataFrame.from_dict(metricas['stages'], orient='index').rename(columns={'calls': 'chamadas', 'seconds': 'total (s)', 'max': 'máx (s)', 'items': 'itens'}), use_container_width=True)
+        else: st.caption("Nenhum estágio medido ainda.")
+    with col2:
+        st.markdown("##### Latência das requisições")
+        if req['network']: st.bar_chart(pd.Series(req['latency_histogram'], name='requisições'))
+        else: st.caption("Nenhuma requisição de rede ainda.")
+    st.caption(f"Serviço de dados: {universe_service.status()}")
+    st.caption(f"Circuitos HTTP: {fii_http.breaker_states() or 'nenhum host contatado'} · eventos: {metricas['counters'] or 'nenhum'}")
+    col_json, col_reset = st.columns(2)
+    col_json.download_button("📥 Exportar métricas (JSON)", data=fii_metrics.METRICS.to_json(), file_name="metricas_fiis.json", mime="application/json", key="download_metricas")
+    if col_reset.button("Zerar métricas", key="zerar_metricas"): fii_metrics.METRICS.reset(); st.rerun()
+    if profile_result is not None and profile_result.text:
+        with st.expander(f"Perfil desta execução ({profile_result.backend}, {profile_result.seconds:.2f} s)"):
+            st.code(profile_result.text, language=None)
+            if profile_result.html: st.download_button("📥 Relatório HTML (pyinstrument)", data=profile_result.html, file_name="perfil_fiis.html", mime="text/html", key="download_perfil")
+
 # --- Seção de Ajuda Expansível, Disclaimer e Footer ---
 if show_help_footer_disclaimer:
     st.divider()
@@ -309,7 +373,7 @@ if show_help_footer_disclaimer:
 
 **Score Personalizado e Filtros:**
 *   Use os **filtros** na barra lateral para definir os critérios mínimos e máximos (P/VP, DY, Liquidez) que um FII deve atender para aparecer na lista.
-*   Clique **"🔄 Atualizar Ranking e Score"** para buscar os dados e aplicar os filtros.
+*   Clique **"🔄 Atualizar Ranking e Score"** para buscar os dados. Depois disso, mudanças nos filtros e pesos são aplicadas na hora, sem nova busca (só FIIs ainda não vistos têm os detalhes buscados).
 *   Use os **pesos** na barra lateral para definir a importância de cada indicador no cálculo do **Score Personalizado**.
 *   A tabela é ordenada pelo **Score Personalizado (menor = melhor)**.
 *   ⚠️ **ESSENCIAL:** O score é uma ferramenta **quantitativa**. **Sempre leia os relatórios gerenciais** e faça sua própria análise.
@@ -329,9 +393,9 @@ if show_help_footer_disclaimer:
 1.  Ajuste os **Filtros Principais**.
 2.  Clique **"🔄 Atualizar Ranking e Score"**.
 3.  Ajuste os **Pesos do Score** (o score recalcula na tabela exibida).
-4.  Navegue pelos resultados na tabela (use abas para ver por segmento).
+4.  Navegue pelos resultados na tabela (use abas para ver por segmento; clique no cabeçalho para ordenar).
 5.  Use os links nas colunas **Papel**, **Relatório**, **Docs FNET**.
-6.  Baixe a tabela completa clicando no botão **"📥 Baixar Tabela Completa (Excel)"** abaixo da tabela.
+6.  Para exportar, escolha o formato abaixo da tabela (**Excel**, **CSV** ou **Parquet**), clique em **"⚙️ Gerar arquivo"** e depois em **"📥 Baixar Tabela Completa"** (o arquivo só é gerado quando pedido; no modo paginado inclui o Top N).
 
 **Limitações:**
 *   Estudo, **não** recomendação. Dados dependem do Fundamentus/JSON. Performance pode variar. Faça sua Due Diligence.
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Teste de carga da API local (fii_api) com o universo vindo do servidor que simula o Fundamentus: C clientes
+# keep-alive disparando uma mistura de /ranking (consultas equivalentes escritas de formas diferentes), /fii/{papel}
+# e /universe, metade delas condicionais (If-None-Match). Compara memoização ligada x desligada e confere que a
+# carga não gera nenhuma requisição ao Fundamentus.
+# Uso: python benchmarks/bench_api.py [--clientes 16] [--segundos 5] [--workers 16] [--universo 400]
+import argparse
+import http.client
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fii_api  # noqa: E402
+import fii_cache  # noqa: E402
+import fii_compact  # noqa: E402
+import fii_http  # noqa: E402
+import fii_service  # noqa: E402
+import rank_fiis  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+from synthetic import ticker_for  # noqa: E402
+
+def ranking_queries(rng, distinct=40):
+    # `distinct` consultas normalizadas, cada uma em 3 grafias (ordem dos parâmetros, 0.7 x 0.70, 10 x 10.0)
+    queries = []
+    for _ in range(distinct):
+        params = {'min_pvp': rng.choice([0.6, 0.7, 0.8]), 'max_dy': rng.choice([0.12, 0.135, 0.16]), 'peso_pvp': rng.randint(0, 10), 'peso_dy': rng.randint(1, 10), 'top_n': rng.choice([10, 20, 50])}
+        items = list(params.items())
+        queries.append(['/ranking?' + '&'.join(f"{k}={v}" for k, v in items), '/ranking?' + '&'.join(f"{k}={v}" for k, v in reversed(items)),
+                        '/ranking?' + '&'.join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}.0" for k, v in items)])
+    return queries
+
+def client(port, paths, deadline, latencies, statuses, seed):
+    rng = random.Random(seed); conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30); etags = {}; received = 0
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)(rng); headers = {'Accept-Encoding': 'gzip'}
+        if path in etags and rng.random() < 0.5: headers['If-None-Match'] = etags[path]
+        start = time.perf_counter(); conn.request('GET', path, headers=headers); response = conn.getresponse(); body = response.read()
+        latencies.append(time.perf_counter() - start); statuses[response.status] = statuses.get(response.status, 0) + 1; received += len(body)
+        if response.getheader('ETag'): etags[path] = response.getheader('ETag')
+    conn.close(); statuses['bytes'] = statuses.get('bytes', 0) + received
+
+def load(api_server, paths, clients, seconds):
+    latencies = []; statuses = {}; deadline = time.perf_counter() + seconds; port = api_server.httpd.server_address[1]
+    threads = [threading.Thread(target=client, args=(port, paths, deadline, latencies, statuses, i)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - start; latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+    return {'req/s': len(latencies) / elapsed, 'p50 ms': pct(50), 'p99 ms': pct(99), 'media ms': statistics.fmean(latencies) * 1000, **statuses}
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--clientes', type=int, default=16); parser.add_argument('--segundos', type=float, default=5); parser.add_argument('--workers', type=int, default=fii_api.WORKERS)
+    parser.add_argument('--universo', type=int, default=400)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING); rank_fiis.carregar_tipos_do_json()
+    fii_http.HTTP_CACHE_ENABLED = False; fii_http.configure(requests_per_second=0); fii_cache.CACHE_DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench.sqlite')
+    rng = random.Random(0); queries = ranking_queries(rng)
+    paths = [lambda r: r.choice(r.choice(queries))] * 6 + [lambda r: f"/fii/{ticker_for(r.randrange(args.universo))}"] * 3 + [lambda r: '/universe'] # 60% / 30% / 10%
+    with StandInServer(latency=0.05, universe_size=args.universo) as fundamentus:
+        rank_fiis.URL_FII_LIST = fundamentus.base_url + 'fii_resultado.php'; rank_fiis.BASE_URL_FUNDAMENTUS = fii_compact.FUNDAMENTUS_BASE_URL = fundamentus.base_url
+        service = fii_service.UniverseService(track_changes=False, save_snapshots=False); service.refresh(wait=True)
+        for memoize in (False, True):
+            before = fundamentus.requests_served; api = fii_api.FiiApi(service, memoize=memoize)
+            with fii_api.ApiServer(api, port=0, workers=args.workers) as server:
+                result = load(server, paths, args.clientes, args.segundos)
+            label = 'memoizada' if memoize else 'sem memo '
+            print(f"API {label}: {result['req/s']:7.0f} req/s | p50 {result['p50 ms']:6.1f} ms | p99 {result['p99 ms']:7.1f} ms | 200: {result.get(200, 0)}, 304: {result.get(304, 0)} | "
+                  f"{result['bytes'] / 2**20:.1f} MB recebidos | memo {api.stats['memo_hits']} hits / {api.stats['memo_misses']} misses | requisições ao Fundamentus durante a carga: {fundamentus.requests_served - before}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Benchmark do backtest (fii_backtest) sobre um histórico sintético de snapshots: leitura do painel, grade de
+# parâmetros com 1 e N processos e comparação com o caminho ingênuo (rank_fiis.filter_and_rank + RankingEngine
+# por data e combinação, em pandas). Confere que as carteiras escolhidas são as mesmas nas duas formas.
+# Uso: python benchmarks/bench_backtest.py [--dias 750] [--fiis 400] [--processos 1,4]
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import numpy as np  # noqa: E402
+import fii_backtest  # noqa: E402
+import fii_ranking  # noqa: E402
+import fii_snapshots  # noqa: E402
+import rank_fiis  # noqa: E402
+from synthetic import snapshot_history  # noqa: E402
+
+GRID = {'min_pvp': [0.6, 0.7, 0.8], 'max_pvp': [1.0, 1.05, 1.2], 'min_dy': [0.06, 0.08], 'max_dy': [0.135, 0.16], 'min_liquidez': [200000, 400000, 1000000],
+        'pesos': {'pvp': [5, 7, 10], 'dy': [5, 10], 'liquidez': [0, 3], 'vacancia': [0, 2]}, 'top_n': [5, 10, 20], 'rebalanceamento': [5, 21]}
+
+def naive_selection(snapshot, filters, weights, top_n):
+    # Caminho do app/lote para uma data: filtros + ranks em pandas, ordem pelo motor
+    df = rank_fiis.filter_and_rank(snapshot, *(filters[k] for k in fii_backtest.FILTER_KEYS))
+    if df is None or df.empty: return []
+    return df['Papel'].iloc[fii_ranking.RankingEngine(df).order(weights, top_n)[0]].tolist()
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--dias', type=int, default=750); parser.add_argument('--fiis', type=int, default=400); parser.add_argument('--processos', default=f"1,{os.cpu_count() or 1}")
+    args = parser.parse_args()
+    logging.disable(logging.INFO); base_dir = tempfile.mkdtemp(prefix='snapshots_')
+    start = time.perf_counter()
+    for date, df in snapshot_history(args.fiis, args.dias): fii_snapshots.write_snapshot(df, date, base_dir)
+    print(f"Histórico sintético: {args.dias} snapshots x {args.fiis} FIIs gravados em {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter(); panel = fii_backtest.load_panel(base_dir=base_dir)
+    print(f"Painel (leitura colunar + arrays datas x tickers): {time.perf_counter() - start:.2f} s, {sum(a.nbytes for a in panel.fields.values()) / 2**20:.0f} MB")
+
+    grid = fii_backtest.normalize_grid(GRID); combos = fii_backtest.grid_size(grid)
+    for workers in dict.fromkeys(int(w) for w in args.processos.split(',')):
+        start = time.perf_counter(); results = fii_backtest.sweep(grid, panel, workers); elapsed = time.perf_counter() - start
+        print(f"Grade com {workers} processo(s): {len(results)} combinações em {elapsed:.1f} s ({len(results) / elapsed:.0f} combinações/s)")
+
+    # Caminho ingênuo: uma combinação (filtros/pesos padrão, rebalanceamento mensal), extrapolado para a grade
+    filters = fii_backtest.default_filters(); weights = tuple(fii_ranking.DEFAULT_WEIGHTS.values()); starts = np.arange(0, panel.T - 1, fii_backtest.DEFAULT_REBALANCE)
+    snapshots = {d: fii_snapshots.read_snapshots(start=d, end=d, base_dir=base_dir).sort_values('Papel', kind='stable') for d in panel.dates[starts].astype(object)}
+    start = time.perf_counter(); [naive_selection(df, filters, weights, fii_backtest.DEFAULT_TOP_N) for df in snapshots.values()]; naive_s = time.perf_counter() - start
+    filter_combos = int(np.prod([len(grid[k]) for k in fii_backtest.FILTER_KEYS]))
+    rebalances_in_grid = filter_combos * len(grid['pesos']) * len(grid['top_n']) * sum(-(-(panel.T - 1) // f) for f in grid['rebalanceamento'])
+    print(f"Ingênuo (pandas por data): {naive_s / len(starts) * 1000:.1f} ms por data -> ~{naive_s / len(starts) * rebalances_in_grid / 60:.0f} min para a mesma grade (sem contar a simulação)")
+    rng = np.random.default_rng(0); checks = [(filters, weights, fii_backtest.DEFAULT_TOP_N)] # Padrão + combinações sorteadas da grade
+    checks += [({k: rng.choice(grid[k]) for k in fii_backtest.FILTER_KEYS}, grid['pesos'][rng.integers(len(grid['pesos']))], int(rng.choice(grid['top_n']))) for _ in range(5)]
+    same = True
+    for check_filters, check_weights, top_n in checks:
+        mask = fii_backtest.filter_mask(panel, starts, **check_filters)
+        positions, valid = fii_backtest.select_top(fii_backtest.rank_tensor(panel, starts, mask), mask, [check_weights], top_n)
+        same &= [panel.tickers[p[0][v[0]]].tolist() for p, v in zip(positions, valid)] == [naive_selection(df, check_filters, check_weights, top_n) for df in snapshots.values()]
+    print(f"Carteiras idênticas ao caminho ingênuo ({len(checks)} combinações x {len(starts)} rebalanceamentos): {same}")
+    series, metrics = fii_backtest.backtest(panel)
+    print(f"Estratégia padrão: CAGR {metrics['CAGR']:.2%}, Sharpe {metrics['Sharpe']:.2f}, drawdown {metrics['Drawdown Máximo']:.2%}, giro {metrics['Giro Médio']:.2f}; "
+          f"universo: CAGR {fii_backtest.universe_benchmark(panel)['CAGR']:.2%}")
+
+if __name__ == '__main__':
+    main()
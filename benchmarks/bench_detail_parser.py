@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Benchmark dos parsers da página de detalhes sobre as páginas salvas em fixtures/detalhes:
+# BeautifulSoup/html5lib (original) x lxml (uma passada). Uso: python benchmarks/bench_detail_parser.py [--repeat 50]
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fii_parsers  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'detalhes')
+BASE_URL = 'https://www.fundamentus.com.br/'
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    pages = {os.path.basename(f): open(f, encoding='iso-8859-1').read() for f in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))}
+    if not pages: sys.exit(f"Nenhuma página em {FIXTURES_DIR}")
+    results = {}
+    for backend, func in fii_parsers.DETAIL_PARSERS.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat): parsed = {name: func(text, BASE_URL) for name, text in pages.items()}
+        elapsed = time.perf_counter() - start; total = args.repeat * len(pages)
+        results[backend] = parsed
+        print(f"{backend:<5} {total} páginas em {elapsed:.2f}s ({elapsed / total * 1000:.2f} ms/página, {total / elapsed:.0f} páginas/s)")
+    same = all(str(results['lxml'][name]) == str(results['bs4'][name]) for name in pages) # str() compara NaN corretamente
+    print(f"Saídas idênticas entre backends: {same}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Benchmark: exportação Excel antiga (cópia + rename + pd.ExcelWriter/openpyxl em BytesIO) x fii_export
+# (openpyxl write_only em blocos), mais CSV/Parquet e o acerto do cache de bytes. Mede tempo e pico de memória.
+# Uso: python benchmarks/bench_export.py [--rows 400,5000,20000]
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pandas as pd  # noqa: E402
+import fii_export  # noqa: E402
+import fii_ranking  # noqa: E402
+import rank_fiis  # noqa: E402
+from synthetic import summary_frame  # noqa: E402
+
+def measure(func):
+    # Tempo sem rastreamento (tracemalloc deixa a escrita célula a célula muito mais lenta) + pico em uma segunda execução
+    start = time.perf_counter(); result = func(); elapsed = time.perf_counter() - start
+    tracemalloc.start(); func(); _, peak = tracemalloc.get_traced_memory(); tracemalloc.stop()
+    return elapsed, peak, result
+
+def old_excel(df):
+    output = io.BytesIO(); df_excel = df.drop(columns=['URL Detalhes'], errors='ignore')
+    df_excel.rename(columns=fii_export.EXPORT_RENAMES, inplace=True)
+    with pd.ExcelWriter(output, engine='openpyxl') as writer: df_excel.to_excel(writer, index=False, sheet_name='Ranking FIIs')
+    return output.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--rows', default='400,5000,20000')
+    args = parser.parse_args()
+    logging.disable(logging.INFO); rank_fiis.carregar_tipos_do_json()
+    import openpyxl  # noqa: F401  (importação fora da medição)
+    for n in (int(s) for s in args.rows.split(',')):
+        universe = rank_fiis.prepare_universe(summary_frame(n))
+        df = fii_ranking.RankingEngine(universe).ranked_frame(universe.assign(**{c: 1 for c in ('Rank_PVP', 'Rank_DY', 'Rank_Liquidez', 'Rank_Vacancia')}), (7, 10, 3, 2))
+        print(f"--- {len(df)} linhas x {df.shape[1]} colunas ---")
+        seconds, peak, data = measure(lambda: old_excel(df))
+        print(f"xlsx antigo (ExcelWriter):   {seconds * 1000:8.0f} ms | pico {peak / 2**20:6.1f} MB | {len(data) / 1024:7.0f} KB")
+        for fmt in fii_export.EXPORT_FORMATS:
+            def generate(): fii_export.clear_cache(); return fii_export.export_bytes(fii_export.export_frame(df, drop=['URL Detalhes']), fmt)
+            seconds, peak, data = measure(generate)
+            print(f"{fmt:<8s} fii_export:         {seconds * 1000:8.0f} ms | pico {peak / 2**20:6.1f} MB | {len(data) / 1024:7.0f} KB")
+        key = fii_export.fingerprint(df, (7, 10, 3, 2))
+        fii_export.export_bytes(df, 'xlsx', key=key)
+        seconds, _, _ = measure(lambda: (fii_export.fingerprint(df, (7, 10, 3, 2)), fii_export.cached_export(key, 'xlsx')))
+        print(f"rerun (hash + cache):        {seconds * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
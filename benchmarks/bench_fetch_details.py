@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Benchmark: busca serial (sleep fixo por requisição) x busca concorrente com token bucket.
+# Uso: python benchmarks/bench_fetch_details.py [--n 150] [--latency 0.15] [--workers 8] [--rate 20]
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fii_http  # noqa: E402
+import rank_fiis  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+from synthetic import ticker_for  # noqa: E402
+
+LEGACY_REQUEST_DELAY = 0.3 # Pacing da versão serial anterior
+
+def run_serial(urls):
+    results = []
+    for url in urls: time.sleep(LEGACY_REQUEST_DELAY); results.append(rank_fiis.fetch_fii_details(url))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=150); parser.add_argument('--latency', type=float, default=0.15)
+    parser.add_argument('--workers', type=int, default=8); parser.add_argument('--rate', type=float, default=20.0)
+    parser.add_argument('--skip-serial', action='store_true')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    fii_http.HTTP_CACHE_ENABLED = False # Mede a rede, não o cache em disco
+
+    with StandInServer(latency=args.latency) as server:
+        urls = [server.base_url + 'detalhes.php?papel=' + ticker_for(i) for i in range(args.n)]
+        fii_http.configure(max_concurrent=args.workers, requests_per_second=args.rate, burst=args.workers)
+        start = time.perf_counter(); concurrent = fii_http.fetch_concurrent(rank_fiis.fetch_fii_details, urls); t_conc = time.perf_counter() - start
+        print(f"Concorrente: {args.n} páginas em {t_conc:.2f}s ({args.n / t_conc:.1f} páginas/s, {args.workers} workers, {args.rate} req/s)")
+        if not args.skip_serial:
+            fii_http.configure(requests_per_second=0)
+            start = time.perf_counter(); serial = run_serial(urls); t_serial = time.perf_counter() - start
+            print(f"Serial:      {args.n} páginas em {t_serial:.2f}s ({args.n / t_serial:.1f} páginas/s)")
+            print(f"Speedup: {t_serial / t_conc:.1f}x | Resultados idênticos e na mesma ordem: {serial == concurrent}")
+
+if __name__ == '__main__':
+    main()
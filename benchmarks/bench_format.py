@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Benchmark: montagem dos registros do template com iterrows + format_brl/format_percent por célula
+# x fii_format.build_template_records (colunas inteiras). Uso: python benchmarks/bench_format.py [--rows 10000]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fii_format  # noqa: E402
+from fii_format import format_brl, format_brl_cotacao, format_percent  # noqa: E402
+
+FMT_KEYS = ['Cotação_fmt', 'DY_fmt', 'PVP_fmt', 'Liquidez_fmt', 'FFOYield_fmt', 'ValorMercado_fmt', 'QtdImoveis_fmt', 'Vacancia_fmt', 'OscDia_fmt', 'OscMes_fmt', 'Osc12M_fmt']
+
+def synthetic_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    def with_nans(values, frac=0.03): values = values.astype(float); values[rng.random(rows) < frac] = np.nan; return values
+    return pd.DataFrame({
+        'Papel': [f"F{i:05d}11" for i in range(rows)], 'Segmento': 'Logística', 'Tipo': 'Tijolo',
+        'Cotação': with_nans(rng.uniform(0.5, 2000, rows)), 'Dividend Yield': with_nans(rng.uniform(-0.01, 0.25, rows)),
+        'P/VP': with_nans(rng.uniform(0.3, 2.0, rows)), 'Liquidez': with_nans(rng.uniform(0, 5e7, rows)),
+        'FFO Yield': with_nans(rng.uniform(-0.05, 0.2, rows)), 'Valor de Mercado': with_nans(rng.uniform(1e6, 2e10, rows)),
+        'Qtd de imóveis': pd.array(np.where(rng.random(rows) < 0.05, None, rng.integers(0, 3000, rows)), dtype='Int64'),
+        'Vacância Média': with_nans(rng.uniform(0, 0.5, rows)), 'Osc. Dia': with_nans(rng.normal(0, 0.01, rows)),
+        'Osc. Mês': with_nans(rng.normal(0, 0.04, rows)), 'Osc. 12 Meses': with_nans(rng.normal(0, 0.15, rows)),
+        'Data Último Relatório': '30/09/2025', 'Link Download Relatório': None, 'Link Documentos FNET': None, 'URL Detalhes': None,
+    })
+
+def legacy_records(df_subset):
+    # Cópia do laço original do app.py (iterrows + formatação escalar)
+    data_for_template = []
+    cols_present = list(df_subset.columns)
+    for idx, row in df_subset.iterrows():
+        fii_data = {}
+        for col in cols_present: fii_data[col] = row[col]
+        fii_data['Cotação_fmt'] = "R$ " + format_brl_cotacao(fii_data.get('Cotação'))
+        fii_data['DY_fmt'] = format_percent(fii_data.get('Dividend Yield'))
+        fii_data['PVP_fmt'] = f"{fii_data.get('P/VP'):.2f}".replace('.', ',') if pd.notna(fii_data.get('P/VP')) else "N/A"
+        fii_data['Liquidez_fmt'] = "R$ " + format_brl(fii_data.get('Liquidez'), decimals=0)
+        fii_data['FFOYield_fmt'] = format_percent(fii_data.get('FFO Yield'))
+        fii_data['ValorMercado_fmt'] = "R$ " + format_brl(fii_data.get('Valor de Mercado'), decimals=0)
+        fii_data['QtdImoveis_fmt'] = format_brl(fii_data.get('Qtd de imóveis'), decimals=0) if pd.notna(fii_data.get('Qtd de imóveis')) else "N/A"
+        fii_data['Vacancia_fmt'] = format_percent(fii_data.get('Vacância Média'))
+        fii_data['OscDia_fmt'] = format_percent(fii_data.get('Osc. Dia'))
+        fii_data['OscMes_fmt'] = format_percent(fii_data.get('Osc. Mês'))
+        fii_data['Osc12M_fmt'] = format_percent(fii_data.get('Osc. 12 Meses'))
+        data_for_template.append(fii_data)
+    return data_for_template
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--locale', action='store_true', help="Compara com format_brl usando o locale pt_BR (se disponível)")
+    args = parser.parse_args()
+    if not args.locale: fii_format.LOCALE_CONFIGURED = False # Referência = caminho sem locale (o mesmo do formatador vetorizado)
+    df = synthetic_frame(args.rows)
+    start = time.perf_counter(); legacy = legacy_records(df); t_legacy = time.perf_counter() - start
+    start = time.perf_counter(); fast = fii_format.build_template_records(df); t_fast = time.perf_counter() - start
+    mismatches = sum(old[key] != new[key] for old, new in zip(legacy, fast) for key in FMT_KEYS)
+    print(f"iterrows + format_brl/format_percent: {t_legacy * 1000:.1f} ms")
+    print(f"build_template_records (vetorizado):  {t_fast * 1000:.1f} ms")
+    print(f"Speedup: {t_legacy / t_fast:.1f}x | Células *_fmt divergentes: {mismatches} de {len(legacy) * len(FMT_KEYS)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Benchmark do cache HTTP em disco: refresh frio (rede) x quente (hits) x vencido (GET condicional / 304).
+# Uso: python benchmarks/bench_http_cache.py [--n 150] [--latency 0.15]
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fii_cache  # noqa: E402
+import fii_http  # noqa: E402
+import rank_fiis  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+from synthetic import ticker_for  # noqa: E402
+
+def timed_refresh(label, urls):
+    start = time.perf_counter(); fii_http.fetch_concurrent(rank_fiis.fetch_fii_details, urls); elapsed = time.perf_counter() - start
+    print(f"{label:<10} {len(urls)} páginas em {elapsed:.2f}s | {fii_http.cache_stats()}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=150); parser.add_argument('--latency', type=float, default=0.15)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp, StandInServer(latency=args.latency) as server:
+        fii_cache.CACHE_DB_FILE = os.path.join(tmp, 'bench_cache.sqlite'); fii_http.configure(requests_per_second=20.0, burst=8)
+        urls = [server.base_url + 'detalhes.php?papel=' + ticker_for(i) for i in range(args.n)]
+        timed_refresh('Frio', urls)
+        timed_refresh('Quente', urls)
+        fii_cache.CACHE_TTLS['detalhes.php'] = 0 # Força revalidação condicional
+        timed_refresh('Vencido', urls)
+
+if __name__ == '__main__':
+    main()
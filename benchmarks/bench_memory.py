@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# Benchmark de memória do universo em memória: formato anterior (Segmento/Tipo/data em texto, três colunas de
+# URL completas) x compacto (fii_compact: categóricos, datetime64, só ids dos links) e o custo das cópias de uma
+# sessão do app (filtro -> ranks -> detalhes -> ordenação -> exibição), com cópias defensivas x copy-on-write.
+# Também confere que a tabela renderizada e a exportação saem iguais nos dois formatos.
+# Uso: python benchmarks/bench_memory.py [--fiis 400,5000,50000] [--repeat 5]
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pandas as pd  # noqa: E402
+import pyarrow as pa  # noqa: E402
+import fii_compact  # noqa: E402
+import fii_export  # noqa: E402
+import fii_format  # noqa: E402
+import fii_ranking  # noqa: E402
+import rank_fiis  # noqa: E402
+from synthetic import SUMMARY_COLUMNS, summary_rows  # noqa: E402
+
+FILTERS = (0.0, 10.0, 0.0, 1.0, 0) # Filtros abertos: a sessão carrega o universo inteiro (pior caso de memória)
+WEIGHTS = (7, 10, 3, 2) # Pesos padrão dos sliders do app (P/VP, DY, Liquidez, Vacância)
+
+def universe_with_details(n, seed=0):
+    # Universo limpo/classificado + detalhes memoizados como viriam do parser (data "dd/mm/aaaa", links completos)
+    universe = rank_fiis.prepare_universe(pd.DataFrame(list(summary_rows(n, seed)), columns=SUMMARY_COLUMNS))
+    rnd = random.Random(seed); now = time.time()
+    for papel in universe['Papel']:
+        report = None if rnd.random() < 0.1 else (f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.choice([2024, 2025])}", f"{fii_compact.FNET_BASE_URL}downloadDocumento?id={rnd.randint(100000, 999999)}")
+        fnet = f"{fii_compact.FNET_BASE_URL}abrirGerenciadorDocumentosCVM?cnpjFundo={rnd.randint(0, 10 ** 14 - 1):014d}"
+        rank_fiis._DETAILS_BY_TICKER[papel] = (now, (*(report or ("N/A", None)), rnd.uniform(-0.05, 0.05), rnd.uniform(-0.1, 0.1), rnd.uniform(-0.3, 0.3), fnet))
+    return rank_fiis.order_columns(rank_fiis.attach_details(universe, fetch_missing=False))
+
+def legacy_frame(compact):
+    # Formato anterior: tudo que é texto como objetos Python
+    expanded = fii_compact.expand(compact)
+    return expanded.astype({c: object for c in expanded.columns if isinstance(expanded[c].dtype, pd.CategoricalDtype)})
+
+def legacy_session(universe):
+    # Caminho anterior (sem copy-on-write): cópia no filtro, em attach_details, na seleção ordenada e na exibição
+    with pd.option_context('mode.copy_on_write', False):
+        mask = universe['P/VP'].between(FILTERS[0], FILTERS[1]) & (universe['Liquidez'] >= FILTERS[4]) & universe['Dividend Yield'].between(FILTERS[2], FILTERS[3])
+        df = rank_fiis._compute_ranks(universe[mask].copy()).copy()
+        ranked = fii_ranking.RankingEngine(df).ranked_frame(df, WEIGHTS).copy()
+        return ranked, ranked.copy()
+
+def session(universe):
+    # Caminho atual (sem cópias defensivas, só assign) com copy-on-write ligado só aqui: seleções e assign
+    # compartilham os dados até alguém escrever
+    with pd.option_context('mode.copy_on_write', True):
+        df = rank_fiis._compute_ranks(universe[universe['P/VP'].between(FILTERS[0], FILTERS[1]) & (universe['Liquidez'] >= FILTERS[4]) & universe['Dividend Yield'].between(FILTERS[2], FILTERS[3])])
+        df = df.assign()
+        ranked = fii_ranking.RankingEngine(df).ranked_frame(df, WEIGHTS)
+        return ranked, ranked
+
+def measure(fn, *args, repeat=5):
+    # (mediana em ms, pico de alocação em MB: tracemalloc + pool do Arrow)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter(); fn(*args); times.append(time.perf_counter() - start)
+    arrow_before = pa.total_allocated_bytes(); tracemalloc.start()
+    result = fn(*args); peak = tracemalloc.get_traced_memory()[1] + max(0, pa.total_allocated_bytes() - arrow_before)
+    tracemalloc.stop(); del result
+    return sorted(times)[len(times) // 2] * 1000, peak / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--fiis', default='400,5000,50000'); parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING); rank_fiis.carregar_tipos_do_json()
+    for n in (int(s) for s in args.fiis.split(',')):
+        compact = universe_with_details(n); legacy = legacy_frame(compact)
+        legacy_mb = legacy.memory_usage(deep=True, index=False); compact_mb = compact.memory_usage(deep=True, index=False)
+        print(f"{n:>6d} FIIs | universo: {legacy_mb.sum() / 2**20:7.2f} MB -> {compact_mb.sum() / 2**20:6.2f} MB ({legacy_mb.sum() / compact_mb.sum():.1f}x menor)")
+        changed = ['Segmento', 'Tipo', 'Data Último Relatório', 'Link Download Relatório', 'Link Documentos FNET', 'URL Detalhes']
+        compact_names = {'Link Download Relatório': 'ID Relatório', 'Link Documentos FNET': 'CNPJ FNET'}
+        print("        | " + " | ".join(f"{c}: {legacy_mb[c] / 2**10:.0f} -> {compact_mb.get(compact_names.get(c, c), 0) / 2**10:.0f} KB" for c in changed))
+        legacy_ms, legacy_peak = measure(legacy_session, legacy, repeat=args.repeat); new_ms, new_peak = measure(session, compact, repeat=args.repeat)
+        print(f"        | sessão (filtro -> ranks -> ordenação -> exibição): cópias defensivas {legacy_ms:7.1f} ms, pico {legacy_peak:7.2f} MB | copy-on-write {new_ms:7.1f} ms, pico {new_peak:6.2f} MB")
+        copy_ms, copy_peak = measure(legacy.copy, repeat=args.repeat); compact_copy_ms, compact_copy_peak = measure(compact.copy, repeat=args.repeat)
+        print(f"        | df.copy() do universo: {copy_ms:6.1f} ms / {copy_peak:6.2f} MB -> {compact_copy_ms:5.1f} ms / {compact_copy_peak:5.2f} MB")
+        top = session(compact)[0].head(200); legacy_top = legacy_session(legacy)[0].head(200)
+        render_ms, _ = measure(fii_format.build_table_payload, top, [], repeat=args.repeat)
+        exported = fii_export.export_frame(top) # Mesmas colunas na mesma ordem (no formato anterior os ranks entram depois de 'URL Detalhes')
+        same = fii_format.build_table_payload(top, []) == fii_format.build_table_payload(legacy_top, []) and fii_export.export_bytes(exported, 'csv') == fii_export.export_bytes(fii_export.export_frame(legacy_top)[list(exported.columns)], 'csv')
+        print(f"        | payload da tabela com links/data expandidos (200 linhas): {render_ms:.1f} ms | tabela e exportação iguais ao formato anterior: {same}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# Benchmark da ingestão de relatórios (fii_reports) contra o servidor local: páginas/s da extração com 1 e N
+# processos, segunda execução sem mudanças (nada vai à rede), datas novas com o mesmo PDF (baixa, não reextrai)
+# e o pico de memória (RSS) dos workers.
+# Uso: python benchmarks/bench_reports.py [--fiis 60] [--paginas 12] [--processos 1,4]
+import argparse
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pandas as pd  # noqa: E402
+import fii_http  # noqa: E402
+import fii_reports  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+from synthetic import ticker_for  # noqa: E402
+
+def frame(server, n, date='15/01/2025'):
+    papeis = [ticker_for(i) for i in range(n)]
+    return pd.DataFrame({'Papel': papeis, 'Data Último Relatório': date, 'Link Download Relatório': [f"{server.base_url}relatorio.pdf?papel={p}" for p in papeis]})
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--fiis', type=int, default=60); parser.add_argument('--paginas', type=int, default=12); parser.add_argument('--processos', default=f"1,{fii_reports.MAX_WORKERS}")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING); fii_http.HTTP_CACHE_ENABLED = False; fii_http.configure(requests_per_second=0); fii_http.SCOPE_RATE_LIMITS = {} # Sem limite também para os PDFs (servidor local)
+    os.chdir(tempfile.mkdtemp())
+    with StandInServer(latency=0.0, report_pages=args.paginas) as server:
+        df = frame(server, args.fiis)
+        for pdf in (server.report_body(p) for p in df['Papel']): pass # PDFs gerados antes da medição
+        for workers in dict.fromkeys(int(w) for w in args.processos.split(',')):
+            store = fii_reports.ReportStore(f"relatorios_{workers}.sqlite")
+            start = time.perf_counter(); stats = fii_reports.ingest(df, workers=workers, store=store, base_dir=f"pdfs_{workers}"); total = time.perf_counter() - start
+            print(f"{workers} processo(s): {stats['paginas']} páginas em {stats['segundos_extracao']:.2f} s -> {stats['paginas_por_segundo']} páginas/s (total com download {total:.2f} s, {stats['bytes'] / 2**20:.1f} MB, falhas {stats['falhas']})")
+        served = server.requests_served
+        start = time.perf_counter(); stats = fii_reports.ingest(df, store=store, base_dir=f"pdfs_{workers}")
+        print(f"Sem mudanças: {stats['inalterados']} inalterados, {server.requests_served - served} requisições, {time.perf_counter() - start:.3f} s")
+        changed = df.copy(); changed.loc[changed.index[::10], 'Data Último Relatório'] = '15/02/2025' # 10% com data nova (mesmo PDF)
+        stats = fii_reports.ingest(changed, store=store, base_dir=f"pdfs_{workers}")
+        print(f"Datas novas: {stats['baixados']} baixados, {stats['reaproveitados']} já extraídos (mesmo conteúdo), {stats['extraidos']} extraídos")
+        joined = fii_reports.join_report_fields(df, store=store)
+        print(f"Campos juntados: {joined[fii_reports.FIELD_COLUMNS].notna().sum().to_dict()}")
+    print(f"Pico de memória (RSS) dos workers: {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.0f} MB (limite {fii_reports.WORKER_MEMORY_MB} MB de espaço de endereçamento)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Benchmark da análise de sensibilidade aos pesos (fii_sensitivity): tempo de 10k vetores de pesos sobre
+# conjuntos filtrados de tamanhos típicos e conferência contra o caminho ingênuo (um engine.order por vetor).
+# Uso: python benchmarks/bench_sensitivity.py [--fiis 100,400,1500] [--amostras 10000] [--conferir 300]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import fii_ranking  # noqa: E402
+import fii_sensitivity  # noqa: E402
+import rank_fiis  # noqa: E402
+
+WEIGHTS = (7, 10, 3, 2) # Pesos padrão dos sliders do app (P/VP, DY, Liquidez, Vacância)
+
+def ranked_frame(n, seed=0):
+    # Conjunto filtrado sintético com os Rank_* calculados como no app (inclui empates e vacância ausente)
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'Papel': [f"F{i:04d}11" for i in range(n)], 'P/VP': rng.uniform(0.6, 1.2, n).round(2), 'Dividend Yield': rng.uniform(6, 16, n).round(1),
+                       'Liquidez': rng.lognormal(12, 1.5, n).round(), 'Vacância Média': np.where(rng.random(n) < 0.2, np.nan, rng.uniform(0, 30, n).round(1))})
+    return rank_fiis._compute_ranks(df)
+
+def naive_counts(df, samples):
+    # Uma ordenação completa por vetor de pesos (caminho do app), acumulando FII x posição
+    engine = fii_ranking.RankingEngine(df); counts = np.zeros((engine.n, engine.n), dtype=np.int64)
+    for w in samples: counts[engine.order(w)[0], np.arange(engine.n)] += 1
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--fiis', default='100,400,1500'); parser.add_argument('--amostras', type=int, default=fii_sensitivity.DEFAULT_SAMPLES); parser.add_argument('--conferir', type=int, default=300)
+    args = parser.parse_args()
+    for n in (int(s) for s in args.fiis.split(',')):
+        df = ranked_frame(n)
+        for spread in (fii_sensitivity.DEFAULT_SPREAD, None):
+            stats, info = fii_sensitivity.analyze(df, WEIGHTS, args.amostras, spread)
+            stable = fii_sensitivity.top_k_stability(stats)
+            label = f"±{spread}" if spread else "0–10"
+            print(f"{n:>5d} FIIs x {info['amostras']} amostras ({label:>4s}): {info['segundos'] * 1000:7.0f} ms | Top 10 sempre {stable['sempre']:>2d}, alguma vez {stable['alguma_vez']:>3d}")
+        samples = fii_sensitivity.sample_weights(WEIGHTS, args.conferir, None, seed=1)
+        start = time.perf_counter(); expected = naive_counts(df, samples); naive_s = time.perf_counter() - start
+        same = np.array_equal(fii_sensitivity.position_counts(fii_ranking.build_rank_matrix(df), samples), expected)
+        print(f"      conferência com {args.conferir} ordenações ingênuas ({naive_s * 1000:.0f} ms): contagens idênticas: {same}")
+
+if __name__ == '__main__':
+    main()
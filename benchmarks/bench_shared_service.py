@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Benchmark: N sessões clicando "Atualizar" ao mesmo tempo. Cada sessão buscando o resumo por conta própria
+# x fii_service.UniverseService compartilhado (single-flight). Mede requisições ao servidor e tempo de parede.
+# Uso: python benchmarks/bench_shared_service.py [--sessions 20] [--latency 0.3]
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fii_cache  # noqa: E402
+import fii_compact  # noqa: E402
+import fii_http  # noqa: E402
+import fii_service  # noqa: E402
+import rank_fiis  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+
+def run_sessions(n, session):
+    # Todas as sessões liberadas juntas (barreira), como cliques simultâneos
+    barrier = threading.Barrier(n); results = [None] * n
+    def worker(i): barrier.wait(); results[i] = session()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--sessions', type=int, default=20); parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--universe', type=int, default=400)
+    args = parser.parse_args()
+    logging.disable(logging.INFO); rank_fiis.carregar_tipos_do_json()
+    fii_http.HTTP_CACHE_ENABLED = False; fii_http.configure(requests_per_second=0) # Sem cache HTTP: mede só o efeito do serviço
+    fii_cache.CACHE_DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench.sqlite')
+    with StandInServer(latency=args.latency, universe_size=args.universe) as server:
+        rank_fiis.URL_FII_LIST = server.base_url + 'fii_resultado.php'; rank_fiis.BASE_URL_FUNDAMENTUS = fii_compact.FUNDAMENTUS_BASE_URL = server.base_url
+        elapsed, _ = run_sessions(args.sessions, fii_service.load_universe)
+        print(f"Uma busca por sessão:  {elapsed:6.2f} s | {server.requests_served:3d} requisições")
+        before = server.requests_served; service = fii_service.UniverseService(save_snapshots=False)
+        elapsed, results = run_sessions(args.sessions, lambda: service.refresh(wait=True, min_interval=fii_service.MIN_REFRESH_INTERVAL))
+        same = all(r is results[0] for r in results)
+        print(f"Serviço compartilhado: {elapsed:6.2f} s | {server.requests_served - before:3d} requisições | mesmo objeto em todas as sessões: {same}")
+        start = time.perf_counter(); service.snapshot(); read = time.perf_counter() - start
+        print(f"Leitura do snapshot (sem rede): {read * 1e6:.0f} µs | status: {service.status()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# Benchmark de inicialização: importação a frio dos módulos (processo novo a cada medição), primeira execução
+# do app (AppTest, processo novo) e tempo de cada rerun do Streamlit com a tabela carregada (servidor local).
+# Uso: python benchmarks/bench_startup.py [--repeat 5] [--reruns 10]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__)); ROOT = os.path.dirname(BENCH_DIR)
+
+# Roda em um processo novo: mede a importação de um módulo
+IMPORT_SCRIPT = """
+import sys, time; sys.path[:0] = [{root!r}]
+start = time.perf_counter(); import {module}; print(time.perf_counter() - start)
+"""
+
+# Roda em um processo novo: primeira execução do app (página inicial, sem rede) e reruns com dados carregados
+APP_SCRIPT = """
+import json, logging, os, sys, tempfile, time, statistics; sys.path[:0] = [{root!r}, {bench!r}]; os.chdir(tempfile.mkdtemp())
+logging.disable(logging.WARNING)
+from streamlit.testing.v1 import AppTest
+app = os.path.join({root!r}, 'app.py')
+start = time.perf_counter(); at = AppTest.from_file(app, default_timeout=120); at.run(); cold = time.perf_counter() - start
+start = time.perf_counter(); at.run(); idle_rerun = time.perf_counter() - start
+import fii_compact, fii_http, rank_fiis
+from stand_in_server import StandInServer
+fii_http.HTTP_CACHE_ENABLED = False; fii_http.configure(requests_per_second=0)
+with StandInServer(latency=0.0, universe_size=400) as server:
+    rank_fiis.URL_FII_LIST = server.base_url + 'fii_resultado.php'; rank_fiis.BASE_URL_FUNDAMENTUS = fii_compact.FUNDAMENTUS_BASE_URL = server.base_url
+    next(b for b in at.button if 'Atualizar' in b.label).click().run()
+    times = []
+    for i in range({reruns}):
+        at.slider(key='peso_dy').set_value(10 - i % 2) # Interação típica: muda um peso
+        start = time.perf_counter(); at.run(); times.append(time.perf_counter() - start)
+print(json.dumps({{'cold': cold, 'idle_rerun': idle_rerun, 'rerun': statistics.median(times), 'errors': len(at.exception)}}))
+"""
+
+def run(script):
+    out = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=ROOT)
+    if out.returncode != 0: raise RuntimeError(out.stderr[-2000:])
+    return out.stdout.strip().splitlines()[-1]
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--repeat', type=int, default=5); parser.add_argument('--reruns', type=int, default=10)
+    args = parser.parse_args()
+    for module in ('rank_fiis', 'fii_batch', 'fii_service'):
+        times = [float(run(IMPORT_SCRIPT.format(root=ROOT, module=module))) for _ in range(args.repeat)]
+        print(f"import {module:<12s} {statistics.median(times) * 1000:7.0f} ms (mediana de {args.repeat} processos)")
+    results = [json.loads(run(APP_SCRIPT.format(root=ROOT, bench=BENCH_DIR, reruns=args.reruns))) for _ in range(max(1, args.repeat // 2))]
+    for key, label in (('cold', 'app: primeira execução'), ('idle_rerun', 'app: rerun sem dados'), ('rerun', 'app: rerun com tabela')):
+        print(f"{label:<26s} {statistics.median(r[key] for r in results) * 1000:7.0f} ms")
+    if any(r['errors'] for r in results): print("ATENÇÃO: o app levantou exceções durante a medição.")
+
+if __name__ == '__main__':
+    main()
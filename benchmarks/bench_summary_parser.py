@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Benchmark do parse da página de resumo (fii_resultado.php): caminho antigo (apparent_encoding + pd.read_html)
+# x leitura direta da tabela tabelaResultado (fii_parsers.parse_summary_direct), na página gravada em fixtures/
+# e em páginas sintéticas ampliadas. Confere que o universo limpo (prepare_universe) sai idêntico.
+# Uso: python benchmarks/bench_summary_parser.py [--rows 2000,20000,100000] [--repeat 3]
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pandas as pd  # noqa: E402
+import requests  # noqa: E402
+import fii_parsers  # noqa: E402
+import rank_fiis  # noqa: E402
+from synthetic import render_summary_page  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'fii_resultado.html')
+CONTENT_TYPE = 'text/html; charset=ISO-8859-1'
+
+def old_parse(body):
+    # fetch_summary_data antes da mudança: chardet na página inteira + detecção genérica de tabelas
+    response = requests.Response(); response._content = body; response.headers['Content-Type'] = CONTENT_TYPE
+    response.encoding = response.apparent_encoding
+    df = pd.read_html(io.StringIO(response.text), decimal=',', thousands='.')[0]; df.columns = df.columns.str.strip()
+    return df
+
+def new_parse(body): return fii_parsers.parse_summary_direct(body, CONTENT_TYPE)
+
+def best_of(func, body, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter(); result = func(body); times.append(time.perf_counter() - start)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--rows', default='2000,20000,100000'); parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING); rank_fiis.carregar_tipos_do_json()
+    with open(FIXTURE, 'rb') as f: pages = [('gravada', f.read())]
+    pages += [(f"sintética {n}", render_summary_page(n).encode('iso-8859-1', errors='replace')) for n in (int(s) for s in args.rows.split(','))]
+    for name, body in pages:
+        repeat = args.repeat if len(body) < 20 * 2**20 else 1
+        old_s, old_df = best_of(old_parse, body, repeat); new_s, new_df = best_of(new_parse, body, repeat)
+        same = rank_fiis.prepare_universe(old_df).reset_index(drop=True).equals(rank_fiis.prepare_universe(new_df).reset_index(drop=True))
+        print(f"{name:<18s} {len(new_df):>7d} FIIs {len(body) / 2**20:6.1f} MB | read_html {old_s * 1000:8.0f} ms | direto {new_s * 1000:7.0f} ms | {old_s / new_s:5.1f}x | universo idêntico: {same}")
+
+if __name__ == '__main__':
+    main()
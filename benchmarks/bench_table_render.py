@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Benchmark: tabela por aba (fii_template.html renderizado N+1 vezes) x tabela única (fii_template_tabs.html,
+# payload JSON serializado uma vez). Mede tempo de renderização no servidor e bytes enviados ao navegador.
+# Uso: python benchmarks/bench_table_render.py [--rows 400] [--segments 12]
+import argparse
+import os
+import sys
+import time
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT); sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fii_format  # noqa: E402
+from bench_format import synthetic_frame  # noqa: E402
+
+def legacy_render(env, df, segments):
+    # Mesmo fluxo do modo antigo do app.py: registros + um render por aba
+    template = env.get_template('fii_template.html'); records = fii_format.build_template_records(df)
+    pages = [template.render(fiis=records)]
+    for seg in segments: pages.append(template.render(fiis=[fii for fii in records if fii.get('Segmento') == seg]))
+    return pages
+
+def single_render(env, df, segments):
+    payload = fii_format.build_table_payload(df, segments)
+    return [env.get_template('fii_template_tabs.html').render(payload=payload)]
+
+def main():
+    parser = argparse.ArgumentParser(); parser.add_argument('--rows', type=int, default=400); parser.add_argument('--segments', type=int, default=12)
+    args = parser.parse_args()
+    env = Environment(loader=FileSystemLoader(ROOT), autoescape=select_autoescape(['html', 'xml']))
+    df = synthetic_frame(args.rows); segments = [f"Segmento {i:02d}" for i in range(args.segments)]
+    df['Segmento'] = [segments[i % len(segments)] for i in range(len(df))]
+    results = {}
+    for name, func in (('Uma tabela por aba', legacy_render), ('Tabela única (JSON)', single_render)):
+        func(env, df, segments) # Aquece o cache de templates do Jinja2
+        start = time.perf_counter(); pages = func(env, df, segments); elapsed = time.perf_counter() - start
+        results[name] = (elapsed, sum(len(p.encode('utf-8')) for p in pages), len(pages))
+        print(f"{name:22s} {elapsed * 1000:8.1f} ms | {results[name][1] / 1024:8.0f} KB | {len(pages)} iframe(s)")
+    (t_old, b_old, _), (t_new, b_new, _) = results.values()
+    print(f"Tempo: {t_old / t_new:.1f}x menor | Bytes: {b_old / b_new:.1f}x menos ({args.rows} FIIs, {args.segments} segmentos)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# Suíte de benchmarks offline: estágios do pipeline e throughput ponta a ponta contra o servidor local
+# (latência e taxa de erro configuráveis), sobre as páginas gravadas em fixtures/ e em escala com o
+# universo sintético (10k–100k FIIs). Compara com uma linha de base salva e sai com código 1 se algum
+# estágio regredir além da tolerância.
+# Uso: python benchmarks/run_suite.py [--sizes 1000,10000,100000] [--latency 0.02] [--error-rate 0.02]
+#      [--baseline benchmarks/baseline.json] [--save-baseline] [--tolerance 0.25]
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__)); ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT); sys.path.insert(0, BENCH_DIR)
+import fii_compact  # noqa: E402
+import fii_format  # noqa: E402
+import fii_http  # noqa: E402
+import fii_metrics  # noqa: E402
+import fii_parsers  # noqa: E402
+import fii_ranking  # noqa: E402
+import rank_fiis  # noqa: E402
+from stand_in_server import FIXTURES_DIR, StandInServer  # noqa: E402
+from synthetic import summary_frame, ticker_for  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+NOISE_FLOOR = 0.005 # Diferenças abaixo disto (s) nunca contam como regressão
+DEFAULT_FILTERS = (rank_fiis.MIN_PVP, rank_fiis.MAX_PVP, rank_fiis.MIN_DY, rank_fiis.MAX_DY, rank_fiis.MIN_LIQUIDEZ)
+
+
+def timed(func, repeat=3):
+    # Mediana de `repeat` execuções (e o resultado da última)
+    times = []; result = None
+    for _ in range(repeat):
+        start = time.perf_counter(); result = func(); times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+def _forget_details(): rank_fiis._DETAILS_BY_TICKER.clear(); rank_fiis._DETAILS_FAILURES.clear() # Cada medição de detalhes começa sem memo
+
+def point(seconds, items=None, unit=None):
+    entry = {'seconds': round(seconds, 5)}
+    if items: entry.update({'items': items, 'throughput': round(items / seconds, 1) if seconds else None, 'unit': unit})
+    return entry
+
+
+# --- Páginas gravadas (fixtures/) ---
+def bench_fixtures(results, args):
+    pages = {name[:-5]: open(os.path.join(FIXTURES_DIR, 'detalhes', name), encoding='iso-8859-1').read() for name in sorted(os.listdir(os.path.join(FIXTURES_DIR, 'detalhes')))}
+    for backend in fii_parsers.DETAIL_PARSERS:
+        seconds, _ = timed(lambda: [fii_parsers.parse_details(html, rank_fiis.BASE_URL_FUNDAMENTUS, backend=backend) for html in pages.values()], args.repeat)
+        results[f'fixtures.detalhes_parse.{backend}'] = point(seconds, len(pages), 'páginas/s')
+    with StandInServer(latency=args.latency, fixtures_dir=FIXTURES_DIR) as server:
+        _point_server(server)
+        seconds, raw = timed(lambda: rank_fiis.fetch_summary_data(rank_fiis.URL_FII_LIST), args.repeat)
+        results['fixtures.resumo_busca_parse'] = point(seconds, len(raw), 'FIIs/s')
+        def end_to_end(): _forget_details(); return rank_fiis.process_data(rank_fiis.fetch_summary_data(rank_fiis.URL_FII_LIST))
+        seconds, final = timed(end_to_end, args.repeat)
+        results['fixtures.ponta_a_ponta'] = point(seconds, len(raw), 'FIIs/s') | {'selecionados': len(final)}
+
+# --- Escala (universo sintético) ---
+def bench_scale(results, n, args):
+    raw = summary_frame(n)
+    seconds, universe = timed(lambda: rank_fiis.prepare_universe(raw), args.repeat)
+    results[f'escala.{n}.preparo'] = point(seconds, n, 'FIIs/s')
+    seconds, ranked = timed(lambda: rank_fiis.filter_and_rank(universe, *DEFAULT_FILTERS), args.repeat)
+    results[f'escala.{n}.filtro_ranks'] = point(seconds, n, 'FIIs/s') | {'selecionados': len(ranked)}
+    weights = np.random.default_rng(0).integers(0, 11, size=(100, 4))
+    def scores(): engine = fii_ranking.RankingEngine(ranked); return [engine.order(w) for w in weights] # Motor novo: sem cache entre repetições
+    seconds, _ = timed(scores, args.repeat)
+    results[f'escala.{n}.score_100_pesos'] = point(seconds, 100, 'vetores/s')
+    ordered = fii_ranking.RankingEngine(ranked).ranked_frame(ranked, (7, 10, 3, 2))
+    segments = sorted(ordered['Segmento'].dropna().unique())
+    seconds, payload = timed(lambda: fii_format.build_table_payload(ordered, segments), args.repeat)
+    results[f'escala.{n}.formatacao'] = point(seconds, len(ordered), 'linhas/s')
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+    template = Environment(loader=FileSystemLoader(ROOT), autoescape=select_autoescape(['html', 'xml'])).get_template('fii_template_tabs.html')
+    seconds, html = timed(lambda: template.render(payload=payload), args.repeat)
+    results[f'escala.{n}.render'] = point(seconds, len(ordered), 'linhas/s') | {'kb': round(len(html.encode('utf-8')) / 1024)}
+    # Modo Top N paginado: seleção parcial + formatação/render só da página visível (25 linhas)
+    def page():
+        engine = fii_ranking.RankingEngine(ranked); frame, _ = engine.ranked_page(ranked, (7, 10, 3, 2), 3, 25, top_n=100)
+        return template.render(payload=fii_format.build_table_payload(frame, segments, page_size=25))
+    seconds, html = timed(page, args.repeat)
+    results[f'escala.{n}.pagina_top_n'] = point(seconds) | {'kb': round(len(html.encode('utf-8')) / 1024)}
+    if n <= args.http_max:
+        with StandInServer(latency=args.latency, universe_size=n) as server:
+            _point_server(server); server.summary_body() # Gera a página antes de medir
+            seconds, fetched = timed(lambda: rank_fiis.fetch_summary_data(rank_fiis.URL_FII_LIST), args.repeat)
+            results[f'escala.{n}.resumo_busca_parse'] = point(seconds, len(fetched), 'FIIs/s')
+
+# --- Rede: detalhes concorrentes com latência/erros ---
+def bench_details(results, args):
+    with StandInServer(latency=args.latency, error_rate=args.error_rate) as server:
+        _point_server(server)
+        papeis = [ticker_for(i) for i in range(args.details)]
+        def fetch(): _forget_details(); return rank_fiis.fetch_missing_details(papeis)
+        seconds, _ = timed(fetch, args.repeat)
+        results['rede.detalhes'] = point(seconds, len(papeis), 'páginas/s') | {'erros_servidos': server.errors_served, 'requisicoes': server.requests_served, 'conexoes': server.connections}
+        # Ponta a ponta (resumo -> limpeza -> filtros -> detalhes -> ranks) em um universo médio
+        server.universe_size = args.e2e_size
+        def end_to_end(): _forget_details(); return rank_fiis.process_data(rank_fiis.fetch_summary_data(rank_fiis.URL_FII_LIST))
+        seconds, final = timed(end_to_end, args.repeat)
+        results[f'rede.ponta_a_ponta.{args.e2e_size}'] = point(seconds, args.e2e_size, 'FIIs/s') | {'selecionados': 0 if final is None else len(final)}
+
+def _point_server(server):
+    rank_fiis.URL_FII_LIST = server.base_url + 'fii_resultado.php'; rank_fiis.BASE_URL_FUNDAMENTUS = fii_compact.FUNDAMENTUS_BASE_URL = server.base_url
+
+
+# --- Linha de base ---
+def compare(results, baseline, tolerance):
+    # Regressão = mais lento que a base além da tolerância E acima do piso de ruído
+    regressions = []
+    for name, entry in results.items():
+        base = baseline.get(name)
+        if not base: continue
+        delta = entry['seconds'] - base['seconds']; ratio = entry['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        entry['vs_base'] = round(ratio, 3)
+        if ratio > 1 + tolerance and delta > NOISE_FLOOR: regressions.append((name, base['seconds'], entry['seconds'], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks offline (servidor local + fixtures + universo sintético).")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="Tamanhos do universo sintético (separados por vírgula)")
+    parser.add_argument('--latency', type=float, default=0.02, help="Latência simulada por requisição (s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fração de respostas 500/503 do servidor local")
+    parser.add_argument('--details', type=int, default=200, help="Páginas de detalhes na medição de rede")
+    parser.add_argument('--e2e-size', type=int, default=2000, help="Universo da medição ponta a ponta com rede")
+    parser.add_argument('--http-max', type=int, default=10_000, help="Maior universo a buscar/parsear via HTTP (read_html de 100k linhas é lento)")
+    parser.add_argument('--repeat', type=int, default=3); parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE); parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--only', choices=['fixtures', 'escala', 'rede'], action='append', help="Roda só estes grupos (repetível)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    fii_http.HTTP_CACHE_ENABLED = False; fii_http.configure(requests_per_second=0) # Mede rede/CPU, não o cache em disco
+    rank_fiis.carregar_tipos_do_json(os.path.join(ROOT, rank_fiis.FII_TYPES_JSON_FILE))
+    groups = set(args.only or ['fixtures', 'escala', 'rede'])
+
+    results = {}; started = time.perf_counter()
+    if 'fixtures' in groups: bench_fixtures(results, args)
+    if 'escala' in groups:
+        for n in (int(s) for s in args.sizes.split(',') if s.strip()): bench_scale(results, n, args)
+    if 'rede' in groups: bench_details(results, args)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f: baseline = json.load(f).get('results', {})
+    regressions = compare(results, baseline, args.tolerance)
+
+    print(f"{'medição':<42s} {'tempo':>10s} {'throughput':>22s} {'vs base':>8s}")
+    for name, entry in results.items():
+        throughput = f"{entry['throughput']:,.0f} {entry['unit']}" if entry.get('throughput') else ''
+        print(f"{name:<42s} {entry['seconds'] * 1000:8.1f}ms {throughput:>22s} {entry.get('vs_base', ''):>8}")
+    report = {'meta': {'data': datetime.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(), 'maquina': platform.machine(),
+                       'cpus': os.cpu_count(), 'latencia': args.latency, 'taxa_erro': args.error_rate, 'repeticoes': args.repeat, 'duracao_s': round(time.perf_counter() - started, 1)},
+              'results': results, 'metricas': fii_metrics.METRICS.to_dict()}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"suite_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados em {path}")
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Linha de base salva em {args.baseline}")
+    if regressions:
+        print(f"\nREGRESSÕES (> {args.tolerance:.0%} mais lento que a base):")
+        for name, base, now, ratio in regressions: print(f"  {name}: {base * 1000:.1f} ms -> {now * 1000:.1f} ms ({ratio:.2f}x)")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# Servidor HTTP local que simula o Fundamentus (latência e taxa de erro configuráveis) para medir throughput offline.
+# Páginas geradas por synthetic.py; com fixtures_dir, serve as páginas gravadas (fii_resultado.html, detalhes/<PAPEL>.html).
+# HTTP/1.1 com keep-alive (conta conexões abertas), gzip quando o cliente aceita e Retry-After opcional nos 429/503.
+# Relatórios gerenciais sintéticos (PDF) em relatorio.pdf?papel=XXXX11 (report_pages páginas).
+import gzip
+import hashlib
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synthetic import render_detail_page, render_report_pdf, render_summary_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+ERROR_STATUSES = (500, 503) # Erros sorteados com probabilidade error_rate (ou error_statuses do construtor)
+
+
+class StandInServer:
+    def __init__(self, latency=0.05, universe_size=400, host='127.0.0.1', port=0, error_rate=0.0, seed=0, fixtures_dir=None, error_statuses=ERROR_STATUSES, retry_after=None, compress=True, report_pages=8):
+        self.latency = latency; self.universe_size = universe_size; self.error_rate = error_rate; self.fixtures_dir = fixtures_dir
+        self.error_statuses = tuple(error_statuses); self.retry_after = retry_after; self.compress = compress; self.report_pages = report_pages
+        self.requests_served = 0; self.errors_served = 0; self.connections = 0; self.bytes_sent = 0; self._lock = threading.Lock(); self._rng = random.Random(seed)
+        self._gzip_cache = {} # ETag -> corpo comprimido
+        self._summary_cache = {} # universe_size -> corpo já codificado (páginas de 100k FIIs levam segundos para gerar)
+        self._report_cache = {} # papel -> PDF
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # Keep-alive: o cliente pode reaproveitar a conexão
+
+            def log_message(self, *args): pass # Silencioso
+
+            def setup(self):
+                super().setup()
+                with server._lock: server.connections += 1
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if server.latency: time.sleep(server.latency)
+                with server._lock:
+                    server.requests_served += 1
+                    fail = server.error_rate > 0 and server._rng.random() < server.error_rate
+                    if fail: server.errors_served += 1; status = server._rng.choice(server.error_statuses)
+                if fail:
+                    self.send_response(status); self.send_header('Content-Length', '0')
+                    if server.retry_after is not None and status in (429, 503): self.send_header('Retry-After', str(server.retry_after))
+                    self.end_headers(); return
+                if parsed.path.endswith('detalhes.php'):
+                    papel = parse_qs(parsed.query).get('papel', ['XXXX11'])[0]
+                    body = server.detail_body(papel)
+                elif parsed.path.endswith('fii_resultado.php'): body = server.summary_body()
+                elif parsed.path.endswith('relatorio.pdf'):
+                    body = server.report_body(parse_qs(parsed.query).get('papel', ['XXXX11'])[0])
+                    self.send_response(200); self.send_header('Content-Type', 'application/pdf'); self.send_header('Content-Length', str(len(body))); self.end_headers()
+                    with server._lock: server.bytes_sent += len(body)
+                    self.wfile.write(body); return
+                else: self.send_error(404); return
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304); self.send_header('ETag', etag); self.end_headers(); return
+                self.send_response(200); self.send_header('Content-Type', 'text/html; charset=ISO-8859-1'); self.send_header('ETag', etag)
+                if server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = server.gzip_body(etag, body); self.send_header('Content-Encoding', 'gzip')
+                with server._lock: server.bytes_sent += len(body)
+                self.send_header('Content-Length', str(len(body))); self.end_headers(); self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler); self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}/"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _fixture(self, *parts):
+        path = os.path.join(self.fixtures_dir, *parts) if self.fixtures_dir else None
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f: return f.read()
+        return None
+
+    def summary_body(self):
+        body = self._fixture('fii_resultado.html')
+        if body is not None: return body
+        with self._lock:
+            if self.universe_size not in self._summary_cache:
+                self._summary_cache[self.universe_size] = render_summary_page(self.universe_size).encode('iso-8859-1', errors='replace')
+            return self._summary_cache[self.universe_size]
+
+    def gzip_body(self, etag, body):
+        with self._lock: cached = self._gzip_cache.get(etag)
+        if cached is None:
+            cached = gzip.compress(body, compresslevel=6)
+            with self._lock: self._gzip_cache[etag] = cached
+        return cached
+
+    def detail_body(self, papel):
+        body = self._fixture('detalhes', os.path.basename(papel) + '.html')
+        return body if body is not None else render_detail_page(papel).encode('iso-8859-1', errors='replace')
+
+    def report_body(self, papel):
+        with self._lock: body = self._report_cache.get(papel)
+        if body is None:
+            body = render_report_pdf(papel, self.report_pages)
+            with self._lock: self._report_cache[papel] = body
+        return body
+
+    def __enter__(self): self._thread.start(); return self
+
+    def __exit__(self, *exc): self.httpd.shutdown(); self.httpd.server_close()
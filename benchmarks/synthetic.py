@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Gerador de páginas sintéticas no formato do Fundamentus (usado pelos benchmarks offline)
+import io
+import random
+
+def ticker_for(i):
+    # Gera tickers únicos no formato AAAA11 a partir de um índice
+    letters = ''
+    for _ in range(4): i, r = divmod(i, 26); letters = chr(ord('A') + r) + letters
+    return letters + '11'
+
+def _br(value, decimals=2):
+    return f"{value:_.{decimals}f}".replace('.', ',').replace('_', '.')
+
+SEGMENTOS = ['Shoppings', 'Lajes Corporativas', 'Logística', 'Imóveis Industriais e Logísticos', 'Títulos e Val. Mob.', 'Híbrido', 'Hospital', 'Hotel', 'Residencial', 'Outros']
+SUMMARY_COLUMNS = ['Papel', 'Segmento', 'Cotação', 'FFO Yield', 'Dividend Yield', 'P/VP', 'Valor de Mercado', 'Liquidez', 'Qtd de imóveis', 'Preço do m2', 'Aluguel por m2', 'Cap Rate', 'Vacância Média']
+
+def summary_rows(n, seed=0, tickers=None):
+    # Linhas do resumo (fii_resultado.php) já como texto no formato brasileiro; `tickers` fixa os códigos
+    rnd = random.Random(seed)
+    for i in range(n):
+        imoveis = rnd.randint(0, 40); vac = rnd.uniform(0, 30) if imoveis else 0.0
+        yield [tickers[i] if tickers else ticker_for(i), rnd.choice(SEGMENTOS), _br(rnd.uniform(5, 150)), _br(rnd.uniform(-2, 15)) + '%', _br(rnd.uniform(0, 18)) + '%',
+               _br(rnd.uniform(0.4, 1.6)), _br(rnd.uniform(1e7, 5e9), 0), _br(rnd.uniform(0, 1e7), 0), str(imoveis),
+               _br(rnd.uniform(0, 20000)), _br(rnd.uniform(0, 200)), _br(rnd.uniform(0, 15)) + '%', _br(vac) + '%']
+
+def render_summary_page(n=400, seed=0, tickers=None):
+    head = ''.join(f'<th><span class="tips">{col}</span></th>' for col in SUMMARY_COLUMNS)
+    body = []
+    for row in summary_rows(n, seed, tickers):
+        cells = [f'<td><span class="tips"><a href="detalhes.php?papel={row[0]}">{row[0]}</a></span></td>'] + [f'<td>{v}</td>' for v in row[1:]]
+        body.append('<tr>' + ''.join(cells) + '</tr>')
+    return f"""<html><head><meta charset="ISO-8859-1"><title>Fundamentus - FIIs</title></head><body>
+<div class="conteudo clearfix"><table id="tabelaResultado" class="resultado">
+<thead><tr>{head}</tr></thead>
+<tbody>
+{chr(10).join(body)}
+</tbody></table></div></body></html>"""
+
+def render_detail_page(papel, seed=None):
+    rnd = random.Random(seed if seed is not None else papel)
+    dia, mes, ano = rnd.randint(1, 28), rnd.randint(1, 12), rnd.choice([2024, 2025])
+    doc_id = rnd.randint(100000, 999999); cnpj = ''.join(str(rnd.randint(0, 9)) for _ in range(14))
+    osc = [_br(rnd.uniform(-5, 5)), _br(rnd.uniform(-10, 10)), _br(rnd.uniform(-30, 30))]
+    return f"""<html><head><meta charset="ISO-8859-1"><title>{papel} - Fundamentus</title></head><body>
+<div class="conteudo clearfix">
+<table class="w728">
+<tr><td class="label w15"><span class="help tips" title="Código da ação">?</span><span class="txt">FII</span></td>
+<td class="data w35"><span class="txt">{papel}</span></td>
+<td class="label w15"><span class="help tips" title="Cotação">?</span><span class="txt">Cotação</span></td>
+<td class="data destaque w15"><span class="txt">{_br(rnd.uniform(5, 150))}</span></td></tr>
+<tr><td class="label"><span class="help tips" title="Último relatório">?</span><span class="txt">Relatório</span></td>
+<td class="data"><span class="txt">{dia:02d}/{mes:02d}/{ano}</span>
+<a href="https://fnet.bmfbovespa.com.br/fnet/publico/downloadDocumento?id={doc_id}" target="_blank"><img src="img/download.png" alt="Download" /></a></td></tr>
+</table>
+<table class="w728">
+<tr><td class="nivel1" colspan="2"><span class="txt">Oscilações</span></td></tr>
+<tr><td class="label w2"><span class="txt">Dia</span></td><td class="data w1"><span class="oscil"><font color="#F75D59">{osc[0]}%</font></span></td></tr>
+<tr><td class="label w2"><span class="txt">Mês</span></td><td class="data w1"><span class="oscil"><font color="#5EFB6E">{osc[1]}%</font></span></td></tr>
+<tr><td class="label w2"><span class="txt">12 meses</span></td><td class="data w1"><span class="oscil"><font color="#5EFB6E">{osc[2]}%</font></span></td></tr>
+</table>
+<div class="docs"><a href="https://fnet.bmfbovespa.com.br/fnet/publico/abrirGerenciadorDocumentosCVM?cnpjFundo={cnpj}" target="_blank">Pesquisar Documentos</a></div>
+</div></body></html>"""
+
+def summary_frame(n, seed=0, block=2000):
+    # DataFrame bruto como o read_html entrega (mesmos dtypes), em escala (10k–100k+): parseia um bloco
+    # de páginas sintéticas e replica com tickers únicos, sem montar/parsear um HTML gigante
+    import pandas as pd
+    base = pd.read_html(io.StringIO(render_summary_page(min(n, block), seed)), decimal=',', thousands='.')[0]
+    base.columns = base.columns.str.strip()
+    df = pd.concat([base] * -(-n // len(base)), ignore_index=True).iloc[:n].copy()
+    df['Papel'] = [ticker_for(i) for i in range(n)]
+    return df
+
+def render_report_pdf(papel, pages=8, seed=None):
+    # Relatório gerencial sintético (PDF via PyMuPDF): campos-chave no texto e uma tabela de rendimentos com grade
+    import pymupdf
+    rnd = random.Random(seed if seed is not None else papel)
+    doc = pymupdf.open()
+    for number in range(pages):
+        page = doc.new_page(); y = 72
+        if number == 0:
+            lines = [f"Relatório Gerencial - {papel}", f"Rendimento por cota: R$ {_br(rnd.uniform(0.3, 1.5))}", f"Vacância física de {_br(rnd.uniform(0, 25), 1)}%",
+                     f"Inadimplência: {_br(rnd.uniform(0, 5), 1)}%", f"Número de cotistas: {_br(rnd.randint(1000, 500000), 0)}", f"Valor patrimonial por cota: R$ {_br(rnd.uniform(50, 150))}"]
+        else: lines = [f"Página {number + 1}: comentário do gestor sobre o portfólio, locatários e mercado de {papel}."] * 30
+        for line in lines: page.insert_text((72, y), line, fontsize=10); y += 16
+        if number == 1: # Tabela com grade (detectável por find_tables)
+            rows = [["Mês", "Rendimento (R$/cota)", "Dividend Yield"]] + [[f"{m:02d}/2025", _br(rnd.uniform(0.3, 1.5)), _br(rnd.uniform(0.5, 1.4)) + "%"] for m in range(1, 7)]
+            top = y + 20
+            for r, row in enumerate(rows):
+                for c, cell in enumerate(row):
+                    rect = pymupdf.Rect(72 + c * 150, top + r * 20, 72 + (c + 1) * 150, top + (r + 1) * 20)
+                    page.draw_rect(rect, color=(0, 0, 0), width=0.5); page.insert_text((rect.x0 + 4, rect.y1 - 6), cell, fontsize=9)
+    data = doc.tobytes(garbage=3, deflate=True); doc.close()
+    return data
+
+def snapshot_history(n=400, days=750, seed=0, start='2022-01-03'):
+    # Histórico sintético de snapshots diários (universo já limpo, como o app grava): cotação em passeio aleatório,
+    # P/VP/DY/liquidez/vacância com deriva lenta, FIIs entrando e saindo. Gera (data, DataFrame) por dia útil.
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed); dates = pd.bdate_range(start, periods=days)
+    tickers = np.array([ticker_for(i) for i in range(n)]); listed = rng.integers(-days // 2, days // 3, n); delisted = listed + rng.integers(days // 2, 2 * days, n)
+    price = rng.uniform(5, 150, n); vp = price / rng.uniform(0.6, 1.3, n); dy = rng.uniform(0.04, 0.16, n)
+    liquidez = rng.lognormal(12.5, 1.5, n); vacancia = np.where(rng.random(n) < 0.3, np.nan, rng.uniform(0, 0.3, n))
+    for day, date in enumerate(dates):
+        daily = rng.normal(0.0002, 0.012, n); price = price * (1 + daily); vp = vp * (1 + rng.normal(0.0001, 0.001, n))
+        dy = np.clip(dy + rng.normal(0, 0.0008, n), 0.0, 0.25); liquidez = liquidez * np.exp(rng.normal(0, 0.05, n))
+        vacancia = np.clip(vacancia + rng.normal(0, 0.002, n), 0, 0.5)
+        alive = (listed <= day) & (day < delisted)
+        yield date.date(), pd.DataFrame({'Papel': tickers[alive], 'Cotação': price[alive].round(2), 'Dividend Yield': dy[alive].round(4), 'P/VP': (price / vp)[alive].round(2),
+                                         'Liquidez': liquidez[alive].round(0), 'Vacância Média': vacancia[alive].round(4),
+                                         'Osc. Dia': np.where(rng.random(n) < 0.5, daily.round(4), np.nan)[alive]})
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+# API HTTP local, somente leitura, servindo o universo em memória do fii_service (o mesmo snapshot do app, sem
+# raspar o Fundamentus por requisição): GET /universe, /ranking?min_pvp=…&peso_dy=…, /fii/{papel} e /status.
+# Cada consulta é normalizada (tipos, padrões de rank_fiis, ordem dos parâmetros) e a resposta fica memoizada por
+# (versão do universo, geração dos detalhes, consulta): corpo JSON, ETag forte (sha1 do corpo, que traz as duas
+# versões) e versão gzip prontos. If-None-Match -> 304. Detalhes (data/links do relatório) chegam depois do universo:
+# no app, pelas buscas das sessões; em `python fii_api.py`, a própria API os busca em segundo plano (fetch_details).
+# Conexões atendidas por um pool fixo de threads (HTTP/1.1 keep-alive).
+# Uso: python fii_api.py [--porta 8502] [--host 127.0.0.1] [--workers 16]
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import fii_compact
+import fii_ranking
+import fii_service
+import rank_fiis
+
+# --- Configurações ---
+HOST = "127.0.0.1" # Só local por padrão (API sem autenticação)
+PORT = 8502
+WORKERS = 16 # Threads do pool = conexões atendidas ao mesmo tempo
+KEEPALIVE_TIMEOUT = 5 # Segundos sem novo pedido numa conexão keep-alive antes de fechá-la (libera o worker)
+MAX_CACHED_RESPONSES = 512 # Respostas memoizadas (LRU); uma versão nova do universo ou dos detalhes descarta as anteriores
+MAX_CACHED_BYTES = 64 * 1024 * 1024 # Soma dos corpos (JSON + gzip) memoizados
+GZIP_MIN_BYTES = 1024 # Corpos menores vão sem compressão
+GZIP_LEVEL = 6
+RETRY_AFTER = 5 # Segundos sugeridos no 503 enquanto o universo ainda não foi carregado
+# Parâmetros de /ranking -> (conversor, padrão). DY em fração (0.08 = 8%), como nos perfis do fii_batch
+RANKING_PARAMS = {
+    'min_pvp': (float, rank_fiis.MIN_PVP), 'max_pvp': (float, rank_fiis.MAX_PVP), 'min_dy': (float, rank_fiis.MIN_DY), 'max_dy': (float, rank_fiis.MAX_DY),
+    'min_liquidez': (float, rank_fiis.MIN_LIQUIDEZ), **{f"peso_{k}": (int, v) for k, v in fii_ranking.DEFAULT_WEIGHTS.items()},
+    'top_n': (int, None), 'pagina': (int, 1), 'por_pagina': (int, None),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message); self.status = status; self.headers = headers or {}
+
+
+class Response:
+    # Corpo JSON pronto para envio, ETag forte e gzip calculado uma vez (na primeira vez que um cliente aceitar)
+    __slots__ = ('body', 'etag', 'last_modified', '_gzip', '_lock')
+
+    def __init__(self, body, timestamp=None):
+        self.body = body; self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.last_modified = formatdate(timestamp, usegmt=True) if timestamp else None
+        self._gzip = None; self._lock = threading.Lock()
+
+    @property
+    def gzip_etag(self): return self.etag[:-1] + '-gzip"' # Representação diferente -> validador forte diferente
+
+    def gzipped(self):
+        with self._lock:
+            if self._gzip is None: self._gzip = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0) # mtime fixo: bytes estáveis
+            return self._gzip
+
+    @property
+    def size(self): return len(self.body) + (len(self._gzip) if self._gzip else 0)
+
+
+def _json_bytes(meta, frame=None, single=False):
+    # Envelope {meta..., "dados": [...]}: metadados via json, linhas via DataFrame.to_json (NaN/NA -> null, em C).
+    # single: "dados" é o objeto da primeira linha. Links e data no formato de exibição (fii_compact.expand)
+    text = json.dumps(meta, ensure_ascii=False, default=str)
+    if frame is not None:
+        rows = fii_compact.expand(frame.iloc[:1] if single else frame); rows = rows.to_json(orient='records', force_ascii=False, date_format='iso')
+        text = text[:-1] + ', "dados": ' + (rows[1:-1] if single else rows) + '}'
+    return text.encode('utf-8')
+
+def normalize_ranking_query(query):
+    # dict de parse_qs -> tupla canônica (todos os parâmetros, na ordem de RANKING_PARAMS, já convertidos).
+    # "min_pvp=0.70&peso_dy=10" e "peso_dy=10&min_pvp=0.7" viram a mesma chave.
+    unknown = sorted(set(query) - set(RANKING_PARAMS))
+    if unknown: raise ApiError(400, f"Parâmetros desconhecidos: {', '.join(unknown)} (aceitos: {', '.join(RANKING_PARAMS)}).")
+    values = []
+    for name, (convert, default) in RANKING_PARAMS.items():
+        raw = query.get(name, [None])[-1]
+        if raw in (None, ''): values.append(default if default is None else convert(default)); continue # Mesmo tipo do valor informado
+        try: value = convert(float(raw)) if convert is int and float(raw).is_integer() else convert(raw)
+        except ValueError: raise ApiError(400, f"Valor inválido para '{name}': {raw!r}.")
+        if isinstance(value, float) and not math.isfinite(value) or value < 0: raise ApiError(400, f"Valor inválido para '{name}': {raw!r}.")
+        values.append(value)
+    params = dict(zip(RANKING_PARAMS, values))
+    if not any(params[f"peso_{k}"] for k in fii_ranking.DEFAULT_WEIGHTS): raise ApiError(400, "Ao menos um peso deve ser maior que zero.")
+    if params['pagina'] < 1 or params['por_pagina'] == 0 or params['top_n'] == 0: raise ApiError(400, "pagina, por_pagina e top_n devem ser >= 1.")
+    return tuple(values)
+
+
+class FiiApi:
+    # Lógica da API (sem HTTP): rota + consulta -> Response memoizada por ((versão do universo, geração dos detalhes), consulta normalizada).
+    # fetch_details=True: sem o app para buscar os detalhes, a primeira consulta de cada versão do universo dispara a
+    # busca dos que faltam (em segundo plano; as respostas são refeitas quando eles chegam)
+    def __init__(self, service=None, max_entries=MAX_CACHED_RESPONSES, max_bytes=MAX_CACHED_BYTES, memoize=True, fetch_details=False):
+        self.service = service or fii_service.UniverseService().start()
+        self.max_entries = max_entries; self.max_bytes = max_bytes; self.memoize = memoize
+        self.fetch_details = fetch_details; self._details_version = None
+        self._cache = OrderedDict(); self._cache_bytes = 0; self._cache_version = None; self._lock = threading.Lock()
+        self.stats = {'requisicoes': 0, 'memo_hits': 0, 'memo_misses': 0, 'nao_modificado': 0, 'gzip': 0, 'erros': 0}
+
+    def _count(self, key, amount=1):
+        with self._lock: self.stats[key] += amount
+
+    def route(self, path, query):
+        # (rota, chave normalizada) sem depender do universo; erros de parâmetro saem aqui (não vão ao cache)
+        parts = [unquote(p) for p in path.strip('/').split('/') if p]
+        if parts == ['universe']: return 'universe', ()
+        if parts == ['ranking']: return 'ranking', normalize_ranking_query(query)
+        if len(parts) == 2 and parts[0] == 'fii' and parts[1].strip(): return 'fii', (parts[1].strip().upper(),)
+        if parts == ['status']: return 'status', ()
+        raise ApiError(404, f"Rota não encontrada: /{'/'.join(parts)} (use /universe, /ranking, /fii/{{papel}} ou /status).")
+
+    def get(self, path, query):
+        self._count('requisicoes')
+        endpoint, key = self.route(path, query)
+        if endpoint == 'status': return Response(_json_bytes({'servico': self.service.status(), 'api': dict(self.stats), 'memo': len(self._cache)}))
+        universe, timestamp, version = self.service.snapshot()
+        if universe is None:
+            self.service.refresh(wait=False)
+            raise ApiError(503, "Universo ainda não carregado; tente de novo em instantes.", {'Retry-After': str(RETRY_AFTER)})
+        if self.fetch_details: self._fill_details(universe, version)
+        cache_key = (endpoint, key); version = (version, rank_fiis.details_generation()) # Lida antes de montar a resposta
+        if self.memoize:
+            with self._lock:
+                if self._cache_version != version: self._cache.clear(); self._cache_bytes = 0; self._cache_version = version
+                response = self._cache.get(cache_key)
+                if response is not None: self._cache.move_to_end(cache_key); self.stats['memo_hits'] += 1; return response
+        self._count('memo_misses')
+        response = Response(getattr(self, f"_{endpoint}")(universe, timestamp, version, *key), timestamp)
+        if self.memoize: self._remember(cache_key, version, response)
+        return response
+
+    def _fill_details(self, universe, version):
+        # Uma busca por versão do universo; fetch_missing_details só vai à rede pelos ausentes/vencidos
+        with self._lock:
+            if self._details_version == version: return
+            self._details_version = version
+        threading.Thread(target=rank_fiis.fetch_missing_details, args=(list(universe['Papel']),), name="fii-api-details", daemon=True).start()
+
+    def _remember(self, cache_key, version, response):
+        with self._lock:
+            if self._cache_version != version: return # Universo/detalhes mudaram durante o cálculo: não guarda resposta velha
+            if cache_key in self._cache: self._cache_bytes -= self._cache[cache_key].size
+            self._cache[cache_key] = response; self._cache_bytes += response.size
+            while len(self._cache) > self.max_entries or self._cache_bytes > self.max_bytes and len(self._cache) > 1:
+                _, old = self._cache.popitem(last=False); self._cache_bytes -= old.size
+
+    def gzip_stored(self, response):
+        # Corpo gzip recém-calculado passa a contar no limite de bytes do cache
+        before = response._gzip is None; body = response.gzipped()
+        if before and self.memoize:
+            with self._lock: self._cache_bytes += len(body)
+        return body
+
+    # --- Rotas ---
+    @staticmethod
+    def _meta(timestamp, version, **extra):
+        # version = (versão do universo, geração dos detalhes): as duas entram no corpo e, portanto, na ETag
+        universe_version, details_version = version
+        return {'versao': universe_version, 'versao_detalhes': details_version, 'atualizado_em': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(timestamp)), **extra}
+
+    def _universe(self, universe, timestamp, version):
+        frame = rank_fiis.order_columns(rank_fiis.attach_details(universe, fetch_missing=False)) # Detalhes já conhecidos, sem rede
+        return _json_bytes(self._meta(timestamp, version, fiis=len(frame)), frame)
+
+    def _ranking(self, universe, timestamp, version, *values):
+        params = dict(zip(RANKING_PARAMS, values)); weights = tuple(params[f"peso_{k}"] for k in fii_ranking.DEFAULT_WEIGHTS)
+        df = rank_fiis.filter_and_rank(universe, params['min_pvp'], params['max_pvp'], params['min_dy'], params['max_dy'], params['min_liquidez'])
+        meta = self._meta(timestamp, version, parametros=params)
+        if df is None or df.empty: return _json_bytes({**meta, 'total': 0, 'dados': []})
+        engine = fii_ranking.get_engine(df, key=(version[0], *(params[k] for k in ('min_pvp', 'max_pvp', 'min_dy', 'max_dy', 'min_liquidez'))))
+        if params['por_pagina']:
+            ranked, total = engine.ranked_page(df, weights, params['pagina'] - 1, params['por_pagina'], top_n=params['top_n'])
+            first = (params['pagina'] - 1) * params['por_pagina'] + 1
+        else: ranked = engine.ranked_frame(df, weights, top_n=params['top_n']); total = len(ranked); first = 1
+        frame = rank_fiis.order_columns(rank_fiis.attach_details(ranked, fetch_missing=False)).assign(**{fii_ranking.SCORE_COLUMN: ranked[fii_ranking.SCORE_COLUMN]})
+        frame.insert(0, 'Posição', range(first, first + len(frame)))
+        return _json_bytes({**meta, 'total': total}, frame)
+
+    def _fii(self, universe, timestamp, version, papel):
+        row = universe[universe['Papel'] == papel]
+        if row.empty: raise ApiError(404, f"FII '{papel}' não encontrado no universo atual.")
+        frame = rank_fiis.order_columns(rank_fiis.attach_details(row, fetch_missing=False))
+        return _json_bytes(self._meta(timestamp, version, papel=papel), frame, single=True)
+
+
+# --- HTTP ---
+def _accepts_gzip(header):
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip().lower() in ('gzip', '*'): return params.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+def _etag_matches(header, *etags):
+    # If-None-Match usa comparação fraca (ignora W/); "*" casa com qualquer representação
+    if not header: return False
+    tags = {t.strip().removeprefix('W/') for t in header.split(',')}
+    return '*' in tags or any(e in tags for e in etags)
+
+
+class PooledHTTPServer(HTTPServer):
+    # Conexões atendidas por um pool fixo de threads (ThreadingHTTPServer cria uma thread por conexão, sem limite)
+    request_queue_size = 256
+
+    def __init__(self, address, handler, workers=WORKERS):
+        super().__init__(address, handler); self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fii-api')
+
+    def process_request(self, request, client_address): self._pool.submit(self._work, request, client_address)
+
+    def _work(self, request, client_address):
+        try: self.finish_request(request, client_address)
+        except Exception: self.handle_error(request, client_address)
+        finally: self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close(); self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1' # Keep-alive
+        timeout = KEEPALIVE_TIMEOUT
+        disable_nagle_algorithm = True # TCP_NODELAY: cabeçalho e corpo saem em escritas separadas (sem atraso de ACK)
+        server_version = f"rank_fiis-api/{rank_fiis.SCRIPT_VERSION}"
+
+        def log_message(self, *args): pass # Sem log por requisição (alto volume); erros vão para o logging
+
+        def do_GET(self): self._serve(send_body=True)
+
+        def do_HEAD(self): self._serve(send_body=False)
+
+        def _serve(self, send_body):
+            url = urlsplit(self.path)
+            try: response = api.get(url.path, parse_qs(url.query, keep_blank_values=True))
+            except ApiError as e: return self._error(e.status, str(e), e.headers, send_body)
+            except Exception as e:
+                logging.exception(f"Erro na API ({self.path})"); return self._error(500, f"Erro interno: {e}", None, send_body)
+            use_gzip = len(response.body) >= GZIP_MIN_BYTES and _accepts_gzip(self.headers.get('Accept-Encoding'))
+            etag = response.gzip_etag if use_gzip else response.etag
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'} # no-cache: clientes revalidam (304 é barato)
+            if response.last_modified: headers['Last-Modified'] = response.last_modified
+            if _etag_matches(self.headers.get('If-None-Match'), response.etag, response.gzip_etag):
+                api._count('nao_modificado'); return self._send(304, headers, b'', send_body)
+            body = response.body
+            if use_gzip: body = api.gzip_stored(response); headers['Content-Encoding'] = 'gzip'; api._count('gzip')
+            self._send(200, {'Content-Type': 'application/json; charset=utf-8', **headers}, body, send_body)
+
+        def _error(self, status, message, headers, send_body):
+            api._count('erros'); self._send(status, {'Content-Type': 'application/json; charset=utf-8', 'Cache-Control': 'no-store', **(headers or {})}, _json_bytes({'erro': message}), send_body)
+
+        def _send(self, status, headers, body, send_body):
+            self.send_response(status)
+            for name, value in headers.items(): self.send_header(name, value)
+            if status != 304: self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if send_body and body: self.wfile.write(body)
+
+    return Handler
+
+
+class ApiServer:
+    # Servidor em thread própria (para embutir no app ou em testes de carga); `with ApiServer(...) as server:`
+    def __init__(self, api=None, host=HOST, port=PORT, workers=WORKERS):
+        self.api = api or FiiApi()
+        self.httpd = PooledHTTPServer((host, port), make_handler(self.api), workers)
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}/"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fii-api", daemon=True)
+
+    def start(self): self._thread.start(); return self
+
+    def stop(self): self.httpd.shutdown(); self.httpd.server_close()
+
+    def __enter__(self): return self.start()
+
+    def __exit__(self, *exc): self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP local (somente leitura) com o ranking de FIIs.")
+    parser.add_argument('--host', default=HOST, help=f"Endereço (padrão: {HOST}; a API não tem autenticação)")
+    parser.add_argument('--porta', type=int, default=PORT, help=f"Porta (padrão: {PORT})")
+    parser.add_argument('--workers', type=int, default=WORKERS, help=f"Threads do pool de conexões (padrão: {WORKERS})")
+    args = parser.parse_args(argv)
+
+    rank_fiis.carregar_tipos_do_json()
+    service = fii_service.UniverseService().start()
+    if service.refresh(wait=True) is None: logging.error("Não foi possível carregar o universo inicial."); return 1
+    server = ApiServer(FiiApi(service, fetch_details=True), args.host, args.porta, args.workers) # Sem o app, a API busca os detalhes
+    logging.info(f"API em {server.base_url} (/universe, /ranking, /fii/{{papel}}, /status); Ctrl+C para sair.")
+    logging.getLogger().setLevel(logging.WARNING) # Filtro/ranking logam em INFO a cada consulta não memoizada
+    try: server.httpd.serve_forever()
+    except KeyboardInterrupt: pass
+    finally: server.httpd.server_close(); service.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
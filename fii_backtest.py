@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+# Backtest da estratégia de ranking sobre os snapshots diários (fii_snapshots): a cada rebalanceamento, reaplica
+# filtros e pesos ao universo daquela data e compra os N primeiros em pesos iguais, mantidos até o próximo
+# rebalanceamento. Retorno de cada período = variação da Cotação entre snapshots (Osc. Dia quando falta a cotação
+# e os snapshots são de pregões seguidos) + proventos estimados pelo Dividend Yield pro rata.
+# Os snapshots viram um painel colunar (datas x tickers, um array NumPy por campo) que os processos da grade abrem
+# com memory-map; os ranks de todas as datas de um filtro saem de um argsort por linha e todos os vetores de pesos
+# são avaliados de uma vez (um produto matricial), como em fii_ranking.
+# Uso: python fii_backtest.py [grade.yaml] [--inicio AAAA-MM-DD] [--fim AAAA-MM-DD] [--processos 4] [--saida backtest.csv]
+import argparse
+import functools
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import fii_batch
+import fii_export
+import fii_metrics
+import fii_ranking
+import fii_snapshots
+import rank_fiis
+
+# --- Configurações ---
+PANEL_FIELDS = {'Cotação': 'cotacao', 'P/VP': 'pvp', 'Dividend Yield': 'dy', 'Liquidez': 'liquidez', 'Vacância Média': 'vacancia', 'Osc. Dia': 'osc_dia'}
+# Ordem de fii_ranking.RANK_COLUMNS: (campo, crescente, ausente conta como melhor), como em rank_fiis._compute_ranks
+RANK_SPECS = (('pvp', True, False), ('dy', False, False), ('liquidez', False, False), ('vacancia', True, True))
+FILTER_KEYS = ('min_pvp', 'max_pvp', 'min_dy', 'max_dy', 'min_liquidez')
+WEIGHT_KEYS = tuple(fii_ranking.DEFAULT_WEIGHTS) # pvp, dy, liquidez, vacancia
+DEFAULT_TOP_N = 10
+DEFAULT_REBALANCE = 21 # Snapshots entre rebalanceamentos (~1 mês de pregões)
+DEFAULT_COST_BPS = 10.0 # Custo por lado (compra ou venda), em pontos-base do valor negociado
+INCLUDE_DIVIDENDS = True # Soma DY x dias/365,25 ao retorno de cada período (o resumo não traz proventos pagos)
+OSC_DIA_MAX_GAP = 4 # Dias corridos entre snapshots para usar Osc. Dia como retorno (fim de semana + feriado)
+DAYS_PER_YEAR = 365.25
+MIN_GROWTH = 1e-6 # Piso do crescimento por período (cotação zerada), para o acumulado nunca virar zero
+MAX_CELLS = 8_000_000 # Datas x FIIs x vetores de pesos por bloco de scores (limita a memória por processo)
+OUTPUT_FILENAME = "backtest.csv"
+RESULT_COLUMNS = ['Retorno Total', 'CAGR', 'Volatilidade', 'Sharpe', 'Drawdown Máximo', 'Giro Médio', 'FIIs Médio']
+
+
+# --- Painel colunar ---
+class Panel:
+    # Histórico em arrays: datas (T, datetime64[D]), tickers (n, ordem alfabética como no resumo) e um float64 T x n
+    # por campo de PANEL_FIELDS (NaN = FII fora do snapshot), mais o crescimento de cada FII por período ((T-1) x n)
+    def __init__(self, dates, tickers, fields, growth=None, dividends=INCLUDE_DIVIDENDS):
+        self.dates = dates; self.tickers = tickers; self.fields = fields
+        self.growth = period_growth(self, dividends) if growth is None else growth
+
+    @property
+    def T(self): return len(self.dates)
+
+    @property
+    def n(self): return len(self.tickers)
+
+    @functools.cached_property
+    def cumulative(self):
+        # T x n: crescimento acumulado desde o primeiro snapshot (crescimento de t0 a t = C[t] / C[t0])
+        return np.vstack([np.ones((1, self.n)), np.cumprod(np.maximum(self.growth, MIN_GROWTH), axis=0)])
+
+    def save(self, directory):
+        # Um .npy por array (sem pickle), para np.load(mmap_mode='r') nos processos da grade
+        os.makedirs(directory, exist_ok=True)
+        arrays = {'datas': self.dates, 'tickers': self.tickers, 'crescimento': self.growth, **self.fields}
+        for name, array in arrays.items(): np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        load = lambda name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        return cls(load('datas'), load('tickers'), {f: load(f) for f in PANEL_FIELDS.values()}, load('crescimento'))
+
+def period_growth(panel, dividends=INCLUDE_DIVIDENDS):
+    # (T-1) x n: 1 + retorno de cada FII entre snapshots seguidos. Sem cotação nas duas pontas: Osc. Dia do snapshot
+    # seguinte se o intervalo for de um pregão; sem nada: 1 (posição parada, como caixa)
+    price = panel.fields['cotacao']; gaps = np.diff(panel.dates).astype('timedelta64[D]').astype(np.int64)
+    with np.errstate(divide='ignore', invalid='ignore'): returns = price[1:] / price[:-1] - 1
+    returns[~np.isfinite(returns)] = np.nan
+    fallback = np.isnan(returns) & (gaps <= OSC_DIA_MAX_GAP)[:, None]
+    returns[fallback] = panel.fields['osc_dia'][1:][fallback]
+    if dividends: returns += np.nan_to_num(panel.fields['dy'][:-1]) * (gaps / DAYS_PER_YEAR)[:, None]
+    return 1.0 + np.nan_to_num(returns)
+
+def load_panel(start=None, end=None, base_dir=None, dividends=INCLUDE_DIVIDENDS):
+    # Lê só as colunas do backtest (scan memory-mapped do fii_snapshots) e espalha em arrays datas x tickers
+    import pyarrow as pa
+    with fii_metrics.stage('backtest.painel'):
+        table = fii_snapshots.read_snapshots(columns=list(PANEL_FIELDS), start=start, end=end, base_dir=base_dir, as_table=True)
+        if table is None or table.num_rows == 0: return None
+        date_codes, dates = pd.factorize(table.column(fii_snapshots.PARTITION_KEY).to_numpy(), sort=True)
+        ticker_codes, tickers = pd.factorize(table.column('Papel').to_numpy(zero_copy_only=False), sort=True)
+        shape = (len(dates), len(tickers)); fields = {}
+        for column, name in PANEL_FIELDS.items():
+            fields[name] = np.full(shape, np.nan)
+            if column in table.column_names: fields[name][date_codes, ticker_codes] = table.column(column).cast(pa.float64()).to_numpy(zero_copy_only=False)
+        panel = Panel(np.asarray(dates, dtype='datetime64[D]'), np.asarray(tickers, dtype=str), fields, dividends=dividends)
+    logging.info(f"Painel do backtest: {panel.T} snapshots x {panel.n} FIIs ({panel.dates[0]} a {panel.dates[-1]}).")
+    return panel
+
+
+# --- Ranking vetorizado por data ---
+def filter_mask(panel, rows, min_pvp, max_pvp, min_dy, max_dy, min_liquidez):
+    # B x n: FIIs que passam pelos filtros em cada data de `rows` (mesmas regras de rank_fiis.filter_universe)
+    pvp = panel.fields['pvp'][rows]; dy = panel.fields['dy'][rows]; liquidez = panel.fields['liquidez'][rows]
+    with np.errstate(invalid='ignore'): return (pvp >= min_pvp) & (pvp <= max_pvp) & (dy >= min_dy) & (dy <= max_dy) & (liquidez >= min_liquidez)
+
+def rank_tensor(panel, rows, mask):
+    # B x n x 4 (int32): Rank_* de cada data sobre os FIIs do filtro, com method='first' (empate pela ordem dos
+    # tickers); fora do filtro o valor é irrelevante. Um argsort estável por linha e campo.
+    B, n = mask.shape; ranks = np.zeros((B, n, len(RANK_SPECS)), dtype=np.int32)
+    slots = np.broadcast_to(np.arange(1, n + 1, dtype=np.int32), (B, n)); lines = np.arange(B)[:, None]
+    for j, (field, ascending, missing_first) in enumerate(RANK_SPECS):
+        key = panel.fields[field][rows]; key = key if ascending else -key
+        if missing_first: key = np.where(np.isnan(key), -np.inf, key)
+        order = np.argsort(np.where(mask, key, np.inf), axis=1, kind='stable')
+        ranks[lines, order, j] = slots
+    return ranks
+
+def select_top(ranks, mask, weights, top_n):
+    # (B x k x N posições, B x k x N válidas): os N menores scores de cada data e vetor de pesos, em ordem, com o
+    # empate desfeito pela ordem dos tickers (mesma chave de RankingEngine.order). Vetores de pesos em blocos.
+    B, n, _ = ranks.shape; weights = np.asarray(weights, dtype=np.int64); k = len(weights); N = max(1, min(int(top_n), n))
+    max_key = (n * int(weights.sum(axis=1).max(initial=0)) + 1) * n
+    dtype = np.int32 if max_key < np.iinfo(np.int32).max else np.int64
+    typed = ranks.astype(dtype, copy=False); tie = np.arange(n, dtype=dtype)[None, :, None]; outside = ~mask
+    positions = np.empty((B, k, N), dtype=np.intp); chunk = max(1, MAX_CELLS // max(B * n, 1))
+    for s in range(0, k, chunk):
+        keys = typed @ weights[s:s + chunk].T.astype(dtype) # B x n x c
+        keys *= n; keys += tie; keys[outside] = np.iinfo(dtype).max
+        part = np.argpartition(keys, N - 1, axis=1)[:, :N] if N < n else np.broadcast_to(np.arange(n)[None, :, None], keys.shape)
+        part = np.take_along_axis(part, np.argsort(np.take_along_axis(keys, part, axis=1), axis=1), axis=1)
+        positions[:, s:s + chunk] = part.transpose(0, 2, 1)
+    return positions, mask[np.arange(B)[:, None, None], positions]
+
+
+# --- Simulação ---
+def simulate(cumulative, positions, valid, starts, cost_bps=DEFAULT_COST_BPS):
+    # Carteiras de pesos iguais compradas em cada início (starts) e mantidas até o próximo, para k vetores de pesos de
+    # uma vez: acumulado do bloco (L x n) @ participação / acumulado no início (n x k). Custo sobre a fração
+    # negociada (vendas + compras). Devolve (valor T x k, giro médio, FIIs médio).
+    T1 = len(cumulative) - 1; B, k, N = positions.shape; lines = np.arange(k)[:, None]
+    values = np.empty((T1 + 1, k)); values[0] = 1.0; level = np.ones(k)
+    traded_sum = np.zeros(k); held_sum = np.zeros(k); previous = None
+    for b, (t0, t1) in enumerate(zip(starts, list(starts[1:]) + [T1])):
+        members = np.zeros((k, cumulative.shape[1])); members[lines, positions[b]] = valid[b]; count = members.sum(axis=1)
+        if previous is None: traded = np.minimum(count, 1)
+        else:
+            kept = (members * previous).sum(axis=1); previous_count = previous.sum(axis=1)
+            traded = (count - kept) / np.maximum(count, 1) + (previous_count - kept) / np.maximum(previous_count, 1)
+        level = level * (1 - cost_bps / 1e4 * traded)
+        path = cumulative[t0 + 1:t1 + 1] @ (members / cumulative[t0]).T # L x k: soma do crescimento dos FIIs da carteira desde t0
+        values[t0 + 1:t1 + 1] = level * np.where(count > 0, path / np.maximum(count, 1), 1.0); level = values[t1]
+        traded_sum += traded; held_sum += count; previous = members
+    return values, traded_sum / B, held_sum / B
+
+def summarize(values, dates):
+    # Métricas por coluna de `values` (T x k): retorno total, CAGR, volatilidade e Sharpe anualizados (sem taxa livre
+    # de risco), drawdown máximo
+    years = max(int((dates[-1] - dates[0]).astype('timedelta64[D]').astype(np.int64)) / DAYS_PER_YEAR, 1 / DAYS_PER_YEAR)
+    final = values[-1]; returns = values[1:] / values[:-1] - 1; per_year = len(returns) / years
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where(final > 0, np.power(np.maximum(final, 0), 1 / years) - 1, -1.0)
+        volatility = returns.std(axis=0, ddof=1 if len(returns) > 1 else 0) * np.sqrt(per_year)
+        sharpe = np.where(volatility > 0, returns.mean(axis=0) * per_year / volatility, np.nan)
+    drawdown = (values / np.maximum.accumulate(values, axis=0) - 1).min(axis=0)
+    return {'Retorno Total': final - 1, 'CAGR': cagr, 'Volatilidade': volatility, 'Sharpe': sharpe, 'Drawdown Máximo': drawdown}
+
+def evaluate(panel, filters, weights, top_ns=(DEFAULT_TOP_N,), rebalances=(DEFAULT_REBALANCE,), cost_bps=DEFAULT_COST_BPS, keep_values=False):
+    # Um filtro, vários vetores de pesos / N / frequências: ranks calculados uma vez nas datas de rebalanceamento
+    starts = {f: np.arange(0, panel.T - 1, f) for f in rebalances}
+    rows = np.unique(np.concatenate(list(starts.values())))
+    mask = filter_mask(panel, rows, **filters)
+    positions, valid = select_top(rank_tensor(panel, rows, mask), mask, weights, max(top_ns))
+    results = []
+    for rebalance, first in starts.items():
+        lines = np.searchsorted(rows, first)
+        for top_n in top_ns:
+            values, turnover, held = simulate(panel.cumulative, positions[lines, :, :top_n], valid[lines, :, :top_n], first, cost_bps)
+            metrics = summarize(values, panel.dates)
+            for i, w in enumerate(weights):
+                row = {**filters, **{f"peso_{key}": int(v) for key, v in zip(WEIGHT_KEYS, w)}, 'top_n': top_n, 'rebalanceamento': rebalance}
+                row.update({name: float(m[i]) for name, m in metrics.items()}); row['Giro Médio'] = float(turnover[i]); row['FIIs Médio'] = float(held[i])
+                if keep_values: row['valores'] = pd.Series(values[:, i], index=pd.DatetimeIndex(panel.dates), name='Valor da Carteira')
+                results.append(row)
+    return results
+
+def backtest(panel, filters=None, weights=None, top_n=DEFAULT_TOP_N, rebalance=DEFAULT_REBALANCE, cost_bps=DEFAULT_COST_BPS):
+    # Uma estratégia (padrões de rank_fiis e pesos do app): (série do valor da carteira, métricas)
+    filters = {**default_filters(), **(filters or {})}; weights = tuple(weights or fii_ranking.DEFAULT_WEIGHTS.values())
+    row = evaluate(panel, filters, [weights], (top_n,), (rebalance,), cost_bps, keep_values=True)[0]
+    return row.pop('valores'), row
+
+def universe_benchmark(panel):
+    # Referência: todos os FIIs com cotação, pesos iguais rebalanceados a cada período
+    has_price = ~np.isnan(panel.fields['cotacao'][:-1])
+    with np.errstate(invalid='ignore'): period = np.where(has_price.any(axis=1), (panel.growth * has_price).sum(axis=1) / np.maximum(has_price.sum(axis=1), 1), 1.0)
+    values = np.concatenate([[1.0], np.cumprod(period)])[:, None]
+    return {name: float(m[0]) for name, m in summarize(values, panel.dates).items()}
+
+
+# --- Grade de parâmetros ---
+def default_filters():
+    return {'min_pvp': rank_fiis.MIN_PVP, 'max_pvp': rank_fiis.MAX_PVP, 'min_dy': rank_fiis.MIN_DY, 'max_dy': rank_fiis.MAX_DY, 'min_liquidez': rank_fiis.MIN_LIQUIDEZ}
+
+def _as_list(value): return list(value) if isinstance(value, (list, tuple)) else [value]
+
+def normalize_grid(raw=None):
+    # Cada chave aceita um valor ou uma lista (produto cartesiano). pesos: {pvp: [5, 10], dy: 10, ...} (produto) ou
+    # lista de vetores ({pvp: 7, ...} ou [7, 10, 3, 2]). Campos omitidos usam os padrões de rank_fiis e do app.
+    raw = dict(raw or {})
+    unknown = set(raw) - set(FILTER_KEYS) - {'pesos', 'top_n', 'rebalanceamento', 'custo_bps', 'proventos'}
+    if unknown: raise ValueError(f"Chaves desconhecidas na grade: {sorted(unknown)}.")
+    grid = {key: [float(v) for v in _as_list(raw.get(key, default))] for key, default in default_filters().items()}
+    weights = raw.get('pesos')
+    if weights is None or isinstance(weights, dict):
+        options = {**{k: [v] for k, v in fii_ranking.DEFAULT_WEIGHTS.items()}, **{k: _as_list(v) for k, v in (weights or {}).items()}}
+        if set(options) - set(WEIGHT_KEYS): raise ValueError(f"Pesos desconhecidos na grade: {sorted(set(options) - set(WEIGHT_KEYS))}.")
+        vectors = list(itertools.product(*(options[k] for k in WEIGHT_KEYS)))
+    else: vectors = [tuple({**fii_ranking.DEFAULT_WEIGHTS, **w}[k] for k in WEIGHT_KEYS) if isinstance(w, dict) else tuple(w) for w in weights]
+    grid['pesos'] = [tuple(int(v) for v in w) for w in dict.fromkeys(vectors)]
+    if any(len(w) != len(WEIGHT_KEYS) or min(w) < 0 or not any(w) for w in grid['pesos']): raise ValueError("Cada vetor de pesos precisa de 4 valores não negativos, não todos zero.")
+    grid['top_n'] = sorted({int(v) for v in _as_list(raw.get('top_n', DEFAULT_TOP_N))})
+    grid['rebalanceamento'] = sorted({int(v) for v in _as_list(raw.get('rebalanceamento', DEFAULT_REBALANCE))})
+    if min(grid['top_n']) < 1 or min(grid['rebalanceamento']) < 1: raise ValueError("top_n e rebalanceamento devem ser >= 1.")
+    grid['custo_bps'] = float(raw.get('custo_bps', DEFAULT_COST_BPS)); grid['proventos'] = bool(raw.get('proventos', INCLUDE_DIVIDENDS))
+    return grid
+
+def grid_size(grid):
+    return int(np.prod([len(grid[k]) for k in FILTER_KEYS])) * len(grid['pesos']) * len(grid['top_n']) * len(grid['rebalanceamento'])
+
+def build_tasks(grid, workers=1):
+    # Uma tarefa por combinação de filtros (ranks reaproveitados por todos os pesos); pesos divididos em blocos quando
+    # há menos filtros que processos
+    filters = [dict(zip(FILTER_KEYS, values)) for values in itertools.product(*(grid[k] for k in FILTER_KEYS))]
+    filters = [f for f in filters if f['min_pvp'] <= f['max_pvp'] and f['min_dy'] <= f['max_dy']]
+    pieces = max(1, min(len(grid['pesos']), -(-2 * max(1, workers) // max(len(filters), 1))))
+    size = -(-len(grid['pesos']) // pieces)
+    return [(f, grid['pesos'][i:i + size], grid['top_n'], grid['rebalanceamento'], grid['custo_bps']) for f in filters for i in range(0, len(grid['pesos']), size)]
+
+
+# --- Trabalho dos processos (funções de módulo para serem serializáveis) ---
+_WORKER_PANEL = None
+
+def _init_worker(directory):
+    # Cada processo abre o painel com memory-map (páginas compartilhadas via cache do SO, nada é copiado por tarefa)
+    global _WORKER_PANEL; _WORKER_PANEL = Panel.load(directory)
+    logging.getLogger().setLevel(logging.WARNING)
+
+def _run_task(task, panel=None):
+    filters, weights, top_ns, rebalances, cost_bps = task
+    return evaluate(_WORKER_PANEL if panel is None else panel, filters, weights, top_ns, rebalances, cost_bps)
+
+def sweep(grid=None, panel=None, workers=None, start=None, end=None, base_dir=None, progress_callback=None):
+    # Avalia toda a grade; DataFrame com uma linha por combinação, ordenado pelo Sharpe
+    grid = normalize_grid(grid)
+    panel = panel if panel is not None else load_panel(start, end, base_dir, grid['proventos'])
+    if panel is None or panel.T < 2: raise ValueError("O backtest precisa de pelo menos dois snapshots (fii_snapshots).")
+    workers = max(1, workers or os.cpu_count() or 1); tasks = build_tasks(grid, workers); workers = min(workers, len(tasks)); rows = []
+    with fii_metrics.stage('backtest.simulacao'):
+        if workers == 1:
+            for done, task in enumerate(tasks, start=1):
+                rows.extend(_run_task(task, panel))
+                if progress_callback: progress_callback(done, len(tasks))
+        else:
+            with tempfile.TemporaryDirectory(prefix='fii_backtest_') as directory:
+                panel.save(directory)
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory,)) as pool:
+                    for done, part in enumerate(pool.map(_run_task, tasks), start=1):
+                        rows.extend(part)
+                        if progress_callback: progress_callback(done, len(tasks))
+    frame = pd.DataFrame(rows, columns=list(FILTER_KEYS) + [f"peso_{k}" for k in WEIGHT_KEYS] + ['top_n', 'rebalanceamento'] + RESULT_COLUMNS)
+    return frame.sort_values('Sharpe', ascending=False, na_position='last', kind='stable').reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest do ranking de FIIs sobre os snapshots diários, com grade de parâmetros.")
+    parser.add_argument('grade', nargs='?', help="Grade de parâmetros (.yaml/.yml ou .json); sem arquivo, testa os padrões atuais")
+    parser.add_argument('--inicio', help="Primeira data (AAAA-MM-DD)"); parser.add_argument('--fim', help="Última data (AAAA-MM-DD)")
+    parser.add_argument('--snapshots', default=fii_snapshots.SNAPSHOT_DIR, help=f"Pasta dos snapshots (padrão: {fii_snapshots.SNAPSHOT_DIR})")
+    parser.add_argument('--processos', type=int, default=None, help="Processos da grade (padrão: nº de CPUs)")
+    parser.add_argument('--saida', default=OUTPUT_FILENAME, help=f"Arquivo de resultados (.csv, .parquet ou .xlsx; padrão: {OUTPUT_FILENAME})")
+    parser.add_argument('--mostrar', type=int, default=10, help="Melhores combinações exibidas no terminal")
+    args = parser.parse_args(argv)
+
+    try:
+        grid = normalize_grid(fii_batch.read_config(args.grade) if args.grade else None)
+        fmt = os.path.splitext(args.saida)[1].lstrip('.').lower()
+        if fmt not in fii_export.WRITERS: raise ValueError(f"Formato de saída não suportado: '{fmt}' (use {', '.join(fii_export.WRITERS)}).")
+    except (OSError, ValueError, ImportError) as e: logging.error(f"Erro nos parâmetros do backtest: {e}"); return 2
+
+    start = time.perf_counter()
+    panel = load_panel(args.inicio, args.fim, args.snapshots, grid['proventos'])
+    if panel is None or panel.T < 2: logging.error(f"São necessários pelo menos dois snapshots em '{args.snapshots}'."); return 1
+    loaded = time.perf_counter()
+    logging.info(f"--- Backtest ({rank_fiis.SCRIPT_VERSION}): {grid_size(grid)} combinações, {panel.T} snapshots x {panel.n} FIIs ---")
+    results = sweep(grid, panel, args.processos)
+    elapsed = time.perf_counter() - loaded
+    fii_export.write_file(results, args.saida, fmt)
+    with pd.option_context('display.width', 200, 'display.max_columns', None): print(results.head(args.mostrar).to_string(index=False))
+    reference = universe_benchmark(panel)
+    print(f"\nUniverso (pesos iguais): CAGR {reference['CAGR']:.2%}, Sharpe {reference['Sharpe']:.2f}, drawdown máximo {reference['Drawdown Máximo']:.2%}")
+    print(f"{len(results)} combinações em {elapsed:.2f} s ({len(results) / elapsed:.0f}/s; painel lido em {loaded - start:.2f} s) -> {args.saida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# Execução em lote (sem interface): vários perfis de investidor sobre um único universo de FIIs.
+# O resumo é buscado uma vez; filtros/ranks/score de cada perfil rodam em um pool de processos;
+# os detalhes são buscados uma vez para a união dos tickers selecionados.
+# Uso: python fii_batch.py perfis.yaml [--saida resultados] [--formatos parquet,xlsx] [--processos 4]
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+import pandas as pd
+
+import fii_export
+import fii_metrics
+import fii_ranking
+import fii_reports
+import fii_snapshots
+import rank_fiis
+
+# --- Configurações ---
+OUTPUT_DIR = "resultados"
+OUTPUT_FORMATS = tuple(fii_export.EXPORT_FORMATS)
+DEFAULT_FORMATS = ['xlsx']
+TIMINGS_FILENAME = "tempos.json"
+PROFILE_FILENAME = "perfil.txt"
+
+
+class StageTimer:
+    # Tempo de parede por estágio (busca do resumo, ranking, detalhes, gravação), na ordem de execução
+    def __init__(self): self.stages = []
+
+    @contextmanager
+    def stage(self, name, **info):
+        start = time.perf_counter()
+        try: yield info
+        finally: self.stages.append({'estagio': name, 'segundos': round(time.perf_counter() - start, 4), **info})
+
+    def summary(self):
+        total = sum(s['segundos'] for s in self.stages)
+        lines = [f"{s['estagio']:<12s} {s['segundos']:8.2f} s  " + ' '.join(f"{k}={v}" for k, v in s.items() if k not in ('estagio', 'segundos')) for s in self.stages]
+        return '\n'.join(lines + [f"{'total':<12s} {total:8.2f} s"])
+
+
+# --- Perfis ---
+def _slug(name):
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', str(name)).strip('_')
+    return slug or 'perfil'
+
+def normalize_profile(raw, index=0):
+    # Preenche padrões (constantes de rank_fiis) e valida tipos; DY em fração (0.08 = 8%)
+    if not isinstance(raw, dict): raise ValueError(f"Perfil #{index + 1} inválido: esperado um objeto, recebido {type(raw).__name__}.")
+    weights = dict(fii_ranking.DEFAULT_WEIGHTS); weights.update(raw.get('pesos') or {})
+    unknown = set(weights) - set(fii_ranking.DEFAULT_WEIGHTS)
+    if unknown: raise ValueError(f"Perfil '{raw.get('nome', index + 1)}': pesos desconhecidos {sorted(unknown)}.")
+    formats = raw.get('formatos') or DEFAULT_FORMATS
+    if isinstance(formats, str): formats = [formats]
+    bad_formats = [f for f in formats if f not in OUTPUT_FORMATS]
+    if bad_formats: raise ValueError(f"Perfil '{raw.get('nome', index + 1)}': formatos não suportados {bad_formats} (use {', '.join(OUTPUT_FORMATS)}).")
+    top_n = raw.get('top_n')
+    return {
+        'nome': str(raw.get('nome') or f"perfil_{index + 1}"),
+        'min_pvp': float(raw.get('min_pvp', rank_fiis.MIN_PVP)), 'max_pvp': float(raw.get('max_pvp', rank_fiis.MAX_PVP)),
+        'min_dy': float(raw.get('min_dy', rank_fiis.MIN_DY)), 'max_dy': float(raw.get('max_dy', rank_fiis.MAX_DY)),
+        'min_liquidez': float(raw.get('min_liquidez', rank_fiis.MIN_LIQUIDEZ)),
+        'pesos': tuple(int(weights[k]) for k in ('pvp', 'dy', 'liquidez', 'vacancia')), # Ordem de fii_ranking.RANK_COLUMNS
+        'top_n': None if top_n is None else int(top_n), 'formatos': list(dict.fromkeys(formats)),
+    }
+
+def read_config(filename):
+    # Arquivo .yaml/.yml (requer PyYAML) ou .json -> objeto Python (também usado pelas grades do fii_backtest)
+    with open(filename, 'r', encoding='utf-8') as f: text = f.read()
+    if filename.lower().endswith(('.yaml', '.yml')):
+        try: import yaml
+        except ImportError: raise ImportError("Arquivos YAML exigem o pacote 'PyYAML' (pip install pyyaml); ou use um arquivo .json.")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+def load_profiles(filename):
+    # Aceita uma lista de perfis ou {"perfis": [...]}
+    data = read_config(filename)
+    if isinstance(data, dict): data = data.get('perfis', [])
+    if not isinstance(data, list) or not data: raise ValueError(f"Nenhum perfil encontrado em '{filename}'.")
+    profiles = [normalize_profile(raw, i) for i, raw in enumerate(data)]
+    names = [_slug(p['nome']) for p in profiles]
+    duplicated = sorted({n for n in names if names.count(n) > 1})
+    if duplicated: raise ValueError(f"Nomes de perfil repetidos (após normalizar para arquivo): {duplicated}.")
+    return profiles
+
+
+# --- Trabalho dos processos (funções de módulo para serem serializáveis) ---
+_WORKER_UNIVERSE = None
+
+def _init_worker(universe):
+    # O universo chega uma vez por processo (não uma vez por perfil)
+    global _WORKER_UNIVERSE; _WORKER_UNIVERSE = universe
+    logging.getLogger().setLevel(logging.WARNING) # Os logs por perfil ficam no processo principal
+
+def rank_profile(profile, universe=None):
+    # Estágio puro (sem rede): filtros + ranks + score ponderado do perfil
+    universe = _WORKER_UNIVERSE if universe is None else universe
+    df = rank_fiis.filter_and_rank(universe, profile['min_pvp'], profile['max_pvp'], profile['min_dy'], profile['max_dy'], profile['min_liquidez'])
+    if df is None or df.empty: return df
+    return fii_ranking.RankingEngine(df).ranked_frame(df, profile['pesos'], top_n=profile['top_n'])
+
+def write_profile_outputs(df, base_path, formats):
+    # Um arquivo por formato: <saida>/<perfil>.<ext> (Excel com nomes legíveis de ranks/score, como no app)
+    paths = []
+    for fmt in formats:
+        path = f"{base_path}.{fmt}"
+        fii_export.write_file(fii_export.export_frame(df, rename=(fmt == 'xlsx')), path, fmt)
+        paths.append(path)
+    return paths
+
+def _write_job(args): return write_profile_outputs(*args)
+
+
+def run_batch(profiles, output_dir=None, workers=None, fetch_details=True, save_snapshot=True, timer=None, ingest_reports=False):
+    # Resumo uma vez -> ranking por perfil (pool de processos) -> detalhes da união -> [relatórios PDF] -> arquivos por perfil
+    timer = timer or StageTimer(); output_dir = output_dir or OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(len(profiles), workers or os.cpu_count() or 1))
+
+    with timer.stage('resumo') as info:
+        universe = rank_fiis.prepare_universe(rank_fiis.fetch_summary_data(rank_fiis.URL_FII_LIST)) # Sempre dado novo (execução única)
+        if universe is None: raise RuntimeError("Não foi possível obter os dados de resumo.")
+        info['fiis'] = len(universe)
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(universe,)) if workers > 1 else None
+    try:
+        with timer.stage('ranking', perfis=len(profiles), processos=workers):
+            ranked = list(executor.map(rank_profile, profiles)) if executor else [rank_profile(p, universe) for p in profiles]
+
+        with timer.stage('detalhes') as info:
+            tickers = list(dict.fromkeys(p for df in ranked if df is not None for p in df['Papel']))
+            info['tickers'] = len(tickers)
+            if fetch_details: info['buscados'] = rank_fiis.fetch_missing_details(tickers)
+            finals = []
+            for profile, df in zip(profiles, ranked):
+                if df is None or df.empty: finals.append(df); continue
+                df = rank_fiis.attach_details(df, fetch_missing=False)
+                finals.append(rank_fiis.order_columns(df).assign(**{fii_ranking.SCORE_COLUMN: df[fii_ranking.SCORE_COLUMN]}))
+
+        if ingest_reports and fetch_details:
+            with timer.stage('relatorios') as info:
+                # Um download/extração por ticker da união; campos dos relatórios juntados a cada perfil
+                ranked_union = [df for df in finals if df is not None and not df.empty]
+                if ranked_union:
+                    stats = fii_reports.ingest(pd.concat(ranked_union).drop_duplicates('Papel'))
+                    info.update({k: stats[k] for k in ('baixados', 'inalterados', 'extraidos', 'falhas', 'paginas', 'paginas_por_segundo')})
+                finals = [fii_reports.join_report_fields(df) if df is not None and not df.empty else df for df in finals]
+
+        with timer.stage('gravacao') as info:
+            jobs = []; results = {}
+            for profile, df in zip(profiles, finals):
+                if df is None or df.empty: logging.warning(f"Perfil '{profile['nome']}': nenhum FII passou pelos filtros."); results[profile['nome']] = []; continue
+                jobs.append((profile['nome'], (df, os.path.join(output_dir, _slug(profile['nome'])), profile['formatos'])))
+            written = executor.map(_write_job, [job for _, job in jobs]) if executor else [_write_job(job) for _, job in jobs]
+            for (name, _), paths in zip(jobs, written): results[name] = paths
+            if save_snapshot: fii_snapshots.write_snapshot(rank_fiis.snapshot_frame(universe)) # Histórico diário, como no app
+            info['arquivos'] = sum(len(p) for p in results.values())
+    finally:
+        if executor: executor.shutdown()
+    return results, timer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ranking de FIIs em lote: vários perfis sobre um único universo.")
+    parser.add_argument('perfis', help="Arquivo de perfis (.yaml/.yml ou .json)")
+    parser.add_argument('--saida', default=OUTPUT_DIR, help=f"Pasta de saída (padrão: {OUTPUT_DIR})")
+    parser.add_argument('--formatos', help=f"Sobrescreve os formatos de todos os perfis (ex.: parquet,csv,xlsx)")
+    parser.add_argument('--processos', type=int, default=None, help="Processos para ranking/gravação (padrão: nº de CPUs, limitado ao nº de perfis)")
+    parser.add_argument('--sem-detalhes', action='store_true', help="Não busca páginas de detalhes (só dados do resumo)")
+    parser.add_argument('--relatorios', action='store_true', help=f"Baixa e extrai os relatórios gerenciais (PDF) dos FIIs ranqueados e junta os campos extraídos às saídas (índice em {fii_reports.REPORTS_DB_FILE})")
+    parser.add_argument('--sem-snapshot', action='store_true', help="Não grava o snapshot diário em Parquet")
+    parser.add_argument('--perfilar', choices=['cprofile', 'pyinstrument'], help=f"Perfila a execução (processo principal) e grava o relatório em {PROFILE_FILENAME}")
+    args = parser.parse_args(argv)
+
+    rank_fiis.carregar_tipos_do_json()
+    try:
+        profiles = load_profiles(args.perfis)
+        if args.formatos:
+            override = normalize_profile({'formatos': [f.strip() for f in args.formatos.split(',') if f.strip()]})['formatos']
+            for profile in profiles: profile['formatos'] = override
+    except (OSError, ValueError, ImportError) as e: logging.error(f"Erro ao ler perfis: {e}"); return 2
+
+    logging.info(f"--- Ranking em lote ({rank_fiis.SCRIPT_VERSION}): {len(profiles)} perfis ---")
+    with ExitStack() as stack:
+        profile = stack.enter_context(fii_metrics.profile_run(args.perfilar)) if args.perfilar else None
+        try: results, timer = run_batch(profiles, args.saida, args.processos, fetch_details=not args.sem_detalhes, save_snapshot=not args.sem_snapshot, ingest_reports=args.relatorios)
+        except RuntimeError as e: logging.error(str(e)); return 1
+    for name, paths in results.items(): print(f"{name}: {', '.join(paths) if paths else 'nenhum FII'}")
+    print("\n--- Tempo por estágio ---\n" + timer.summary())
+    # Estágios do lote + métricas detalhadas do processo principal (requisições, bytes, parse, etc.)
+    with open(os.path.join(args.saida, TIMINGS_FILENAME), 'w', encoding='utf-8') as f: json.dump({'estagios': timer.stages, 'metricas': fii_metrics.METRICS.to_dict()}, f, ensure_ascii=False, indent=2)
+    if profile is not None:
+        with open(os.path.join(args.saida, PROFILE_FILENAME), 'w', encoding='utf-8') as f: f.write(profile.text)
+        if profile.html:
+            with open(os.path.join(args.saida, 'perfil.html'), 'w', encoding='utf-8') as f: f.write(profile.html)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
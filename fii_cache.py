@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Cache HTTP persistente (SQLite) para as páginas do Fundamentus: TTL por recurso, revalidação
+# condicional (ETag / Last-Modified) e despejo LRU limitado por tamanho
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import requests
+
+# --- Configurações ---
+CACHE_DB_FILE = "fii_http_cache.sqlite"
+CACHE_MAX_BYTES = 64 * 1024 * 1024 # Limite do cache em disco (LRU acima disso)
+CACHE_TTLS = { 'fii_resultado.php': 15 * 60, 'detalhes.php': 12 * 3600 } # TTL (s) por recurso (trecho da URL)
+CACHE_DEFAULT_TTL = 3600
+
+
+def ttl_for_url(url):
+    for fragment, ttl in CACHE_TTLS.items():
+        if fragment in url: return ttl
+    return CACHE_DEFAULT_TTL
+
+
+class CacheEntry:
+    __slots__ = ('url', 'body', 'headers', 'etag', 'last_modified', 'fetched_at')
+
+    def __init__(self, url, body, headers, etag, last_modified, fetched_at):
+        self.url = url; self.body = body; self.headers = headers
+        self.etag = etag; self.last_modified = last_modified; self.fetched_at = fetched_at
+
+    def is_fresh(self, now=None):
+        return ((now or time.time()) - self.fetched_at) < ttl_for_url(self.url)
+
+    def validators(self):
+        # Cabeçalhos para GET condicional
+        headers = {}
+        if self.etag: headers['If-None-Match'] = self.etag
+        if self.last_modified: headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_response(self):
+        # Reconstrói um requests.Response para que os chamadores não precisem distinguir hit de download
+        response = requests.Response()
+        response.status_code = 200; response.url = self.url; response._content = self.body
+        response.headers = requests.structures.CaseInsensitiveDict(self.headers)
+        return response
+
+
+class HttpCache:
+    def __init__(self, filename=None, max_bytes=None):
+        self.filename = filename or CACHE_DB_FILE; self.max_bytes = max_bytes or CACHE_MAX_BYTES; self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'evicted': 0}
+        self._conn = sqlite3.connect(self.filename, check_same_thread=False, isolation_level=None) # Autocommit
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+            url TEXT PRIMARY KEY, body BLOB NOT NULL, headers TEXT, etag TEXT, last_modified TEXT,
+            fetched_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+
+    def record(self, key):
+        with self._lock: self.stats[key] += 1
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT url, body, headers, etag, last_modified, fetched_at FROM entries WHERE url = ?", (url,)).fetchone()
+            if row: self._conn.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        if not row: return None
+        return CacheEntry(row[0], row[1], json.loads(row[2] or '{}'), row[3], row[4], row[5])
+
+    def store(self, url, response):
+        # Guarda só o necessário para reconstruir a resposta e revalidar depois
+        headers = {k: v for k, v in response.headers.items() if k.lower() in ('content-type', 'etag', 'last-modified')}
+        body = response.content; now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (url, body, json.dumps(headers), response.headers.get('ETag'), response.headers.get('Last-Modified'), now, now, len(body)))
+            self.stats['stored'] += 1
+            self._evict_locked()
+
+    def revalidate(self, entry, response):
+        # 304 Not Modified: renova o TTL (e validadores, se vieram novos) sem baixar o corpo de novo
+        etag = response.headers.get('ETag') or entry.etag; last_modified = response.headers.get('Last-Modified') or entry.last_modified
+        entry.fetched_at = time.time(); entry.etag = etag; entry.last_modified = last_modified
+        with self._lock:
+            self._conn.execute("UPDATE entries SET etag = ?, last_modified = ?, fetched_at = ?, accessed_at = ? WHERE url = ?",
+                               (etag, last_modified, entry.fetched_at, entry.fetched_at, entry.url))
+            self.stats['revalidated'] += 1
+
+    def _evict_locked(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes: return
+        evicted = 0
+        for url, size in self._conn.execute("SELECT url, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes: break
+            self._conn.execute("DELETE FROM entries WHERE url = ?", (url,)); total -= size; evicted += 1
+        self.stats['evicted'] += evicted
+        logging.debug(f"Cache HTTP: {evicted} entradas removidas (LRU).")
+
+    def expire(self, urls):
+        # Marca as entradas como vencidas sem apagar: a próxima busca vira GET condicional (ETag/Last-Modified)
+        urls = list(urls)
+        with self._lock: return sum(self._conn.execute("UPDATE entries SET fetched_at = 0 WHERE url = ?", (url,)).rowcount for url in urls)
+
+    def clear(self):
+        with self._lock: self._conn.execute("DELETE FROM entries")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'], stats['bytes'] = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return stats
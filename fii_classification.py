@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Classificação (Segmento/Tipo) a partir do fii_types.json, compilada uma vez em uma tabela categórica
+# indexada por ticker e aplicada com um único lookup vetorizado. A compilação fica em cache e só é refeita
+# quando o arquivo muda (mtime/tamanho). Aliases de segmento são resolvidos na compilação.
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# --- Configurações ---
+SEGMENT_ALIASES = {'Imóveis Industriais e Logísticos': 'Logística'} # Segmentos unificados na exibição
+UNCLASSIFIED_SEGMENT = 'Não Classificado'
+UNDEFINED_TYPE = 'Indefinido'
+
+_COMPILED = {}; _COMPILED_LOCK = threading.Lock() # caminho absoluto -> (assinatura do arquivo, dict bruto, tabela)
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def compile_table(raw):
+    # {papel: {'segmento_original', 'tipo'}} -> DataFrame (índice Papel; Segmento_JSON/Tipo_JSON categóricos)
+    entries = {str(papel): info for papel, info in raw.items() if isinstance(info, dict)}
+    index = pd.Index(list(entries), name='Papel', dtype=object)
+    segments = pd.Series([info.get('segmento_original') for info in entries.values()], index=index, dtype=object).replace(SEGMENT_ALIASES)
+    types = pd.Series([info.get('tipo') for info in entries.values()], index=index, dtype=object)
+    return pd.DataFrame({'Segmento_JSON': segments.astype('category'), 'Tipo_JSON': types.astype('category')})
+
+def load_classification(filename):
+    # (dict bruto, tabela compilada); recompila só se o arquivo mudou. Erros de leitura/formato sobem ao chamador.
+    path = os.path.abspath(filename); signature = _file_signature(path)
+    with _COMPILED_LOCK:
+        cached = _COMPILED.get(path)
+        if cached is not None and cached[0] == signature: return cached[1], cached[2]
+    with open(path, 'r', encoding='utf-8') as f: raw = json.load(f)
+    if not isinstance(raw, dict) or (raw and not isinstance(next(iter(raw.values())), dict)): raise ValueError("estrutura JSON inválida")
+    table = compile_table(raw)
+    with _COMPILED_LOCK: _COMPILED[path] = (signature, raw, table)
+    logging.info(f"Classificação compilada de '{filename}' ({len(table)} tickers).")
+    return raw, table
+
+def _lookup(codes_by_row, column):
+    # Códigos categóricos da tabela -> valores por linha (object; None onde o ticker não está no JSON ou o campo é nulo)
+    codes = np.where(codes_by_row >= 0, column.cat.codes.to_numpy()[codes_by_row], -1)
+    values = np.append(column.cat.categories.to_numpy(dtype=object), None) # Código -1 cai no None do fim
+    return values[codes]
+
+def classify(df, table=None):
+    # Preenche Segmento/Tipo de df (in place) com um único lookup por ticker (get_indexer = hash join no índice
+    # da tabela). Segmento: JSON > Fundamentus > 'Não Classificado'; Tipo: JSON > 'Indefinido'. Aliases também
+    # valem para o segmento vindo do Fundamentus.
+    original = df['Segmento'].astype(object).replace(SEGMENT_ALIASES).to_numpy(dtype=object) if 'Segmento' in df.columns else np.full(len(df), None, dtype=object)
+    if table is not None and not table.empty:
+        rows = table.index.get_indexer(df['Papel'])
+        segments = _lookup(rows, table['Segmento_JSON']); types = _lookup(rows, table['Tipo_JSON'])
+        segments = np.where(pd.isna(segments), original, segments)
+        types = np.where(pd.isna(types), UNDEFINED_TYPE, types)
+    else: segments = original; types = UNDEFINED_TYPE
+    df['Segmento'] = pd.Categorical(np.where(pd.isna(segments) | (segments == ''), UNCLASSIFIED_SEGMENT, segments)) # Poucos valores distintos: categórico
+    df['Tipo'] = pd.Categorical(np.broadcast_to(np.asarray(types, dtype=object), len(df)))
+    return df
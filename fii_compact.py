@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Representação compacta do universo em memória: Segmento/Tipo categóricos, data do último relatório como
+# datetime64 e os links do FNET guardados só pelo identificador (id do documento, CNPJ do fundo) em texto do
+# Arrow. 'URL Detalhes' nem é guardada (deriva do Papel). As URLs e a data "dd/mm/aaaa" só são montadas na
+# hora de renderizar/exportar (expand); em disco (snapshots) vale esse formato expandido, o dos arquivos já gravados.
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import fii_ranking
+
+# --- Configurações ---
+CATEGORY_COLUMNS = ['Segmento', 'Tipo']
+REPORT_DATE_COLUMN = 'Data Último Relatório'
+REPORT_DATE_FORMAT = '%d/%m/%Y'
+NA_DATE = "N/A"
+DETAIL_URL_COLUMN = 'URL Detalhes'
+FUNDAMENTUS_BASE_URL = 'https://www.fundamentus.com.br/' # rank_fiis.BASE_URL_FUNDAMENTUS parte daqui (benchmarks apontam os dois para o servidor local)
+DETAIL_URL_PATH = 'detalhes.php?papel='
+FNET_BASE_URL = 'https://fnet.bmfbovespa.com.br/fnet/publico/'
+LINK_COLUMNS = { # Coluna expandida -> (coluna compacta, prefixo da URL)
+    'Link Download Relatório': ('ID Relatório', FNET_BASE_URL + 'downloadDocumento?id='),
+    'Link Documentos FNET': ('CNPJ FNET', FNET_BASE_URL + 'abrirGerenciadorDocumentosCVM?cnpjFundo='),
+}
+ID_COLUMNS = [id_col for id_col, _ in LINK_COLUMNS.values()]
+
+
+# --- Compactação ---
+def report_dates(values):
+    # Data do relatório como datetime64 (NaT = sem relatório/desconhecida), a partir do formato compacto ou do
+    # texto "dd/mm/aaaa" / "N/A" dos snapshots e dos parsers
+    values = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(values): return values
+    return pd.to_datetime(values.astype(object), format=REPORT_DATE_FORMAT, errors='coerce')
+
+def link_ids(links, prefix, index=None):
+    # URL completa -> só o sufixo depois do prefixo (id/CNPJ), em texto do Arrow. Links fora do modelo ficam
+    # inteiros (a expansão os devolve como estão)
+    urls = pa.array(pd.Series(links, dtype=object), type=pa.string(), from_pandas=True)
+    ids = pc.if_else(pc.starts_with(urls, prefix), pc.utf8_slice_codeunits(urls, len(prefix)), urls)
+    return pd.Series(pd.arrays.ArrowStringArray(ids), index=index)
+
+def compact(df):
+    # Frame no formato expandido (snapshot) -> compacto: texto repetido (segmento, tipo) vira categórico (um código
+    # int8 por linha + as categorias uma vez só). Colunas já compactas ou ausentes ficam como estão
+    if df is None: return df
+    columns = {name: pd.Categorical(df[name].to_numpy(dtype=object)) for name in CATEGORY_COLUMNS if name in df.columns and not isinstance(df[name].dtype, pd.CategoricalDtype)}
+    if REPORT_DATE_COLUMN in df.columns: columns[REPORT_DATE_COLUMN] = report_dates(df[REPORT_DATE_COLUMN])
+    renames = {link_col: id_col for link_col, (id_col, _) in LINK_COLUMNS.items() if link_col in df.columns and id_col not in df.columns}
+    columns.update({id_col: link_ids(df[link_col], LINK_COLUMNS[link_col][1], df.index) for link_col, id_col in renames.items()})
+    return df.rename(columns=renames).assign(**columns).drop(columns=[DETAIL_URL_COLUMN], errors='ignore')
+
+
+# --- Expansão (renderização/exportação) ---
+def expand_ids(ids, prefix):
+    # Inverso de link_ids: prefixo + id (nulo continua nulo; link guardado inteiro volta como está)
+    values = pa.array(pd.Series(ids, dtype=object), type=pa.string(), from_pandas=True)
+    urls = pc.if_else(pc.starts_with(values, 'http'), values, pc.binary_join_element_wise(prefix, values, ''))
+    return urls.to_numpy(zero_copy_only=False)
+
+def detail_urls(papeis):
+    return pc.binary_join_element_wise(FUNDAMENTUS_BASE_URL + DETAIL_URL_PATH, pa.array(pd.Series(papeis, dtype=object).astype(str), type=pa.string()), '').to_numpy(zero_copy_only=False)
+
+def expand(df, na_date=NA_DATE):
+    # Formato compacto -> colunas de exibição: links completos no lugar dos ids, 'URL Detalhes' (frames com
+    # detalhes; antes do score, se houver) e a data como "dd/mm/aaaa" (NaT -> na_date). Frames já expandidos passam sem mudança.
+    if df is None: return df
+    renames = {id_col: link_col for link_col, (id_col, _) in LINK_COLUMNS.items() if id_col in df.columns}
+    columns = {link_col: expand_ids(df[id_col], LINK_COLUMNS[link_col][1]) for id_col, link_col in renames.items()}
+    dates = df[REPORT_DATE_COLUMN] if REPORT_DATE_COLUMN in df.columns else None
+    if dates is not None and pd.api.types.is_datetime64_any_dtype(dates): columns[REPORT_DATE_COLUMN] = dates.dt.strftime(REPORT_DATE_FORMAT).astype(object).where(dates.notna(), na_date)
+    out = df.rename(columns=renames).assign(**columns)
+    if DETAIL_URL_COLUMN not in out.columns and REPORT_DATE_COLUMN in out.columns and 'Papel' in out.columns:
+        out.insert(out.columns.get_loc(fii_ranking.SCORE_COLUMN) if fii_ranking.SCORE_COLUMN in out.columns else len(out.columns), DETAIL_URL_COLUMN, detail_urls(out['Papel']))
+    return out
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Diferenças entre dois snapshots do universo: índice por ticker (hash dos campos do resumo que acompanham um novo
+# relatório) para achar o que mudou sem comparar coluna a coluna, e um conjunto de mudanças compacto para alertas:
+# FIIs que entraram/saíram do filtro, saltos de posição no ranking, variações de DY e P/VP e relatórios novos.
+# Os tickers com esses campos alterados são os únicos cujos detalhes precisam ir à rede de novo.
+import logging
+
+import numpy as np
+import pandas as pd
+
+import fii_compact
+import fii_ranking
+import rank_fiis
+
+# --- Configurações ---
+SUMMARY_COLUMNS = ['Segmento', 'Qtd de imóveis', 'Vacância Média'] # Colunas do resumo que entram no hash: só as que mudam com um novo relatório (cotação, DY, P/VP, liquidez etc. mudam a cada pregão)
+REPORT_DATE_COLUMN = 'Data Último Relatório'
+RANK_JUMP_MIN = 5 # Variação mínima de posição (em módulo) para virar alerta
+DELTA_THRESHOLDS = {'Dividend Yield': 0.0025, 'P/VP': 0.02} # Variação absoluta mínima (DY em fração: 0.0025 = 0,25 p.p.)
+MAX_ITEMS = 50 # Itens por lista no conjunto de mudanças (os maiores primeiro)
+
+
+def row_hashes(df, columns=SUMMARY_COLUMNS):
+    # Índice por ticker -> hash (uint64) da linha do resumo. Colunas ausentes são ignoradas (mesmo conjunto dos dois lados).
+    if df is None or df.empty: return pd.Series(dtype=np.uint64, index=pd.Index([], name='Papel'))
+    cols = [c for c in columns if c in df.columns]
+    frame = df[cols].astype({c: object for c in cols if isinstance(df[c].dtype, pd.CategoricalDtype)}) # Categórico e texto geram o mesmo hash
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return pd.Series(hashes, index=pd.Index(df['Papel'].astype(str), name='Papel')).groupby(level=0).first() # Ticker repetido: fica o primeiro
+
+def changed_tickers(old, new, columns=SUMMARY_COLUMNS):
+    # (alterados, novos, removidos) entre dois universos, pelo hash de cada linha
+    cols = [c for c in columns if (old is None or c in old.columns) and (new is None or c in new.columns)]
+    old_h = row_hashes(old, cols); new_h = row_hashes(new, cols)
+    common = new_h.index.intersection(old_h.index)
+    changed = common[old_h.reindex(common).to_numpy() != new_h.reindex(common).to_numpy()]
+    return list(changed), list(new_h.index.difference(old_h.index)), list(old_h.index.difference(new_h.index))
+
+def ranking_positions(universe, filters, weights):
+    # Papel -> posição (1 = melhor) sob os filtros/pesos dados; vazio se nada passa
+    ranked = rank_fiis.filter_and_rank(universe, *filters) if universe is not None and not universe.empty else None
+    if ranked is None or ranked.empty: return pd.Series(dtype=np.int64)
+    positions, _ = fii_ranking.RankingEngine(ranked).order(weights)
+    return pd.Series(np.arange(1, len(positions) + 1), index=ranked['Papel'].to_numpy()[positions])
+
+def _report_dates(df):
+    if df is None or REPORT_DATE_COLUMN not in df.columns: return pd.Series(dtype='datetime64[ns]')
+    return pd.Series(fii_compact.report_dates(df[REPORT_DATE_COLUMN]).to_numpy(), index=df['Papel'].astype(str).to_numpy()) # Snapshot ("dd/mm/aaaa") ou compacto
+
+def diff_snapshots(old, new, filters=None, weights=None):
+    # Conjunto de mudanças (dict, serializável em JSON) de `old` para `new`. Com filters/weights, também
+    # entradas/saídas do filtro e saltos de posição. filters = (min_pvp, max_pvp, min_dy, max_dy, min_liquidez).
+    changed, added, removed = changed_tickers(old, new)
+    changes = {'alterados': changed, 'novos': added, 'removidos': removed}
+    if old is None or old.empty or new is None or new.empty: return changes
+    old_i = old.drop_duplicates('Papel').set_index('Papel'); new_i = new.drop_duplicates('Papel').set_index('Papel')
+    common = new_i.index.intersection(old_i.index)
+
+    variations = []
+    for col, threshold in DELTA_THRESHOLDS.items():
+        if col not in old_i.columns or col not in new_i.columns: continue
+        before = pd.to_numeric(old_i[col].reindex(common), errors='coerce'); after = pd.to_numeric(new_i[col].reindex(common), errors='coerce')
+        delta = after - before; moved = delta.abs() >= threshold
+        variations += [{'Papel': p, 'campo': col, 'antes': float(before[p]), 'depois': float(after[p]), 'delta': float(delta[p])} for p in delta[moved].index]
+    changes['variacoes'] = sorted(variations, key=lambda v: -abs(v['delta']) / DELTA_THRESHOLDS[v['campo']])[:MAX_ITEMS]
+
+    before = _report_dates(old).groupby(level=0).first().reindex(common); after = _report_dates(new).groupby(level=0).first().reindex(common)
+    newer = before.notna() & after.notna() & (after > before) # Data antes desconhecida (detalhes não buscados) não conta
+    changes['novos_relatorios'] = [{'Papel': p, 'antes': before[p].strftime('%d/%m/%Y'), 'depois': after[p].strftime('%d/%m/%Y')} for p in after[newer].sort_values(ascending=False).index[:MAX_ITEMS]]
+
+    if filters is not None and weights is not None:
+        old_rank = ranking_positions(old, filters, weights); new_rank = ranking_positions(new, filters, weights)
+        changes['entraram'] = [{'Papel': p, 'posicao': int(new_rank[p])} for p in new_rank.index.difference(old_rank.index)]
+        changes['sairam'] = [{'Papel': p, 'posicao_anterior': int(old_rank[p])} for p in old_rank.index.difference(new_rank.index)]
+        both = new_rank.index.intersection(old_rank.index)
+        jump = old_rank.reindex(both) - new_rank.reindex(both) # > 0: subiu no ranking
+        jumps = jump[jump.abs() >= RANK_JUMP_MIN].sort_values(key=lambda s: -s.abs())
+        changes['saltos'] = [{'Papel': p, 'antes': int(old_rank[p]), 'depois': int(new_rank[p]), 'delta': int(d)} for p, d in jumps.iloc[:MAX_ITEMS].items()]
+    return changes
+
+def summarize(changes):
+    # Contagens por tipo de mudança (para métricas/legendas)
+    return {k: len(v) for k, v in changes.items()}
+
+
+# --- Detalhes: só os tickers alterados voltam à rede ---
+def seed_unchanged_details(previous, current, timestamp):
+    # Reaproveita os detalhes do snapshot anterior para os tickers cuja linha do resumo não mudou
+    # (memo com o horário do snapshot; DETAILS_MAX_AGE continua valendo). Devolve quantos foram semeados.
+    if previous is None or previous.empty or current is None or REPORT_DATE_COLUMN not in previous.columns: return 0
+    changed, added, _ = changed_tickers(previous, current)
+    skip = set(changed) | set(added)
+    known = previous[previous[REPORT_DATE_COLUMN].notna() & ~previous['Papel'].isin(skip)]
+    seeded = rank_fiis.seed_details(known, timestamp)
+    if seeded: logging.info(f"Detalhes de {seeded} FIIs reaproveitados do snapshot anterior (resumo inalterado).")
+    return seeded
+
+def invalidate_changed_details(previous, current):
+    # Após um refresh: descarta do memo os detalhes dos tickers cuja linha do resumo mudou
+    changed, _, _ = changed_tickers(previous, current)
+    dropped = rank_fiis.invalidate_details(changed)
+    if dropped: logging.info(f"Detalhes de {dropped} FIIs com resumo alterado serão buscados de novo.")
+    return changed
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Exportação do ranking (Excel, CSV, Parquet). O arquivo só é gerado quando pedido, linha a linha em blocos
+# (XlsxWriter constant_memory, se instalado, ou openpyxl write_only: memória constante) e os bytes gerados ficam em um cache
+# LRU chaveado por um hash dos dados + pesos, para que reruns do app não refaçam o arquivo.
+import hashlib
+import io
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import fii_compact
+
+# --- Configurações ---
+EXPORT_FORMATS = {
+    'xlsx': {'label': 'Excel (.xlsx)', 'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+    'csv': {'label': 'CSV (.csv)', 'mime': 'text/csv'},
+    'parquet': {'label': 'Parquet (.parquet)', 'mime': 'application/vnd.apache.parquet'},
+}
+EXPORT_RENAMES = { 'Rank_PVP': 'Rank P/VP (Menor Melhor)', 'Rank_DY': 'Rank DY (Maior Melhor)', 'Rank_Liquidez': 'Rank Liquidez (Maior Melhor)', 'Rank_Vacancia': 'Rank Vacancia (Menor Melhor)', 'Score_Ponderado': 'Score Personalizado (Menor Melhor)' }
+SHEET_NAME = 'Ranking FIIs'
+CHUNK_ROWS = 5000 # Linhas convertidas por vez na escrita (limita a memória extra a um bloco)
+EXPORT_CACHE_SIZE = 16 # Arquivos gerados mantidos em memória (LRU)
+
+_CACHE = OrderedDict(); _CACHE_LOCK = threading.Lock()
+
+
+# --- Preparação ---
+def export_frame(df, drop=(), rename=True):
+    # Colunas de saída: links/data expandidos do formato compacto, sem as descartadas e com nomes legíveis dos
+    # ranks/score (sem copiar os dados)
+    out = fii_compact.expand(df); out = out.drop(columns=[c for c in drop if c in out.columns])
+    return out.rename(columns=EXPORT_RENAMES) if rename else out
+
+def fingerprint(df, *extra):
+    # Hash estável do conteúdo (valores + colunas) e de parâmetros extras (ex.: pesos)
+    digest = hashlib.blake2b(digest_size=16)
+    try: digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    except TypeError: digest.update(df.to_csv(index=False).encode('utf-8')) # Células não hasheáveis (ex.: listas)
+    digest.update(repr((list(df.columns), extra)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# --- Escritores ---
+def _python_rows(df):
+    # Linhas como tuplas de tipos nativos, um bloco por vez; NaN/NA/NaT viram célula vazia
+    for start in range(0, len(df), CHUNK_ROWS):
+        block = df.iloc[start:start + CHUNK_ROWS]
+        values = block.to_numpy(dtype=object, copy=True); values[pd.isna(block).to_numpy()] = None # Cópia gravável (to_numpy pode devolver uma visão só leitura)
+        for row in values: yield tuple(v.item() if isinstance(v, np.generic) else v for v in row)
+
+def write_xlsx(df, target):
+    # XlsxWriter em modo constant_memory (mais rápido, se instalado) ou openpyxl write_only: as linhas vão direto
+    # para o XML da planilha, sem montar a grade de células em memória
+    try: import xlsxwriter
+    except ImportError: xlsxwriter = None
+    if xlsxwriter is not None:
+        # Textos nunca viram fórmula/link (dados vindos de fora)
+        workbook = xlsxwriter.Workbook(target, {'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False, 'strings_to_numbers': False})
+        sheet = workbook.add_worksheet(SHEET_NAME); sheet.write_row(0, 0, [str(c) for c in df.columns])
+        for i, row in enumerate(_python_rows(df), start=1): sheet.write_row(i, 0, row)
+        workbook.close(); return
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True); sheet = workbook.create_sheet(SHEET_NAME)
+    sheet.append([str(c) for c in df.columns])
+    for row in _python_rows(df): sheet.append(row)
+    workbook.save(target)
+
+def write_csv(df, target):
+    # BOM para o Excel reconhecer UTF-8; escrita em blocos
+    if isinstance(target, (str, bytes)) or hasattr(target, '__fspath__'): df.to_csv(target, index=False, encoding='utf-8-sig', chunksize=CHUNK_ROWS); return
+    text = io.TextIOWrapper(target, encoding='utf-8-sig', newline='')
+    df.to_csv(text, index=False, chunksize=CHUNK_ROWS); text.flush(); text.detach()
+
+def write_parquet(df, target): df.to_parquet(target, index=False, compression='zstd')
+
+WRITERS = {'xlsx': write_xlsx, 'csv': write_csv, 'parquet': write_parquet}
+
+def write_file(df, target, fmt):
+    if fmt not in WRITERS: raise ValueError(f"Formato de exportação não suportado: '{fmt}' (use {', '.join(WRITERS)}).")
+    WRITERS[fmt](df, target)
+
+
+# --- Bytes em cache ---
+def cached_export(key, fmt):
+    # Bytes já gerados para (dados+pesos, formato) ou None
+    with _CACHE_LOCK:
+        data = _CACHE.get((key, fmt))
+        if data is not None: _CACHE.move_to_end((key, fmt))
+        return data
+
+def export_bytes(df, fmt, key=None):
+    # Gera (ou reaproveita) o arquivo em memória; key=None calcula o hash dos próprios dados
+    key = key or fingerprint(df)
+    data = cached_export(key, fmt)
+    if data is not None: return data
+    buffer = io.BytesIO(); write_file(df, buffer, fmt); data = buffer.getvalue()
+    logging.info(f"Exportação {fmt} gerada ({len(df)} linhas, {len(data) / 1024:.0f} KB).")
+    with _CACHE_LOCK:
+        _CACHE[(key, fmt)] = data; _CACHE.move_to_end((key, fmt))
+        while len(_CACHE) > EXPORT_CACHE_SIZE: _CACHE.popitem(last=False)
+    return data
+
+def clear_cache():
+    with _CACHE_LOCK: _CACHE.clear()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# Formatação dos valores exibidos na tabela HTML (padrão brasileiro: 1.234.567,89).
+# As funções *_series formatam colunas inteiras (inteiros escalados + kernels de texto do Arrow);
+# format_brl/format_percent formatam um valor por vez e servem de referência.
+import locale
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import fii_compact
+
+NA_TEXT = "N/A"
+_MAX_GROUPS = 6 # Grupos de milhar suportados (até 10^18)
+LOCALE_CONFIGURED = None # None = ainda não tentou configurar
+
+# --- Formatação escalar (um valor por vez) ---
+def configurar_locale():
+    global LOCALE_CONFIGURED
+    if LOCALE_CONFIGURED is not None: return LOCALE_CONFIGURED
+    LOCALE_CONFIGURED = False
+    for name in ('pt_BR.UTF-8', 'Portuguese_Brazil'): # 'Portuguese_Brazil' = fallback para Windows
+        try: locale.setlocale(locale.LC_ALL, name); LOCALE_CONFIGURED = True; break
+        except locale.Error: pass # Fallback manual na formatação
+    return LOCALE_CONFIGURED
+
+def format_brl(value, decimals=0):
+    if pd.isna(value): return NA_TEXT
+    try:
+        if configurar_locale(): num_str_locale = f"{float(value):n}";
+        else: raise locale.Error
+        if 'e' not in num_str_locale.lower():
+             if decimals == 0:
+                 if ',' in num_str_locale: return num_str_locale.split(',')[0]
+                 else: return num_str_locale
+             elif decimals > 0:
+                 if ',' not in num_str_locale: return num_str_locale + ',' + '0' * decimals
+                 else:
+                     parts = num_str_locale.split(',')
+                     if len(parts[1]) < decimals: parts[1] = parts[1].ljust(decimals, '0')
+                     elif len(parts[1]) > decimals: parts[1] = parts[1][:decimals]
+                     return parts[0] + ',' + parts[1]
+             return num_str_locale
+        raise locale.Error
+    except (ValueError, TypeError, locale.Error):
+         try:
+             if decimals == 0: formatted_int = "{:,.0f}".format(float(value)).replace(',', '#').replace('.', ',').replace('#', '.'); return formatted_int
+             else: formatted_float = "{:,.{prec}f}".format(float(value), prec=decimals).replace(',', '#').replace('.', ',').replace('#', '.'); return formatted_float
+         except: return str(value)
+
+def format_brl_cotacao(value):
+    return format_brl(value, decimals=2)
+
+def format_percent(value):
+    if pd.isna(value): return NA_TEXT
+    try: return f"{float(value) * 100:.2f}".replace('.', ',') + "%"
+    except (ValueError, TypeError): return str(value)
+
+# --- Formatação vetorizada (coluna inteira) ---
+def _group_thousands(digits):
+    # '1234567' -> '1.234.567': completa à esquerda até um tamanho fixo, fatia em grupos de 3,
+    # junta com '.' e remove o preenchimento (tudo em kernels do Arrow, sem loop Python)
+    width = 3 * _MAX_GROUPS
+    padded = pc.utf8_lpad(digits, width, padding='X')
+    groups = [pc.utf8_slice_codeunits(padded, 3 * i, 3 * i + 3) for i in range(_MAX_GROUPS)]
+    joined = pc.binary_join_element_wise(*groups, '.')
+    return pc.utf8_ltrim(joined, characters='X.')
+
+def format_number_series(series, decimals=2, thousands=True, scale=1.0, prefix='', suffix='', na_text=NA_TEXT):
+    # Equivale a "{:,.Nf}" com separadores trocados (ou "{:.Nf}" se thousands=False). Arredondamento
+    # half-even do valor escalado (x * 10^N); pode divergir do formatador escalar no último dígito
+    # apenas em empates binários raros.
+    values = pd.to_numeric(pd.Series(series), errors='coerce').to_numpy(dtype=float, na_value=np.nan) * scale
+    missing = np.isnan(values)
+    safe = np.where(missing, 0.0, values)
+    scaled = np.round(np.abs(safe) * (10 ** decimals)).astype(np.int64)
+    int_part = pa.array(scaled // (10 ** decimals)); int_text = pc.cast(int_part, pa.string())
+    if thousands: int_text = _group_thousands(int_text)
+    text = pc.binary_join_element_wise(pa.array(np.where(np.signbit(safe) & ~missing, '-', '')), int_text, '')
+    if decimals > 0:
+        frac = pc.utf8_lpad(pc.cast(pa.array(scaled % (10 ** decimals)), pa.string()), decimals, padding='0')
+        text = pc.binary_join_element_wise(text, frac, ',')
+    if prefix or suffix: text = pc.binary_join_element_wise(pa.scalar(prefix), text, pa.scalar(suffix), '')
+    text = pc.if_else(pa.array(missing), pa.scalar(na_text), text)
+    return pd.Series(text.to_numpy(zero_copy_only=False), index=getattr(series, 'index', None), dtype=object)
+
+def format_brl_series(series, decimals=0, prefix=''):
+    # Versão vetorizada de prefix + format_brl(value, decimals) (caminho sem locale)
+    result = format_number_series(series, decimals=decimals, thousands=True, na_text=NA_TEXT)
+    return prefix + result if prefix else result
+
+def format_percent_series(series):
+    # Versão vetorizada de format_percent
+    return format_number_series(series, decimals=2, thousands=False, scale=100.0, suffix='%')
+
+# --- Registros para o template Jinja2 (fii_template.html) ---
+TEMPLATE_COLUMNS = ['Papel', 'URL Detalhes', 'Segmento', 'Tipo', 'Cotação', 'Dividend Yield', 'P/VP', 'Liquidez', 'FFO Yield', 'Valor de Mercado', 'Qtd de imóveis', 'Vacância Média', 'Osc. Dia', 'Osc. Mês', 'Osc. 12 Meses', 'Data Último Relatório', 'Link Download Relatório', 'Link Documentos FNET']
+PERCENT_FORMATS = {'DY_fmt': 'Dividend Yield', 'FFOYield_fmt': 'FFO Yield', 'Vacancia_fmt': 'Vacância Média', 'OscDia_fmt': 'Osc. Dia', 'OscMes_fmt': 'Osc. Mês', 'Osc12M_fmt': 'Osc. 12 Meses'}
+
+def build_template_frame(df):
+    # Todas as colunas *_fmt como operações de coluna inteira; links e data montados aqui a partir do formato compacto
+    out = fii_compact.expand(df); out = out[[col for col in TEMPLATE_COLUMNS if col in out.columns]].copy()
+    def col(name): return out[name] if name in out.columns else pd.Series(np.nan, index=out.index)
+    out['Cotação_fmt'] = format_brl_series(col('Cotação'), decimals=2, prefix='R$ ')
+    out['PVP_fmt'] = format_number_series(col('P/VP'), decimals=2, thousands=False)
+    out['Liquidez_fmt'] = format_brl_series(col('Liquidez'), decimals=0, prefix='R$ ')
+    out['ValorMercado_fmt'] = format_brl_series(col('Valor de Mercado'), decimals=0, prefix='R$ ')
+    out['QtdImoveis_fmt'] = format_brl_series(col('Qtd de imóveis'), decimals=0)
+    for fmt_col, source in PERCENT_FORMATS.items(): out[fmt_col] = format_percent_series(col(source))
+    for name in ('Segmento', 'Tipo', 'Data Último Relatório'):
+        if name not in out.columns: out[name] = NA_TEXT
+    for name in ('URL Detalhes', 'Link Download Relatório', 'Link Documentos FNET'): # Links ausentes -> None (o template testa a verdade)
+        out[name] = col(name).astype(object).where(col(name).notna(), None)
+    out['Link_FNET'] = out['Link Documentos FNET']
+    return out
+
+def build_template_records(df):
+    # Mesmo resultado de to_dict('records'), mas convertendo coluna a coluna (tolist) em vez de célula a célula
+    frame = build_template_frame(df); columns = list(frame.columns)
+    return [dict(zip(columns, row)) for row in zip(*(frame[c].tolist() for c in columns))]
+
+# --- Payload compacto para o modo de renderização única (fii_template_tabs.html) ---
+# Cada linha vira uma lista na ordem de PAYLOAD_COLUMNS; abas por segmento, ordenação e paginação
+# acontecem no navegador sobre esse único payload.
+PAYLOAD_COLUMNS = ['Papel', 'URL Detalhes', 'Segmento', 'Tipo', 'Cotação_fmt', 'DY_fmt', 'PVP_fmt', 'Liquidez_fmt', 'FFOYield_fmt', 'ValorMercado_fmt', 'QtdImoveis_fmt', 'Vacancia_fmt', 'OscDia_fmt', 'OscMes_fmt', 'Osc12M_fmt', 'Data Último Relatório', 'Link Download Relatório', 'Link_FNET']
+PAYLOAD_SORT_KEYS = {'Cotação_fmt': 'Cotação', 'DY_fmt': 'Dividend Yield', 'PVP_fmt': 'P/VP', 'Liquidez_fmt': 'Liquidez', 'FFOYield_fmt': 'FFO Yield', 'ValorMercado_fmt': 'Valor de Mercado', 'QtdImoveis_fmt': 'Qtd de imóveis', 'Vacancia_fmt': 'Vacância Média', 'OscDia_fmt': 'Osc. Dia', 'OscMes_fmt': 'Osc. Mês', 'Osc12M_fmt': 'Osc. 12 Meses'}
+PAYLOAD_PAGE_SIZE = 50
+
+def _json_column(values):
+    # NaN / pd.NA -> None (null no JSON); colunas sem ausentes saem direto do tolist
+    values = pd.Series(values); missing = values.isna()
+    if not missing.any(): return values.tolist()
+    return values.astype(object).where(~missing, None).tolist()
+
+def _date_sort_key(values):
+    # 'dd/mm/aaaa' -> aaaammdd (float; datas inválidas/ausentes -> NaN)
+    dates = pd.to_datetime(pd.Series(values, dtype=object), format='%d/%m/%Y', errors='coerce')
+    return dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day
+
+def build_table_payload(df, segments, page_size=PAYLOAD_PAGE_SIZE):
+    frame = build_template_frame(df); empty = [None] * len(frame)
+    columns = [_json_column(frame[name]) if name in frame.columns else empty for name in PAYLOAD_COLUMNS]
+    sort_columns = [_json_column(pd.to_numeric(frame[source], errors='coerce')) if source in frame.columns else empty for source in PAYLOAD_SORT_KEYS.values()]
+    sort_columns.append(_json_column(_date_sort_key(frame['Data Último Relatório'])))
+    return {
+        'columns': PAYLOAD_COLUMNS, 'sortKeys': list(PAYLOAD_SORT_KEYS), 'segments': list(segments), 'pageSize': int(page_size),
+        'rows': [list(row) for row in zip(*columns)], 'sortValues': [list(row) for row in zip(*sort_columns)],
+    }
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+# Camada HTTP compartilhada: sessão com pool de conexões keep-alive e compressão, limite de taxa (token bucket),
+# novas tentativas com backoff exponencial e jitter (tenacity; respeita 429/Retry-After), circuit breaker por host
+# e busca concorrente com ordem preservada. Falhas viram FetchError (com `retryable`) em vez de dados vazios.
+# Buscas com `scope` (ex.: PDFs do FNET em fii_reports) têm token bucket e circuitos próprios: falhas ou lentidão
+# de um escopo não abrem o circuito nem consomem a taxa da raspagem do Fundamentus, e vice-versa.
+import email.utils
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import fii_cache
+import fii_metrics
+
+# --- Configurações ---
+MAX_CONCURRENT_REQUESTS = 8 # Máximo de requisições em voo ao mesmo tempo
+POOL_SIZE_FACTOR = 3 # Conexões por host no pool = MAX_CONCURRENT_REQUESTS x isso (sessões, atualização de fundo e lote/relatórios ao mesmo tempo)
+REQUESTS_PER_SECOND = 5.0 # Taxa média compartilhada por todas as threads (0 = sem limite)
+RATE_LIMIT_BURST = 5 # Rajada máxima permitida pelo token bucket
+HTTP_CACHE_ENABLED = True # Cache persistente em disco (fii_cache) para as páginas do Fundamentus
+RETRY_ATTEMPTS = 4 # Tentativas por requisição (1 + 3 novas tentativas)
+RETRY_BACKOFF_BASE = 0.5 # Backoff exponencial com jitter: espera aleatória em [0, base * 2^n] s...
+RETRY_BACKOFF_MAX = 10.0 # ...limitada a este teto (s)
+RETRY_AFTER_MAX = 60.0 # Teto (s) para o Retry-After pedido pelo servidor
+RETRY_STATUSES = (429, 500, 502, 503, 504) # Respostas transitórias: nova tentativa
+BREAKER_FAILURE_THRESHOLD = 5 # Falhas seguidas em um host que abrem o circuito
+BREAKER_RESET_TIMEOUT = 30.0 # Tempo (s) com o circuito aberto antes de deixar passar uma requisição de teste
+SCOPE_RATE_LIMITS = {'relatorios': (2.0, 2)} # Escopo -> (req/s, rajada) do token bucket próprio; escopo sem entrada usa a taxa global
+
+
+class FetchError(requests.exceptions.RequestException):
+    # Falha explícita de uma busca. retryable=True: transitória (rede, 429/5xx, circuito aberto) -> não deve ser
+    # memoizada como dado vazio; pode ser tentada de novo em uma próxima passada.
+    def __init__(self, url, message, status=None, retryable=True, retry_after=None):
+        super().__init__(f"{message} ({url})"); self.url = url; self.status = status; self.retryable = retryable; self.retry_after = retry_after
+
+class CircuitOpenError(FetchError):
+    def __init__(self, url, host): super().__init__(url, f"Circuito aberto para {host}: requisição não enviada", retryable=True)
+
+
+class CircuitBreaker:
+    # Fechado -> (N falhas seguidas) aberto: falha imediata sem rede -> (após reset_timeout) meio-aberto:
+    # uma requisição de teste passa; sucesso fecha, falha reabre.
+    def __init__(self, host, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.host = host; self.failure_threshold = failure_threshold; self.reset_timeout = reset_timeout
+        self._failures = 0; self._opened_at = None; self._probing = False; self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None: return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout: return False
+            self._probing = True; return True # Meio-aberto: só esta requisição passa
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None: logging.info(f"Circuito fechado para {self.host}.")
+            self._failures = 0; self._opened_at = None; self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1; was_open = self._opened_at is not None
+            if was_open or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic(); self._probing = False
+                if not was_open: logging.warning(f"Circuito aberto para {self.host} após {self._failures} falhas seguidas; pausando por {self.reset_timeout:.0f} s."); fii_metrics.METRICS.count('circuito_aberto')
+
+    def state(self):
+        with self._lock:
+            if self._opened_at is None: return 'fechado'
+            return 'meio-aberto' if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout else 'aberto'
+
+
+class TokenBucket:
+    # Token bucket thread-safe: cada requisição consome 1 token, reposto a `rate` tokens/s
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate); self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity; self._last = time.monotonic(); self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0: return # Sem limite
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate); self._last = now
+                if self._tokens >= 1: self._tokens -= 1; return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait) # Dorme fora do lock para não bloquear as outras threads
+
+
+RATE_LIMITER = TokenBucket(REQUESTS_PER_SECOND, RATE_LIMIT_BURST)
+
+def configure(max_concurrent=None, requests_per_second=None, burst=None):
+    # Ajusta concorrência e taxa (ex.: benchmarks ou CLI). Recria os buckets, a sessão (pool do tamanho novo) e os circuitos.
+    global MAX_CONCURRENT_REQUESTS, REQUESTS_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMITER
+    if max_concurrent is not None: MAX_CONCURRENT_REQUESTS = max(1, int(max_concurrent))
+    if requests_per_second is not None: REQUESTS_PER_SECOND = float(requests_per_second)
+    if burst is not None: RATE_LIMIT_BURST = burst
+    RATE_LIMITER = TokenBucket(REQUESTS_PER_SECOND, RATE_LIMIT_BURST)
+    with _SESSION_LOCK: _SCOPE_LIMITERS.clear()
+    reset_session()
+
+_SESSION = None; _BREAKERS = {}; _SCOPE_LIMITERS = {}; _SESSION_LOCK = threading.Lock()
+
+def get_session():
+    # Sessão única do processo: conexões keep-alive reaproveitadas (sem novo TCP+TLS por página) e respostas comprimidas
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            # pool_block: acima do tamanho do pool, espera uma conexão livre em vez de abrir uma extra e descartá-la
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENT_REQUESTS * POOL_SIZE_FACTOR, pool_block=True, max_retries=0) # Novas tentativas ficam com o tenacity
+            session.mount('https://', adapter); session.mount('http://', adapter)
+            session.headers['Accept-Encoding'] = 'gzip, deflate'
+            _SESSION = session
+        return _SESSION
+
+def reset_session():
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is not None: _SESSION.close()
+        _SESSION = None; _BREAKERS.clear()
+
+def get_breaker(url, scope=None):
+    # Um circuito por (escopo, host): o mesmo host em outro escopo não herda as falhas
+    host = urlsplit(url).netloc; key = (scope, host)
+    with _SESSION_LOCK:
+        if key not in _BREAKERS: _BREAKERS[key] = CircuitBreaker(host if scope is None else f"{host} ({scope})")
+        return _BREAKERS[key]
+
+def get_limiter(scope=None):
+    # Token bucket do escopo (criado no primeiro uso, com a taxa de SCOPE_RATE_LIMITS); sem escopo, o global
+    if scope is None or scope not in SCOPE_RATE_LIMITS: return RATE_LIMITER
+    with _SESSION_LOCK:
+        if scope not in _SCOPE_LIMITERS: _SCOPE_LIMITERS[scope] = TokenBucket(*SCOPE_RATE_LIMITS[scope])
+        return _SCOPE_LIMITERS[scope]
+
+def breaker_states():
+    with _SESSION_LOCK: breakers = list(_BREAKERS.values())
+    return {b.host: b.state() for b in breakers}
+
+def _retry_after_seconds(value):
+    # Retry-After em segundos ou como data HTTP
+    if not value: return None
+    try: return max(0.0, float(value))
+    except ValueError: pass
+    try: return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError): return None
+
+_HTTP_CACHE = None; _HTTP_CACHE_LOCK = threading.Lock()
+
+def get_cache():
+    # Cache HTTP compartilhado pelo processo (criado na primeira utilização)
+    global _HTTP_CACHE
+    if not HTTP_CACHE_ENABLED: return None
+    with _HTTP_CACHE_LOCK:
+        if _HTTP_CACHE is None:
+            try: _HTTP_CACHE = fii_cache.HttpCache()
+            except Exception as e: logging.warning(f"Cache HTTP indisponível ({e}). Seguindo sem cache."); return None
+    return _HTTP_CACHE
+
+def cache_stats():
+    cache = get_cache()
+    return cache.get_stats() if cache else {}
+
+def expire_cached(urls):
+    # Páginas que sabidamente mudaram: revalidadas na rede na próxima busca, mesmo dentro do TTL
+    cache = get_cache()
+    return cache.expire(urls) if cache else 0
+
+def _attempt(url, headers, timeout, scope=None):
+    # Uma tentativa: circuito -> token bucket -> rede. 429/5xx e erros de rede viram FetchError (retryable).
+    breaker = get_breaker(url, scope)
+    if not breaker.allow(): raise CircuitOpenError(url, breaker.host)
+    get_limiter(scope).acquire()
+    start = time.perf_counter() # Latência medida depois do token bucket (só o tempo de rede)
+    try: response = get_session().get(url, headers=headers, timeout=timeout, verify=True)
+    except requests.exceptions.RequestException as e:
+        fii_metrics.METRICS.record_request(time.perf_counter() - start); breaker.record_failure()
+        raise FetchError(url, f"Erro de rede: {e}") from e
+    fii_metrics.METRICS.record_request(time.perf_counter() - start, len(response.content), response.status_code)
+    if response.status_code in RETRY_STATUSES:
+        breaker.record_failure()
+        raise FetchError(url, f"HTTP {response.status_code}", status=response.status_code, retry_after=_retry_after_seconds(response.headers.get('Retry-After')))
+    breaker.record_success()
+    return response
+
+def _should_retry(exc): return isinstance(exc, FetchError) and exc.retryable and not isinstance(exc, CircuitOpenError)
+
+_BACKOFF = None # wait_random_exponential do tenacity, criado no primeiro uso (importação sob demanda)
+
+def _wait(retry_state):
+    # Retry-After do servidor (429/503) tem precedência sobre o backoff
+    global _BACKOFF
+    retry_after = getattr(retry_state.outcome.exception(), 'retry_after', None)
+    if retry_after is not None: return min(retry_after, RETRY_AFTER_MAX)
+    if _BACKOFF is None:
+        from tenacity import wait_random_exponential
+        _BACKOFF = wait_random_exponential(multiplier=RETRY_BACKOFF_BASE, max=RETRY_BACKOFF_MAX)
+    return _BACKOFF(retry_state)
+
+def _log_retry(retry_state):
+    fii_metrics.METRICS.count('novas_tentativas')
+    logging.info(f"Nova tentativa {retry_state.attempt_number}/{RETRY_ATTEMPTS - 1} em {retry_state.next_action.sleep:.1f} s: {retry_state.outcome.exception()}")
+
+def _retrying():
+    # tenacity só é importado na primeira requisição (não pesa na inicialização do app/CLI)
+    from tenacity import Retrying, retry_if_exception, stop_after_attempt
+    return Retrying(stop=stop_after_attempt(RETRY_ATTEMPTS), wait=_wait, retry=retry_if_exception(_should_retry), before_sleep=_log_retry, reraise=True)
+
+def get(url, headers=None, timeout=30, use_cache=True, scope=None):
+    # GET com pacing pelo token bucket (o do escopo, se houver) e novas tentativas (backoff com jitter; Retry-After respeitado).
+    # Com cache: hit dentro do TTL não toca a rede; entrada vencida vira GET condicional (ETag/Last-Modified).
+    # Esgotadas as tentativas (ou circuito aberto), levanta FetchError; outras respostas (ex.: 404) voltam ao chamador.
+    cache = get_cache() if use_cache else None
+    entry = cache.lookup(url) if cache else None
+    if entry is not None and entry.is_fresh():
+        cache.record('hits'); fii_metrics.METRICS.record_request(0.0, cached=True); return entry.to_response()
+    request_headers = dict(headers or {})
+    if entry is not None: request_headers.update(entry.validators())
+    response = _retrying()(_attempt, url, request_headers, timeout, scope)
+    if cache is None: return response
+    if response.status_code == 304 and entry is not None:
+        cache.revalidate(entry, response); return entry.to_response()
+    cache.record('misses')
+    if response.status_code == 200: cache.store(url, response)
+    return response
+
+def fetch_concurrent(func, items, max_workers=None, progress_callback=None):
+    # Executa func(item) em um pool de threads limitado e devolve os resultados NA ORDEM de `items`
+    items = list(items); results = [None] * len(items)
+    if not items: return results
+    workers = max(1, min(max_workers or MAX_CONCURRENT_REQUESTS, len(items)))
+    logging.debug(f"Busca concorrente: {len(items)} itens, {workers} workers, {REQUESTS_PER_SECOND} req/s.")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fii-fetch') as pool:
+        futures = {pool.submit(func, item): pos for pos, item in enumerate(items)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if progress_callback: progress_callback(done, len(items))
+    return results
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Instrumentação do pipeline: tempo por estágio, histograma de latência das requisições e bytes baixados.
+# Um coletor por processo (METRICS), thread-safe; exporta para dict/JSON (painel de debug do app, fii_batch).
+# Perfilamento opcional de uma execução com cProfile (padrão) ou pyinstrument (se instalado).
+import io
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Configurações ---
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0) # Limites superiores (s); o último balde é "> 10 s"
+# Estágios instrumentados, na ordem do pipeline (a exportação segue esta ordem; estágios extras vão ao fim)
+STAGES = ['resumo.busca', 'resumo.parse', 'limpeza', 'classificacao', 'filtro', 'ranking', 'detalhes.busca', 'detalhes.parse', 'relatorios.download', 'relatorios.extracao', 'formatacao', 'render', 'exportacao', 'backtest.painel', 'backtest.simulacao']
+PROFILE_TOP_N = 30 # Linhas do relatório do cProfile
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock(); self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}; self._counters = {}; self._started = time.time()
+            self._requests = {'count': 0, 'cached': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0, 'status': {}, 'histogram': [0] * (len(LATENCY_BUCKETS) + 1)}
+
+    # --- Estágios ---
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try: yield
+        finally: self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name, seconds, items=None):
+        with self._lock:
+            s = self._stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max': 0.0, 'items': 0})
+            s['calls'] += 1; s['seconds'] += seconds; s['max'] = max(s['max'], seconds)
+            if items: s['items'] += items
+
+    # --- Requisições ---
+    def record_request(self, seconds, nbytes=0, status=None, cached=False):
+        # cached=True: resposta servida pelo cache em disco (sem rede; não entra no histograma nem nos bytes)
+        with self._lock:
+            r = self._requests; r['count'] += 1
+            if cached: r['cached'] += 1; return
+            if status is None or status >= 400: r['errors'] += 1
+            key = str(status) if status is not None else 'erro'; r['status'][key] = r['status'].get(key, 0) + 1
+            r['bytes'] += int(nbytes or 0); r['seconds'] += seconds
+            r['histogram'][next((i for i, limit in enumerate(LATENCY_BUCKETS) if seconds <= limit), len(LATENCY_BUCKETS))] += 1
+
+    def count(self, name, n=1):
+        # Contadores de eventos (novas tentativas, circuito aberto, falhas de detalhes...)
+        with self._lock: self._counters[name] = self._counters.get(name, 0) + n
+
+    def downloaded_bytes(self):
+        with self._lock: return self._requests['bytes']
+
+    # --- Exportação ---
+    def to_dict(self):
+        with self._lock:
+            order = {name: i for i, name in enumerate(STAGES)}
+            stages = {name: {**s, 'seconds': round(s['seconds'], 4), 'max': round(s['max'], 4)} for name, s in sorted(self._stages.items(), key=lambda kv: order.get(kv[0], len(order)))}
+            r = self._requests; network = r['count'] - r['cached']
+            labels = [f"<= {limit:g}s" for limit in LATENCY_BUCKETS] + [f"> {LATENCY_BUCKETS[-1]:g}s"]
+            return {
+                'since': self._started, 'stages': stages,
+                'requests': {'count': r['count'], 'cached': r['cached'], 'network': network, 'errors': r['errors'], 'bytes': r['bytes'],
+                             'mean_latency': round(r['seconds'] / network, 4) if network else None, 'status': dict(r['status']),
+                             'latency_histogram': dict(zip(labels, r['histogram']))},
+                'counters': dict(self._counters),
+            }
+
+    def to_json(self, path=None, indent=2):
+        text = json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f: f.write(text)
+        return text
+
+
+METRICS = Metrics()
+stage = METRICS.stage # Atalho: with fii_metrics.stage('filtro'): ...
+
+
+# --- Perfilamento opcional (uma execução) ---
+class ProfileResult:
+    def __init__(self, backend): self.backend = backend; self.text = None; self.html = None; self.seconds = None
+
+@contextmanager
+def profile_run(backend='cprofile', top_n=PROFILE_TOP_N):
+    # with profile_run() as prof: ...  -> prof.text (relatório) ao sair. 'pyinstrument' também gera prof.html;
+    # sem o pacote instalado, cai para o cProfile.
+    result = ProfileResult(backend); profiler = None
+    if backend == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler(); profiler.start()
+        except ImportError:
+            logging.warning("pyinstrument não instalado; usando cProfile."); result.backend = backend = 'cprofile'
+    if backend == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile(); profiler.enable()
+    start = time.perf_counter()
+    try: yield result
+    finally:
+        result.seconds = time.perf_counter() - start
+        if backend == 'pyinstrument':
+            profiler.stop(); result.text = profiler.output_text(unicode=True); result.html = profiler.output_html()
+        else:
+            import pstats
+            profiler.disable(); buffer = io.StringIO()
+            pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(top_n); result.text = buffer.getvalue()
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# Parsers das páginas do Fundamentus.
+# Detalhes (detalhes.php): lxml em uma única passada pela árvore; BeautifulSoup/html5lib mantido como fallback.
+# Resumo (fii_resultado.php): leitura direta da tabela "tabelaResultado" (sem DOM, colunas já tipadas);
+# pd.read_html mantido como fallback. Os bytes são decodificados uma vez pelo charset declarado (sem chardet).
+import html
+import io
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+DETAIL_PARSER = 'lxml' # 'lxml' (rápido) ou 'bs4' (BeautifulSoup + html5lib, comportamento original)
+OSC_LABELS_MAP = {'Dia': 'osc_dia', 'Mês': 'osc_mes', '12 meses': 'osc_12m'}
+DATE_RE = re.compile(r'(\d{2}/\d{2}/\d{4})')
+DOWNLOAD_IMG_RE = re.compile(r'download', re.IGNORECASE)
+FNET_LINK_TEXT_RE = re.compile(r'^\s*Pesquisar Documentos\s*$', re.IGNORECASE)
+
+SUMMARY_PARSER = 'direct' # 'direct' (tabela tabelaResultado, colunas tipadas) ou 'read_html' (pandas, comportamento original)
+SUMMARY_TABLE_ID = 'tabelaResultado'
+SUMMARY_TEXT_COLUMNS = ('Papel', 'Segmento') # Demais colunas do resumo são numéricas (formato brasileiro)
+DEFAULT_CHARSET = 'iso-8859-1' # Charset do Fundamentus, usado se a resposta não declarar outro
+CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+SUMMARY_TABLE_RE = re.compile(r'<table[^>]*\bid=["\']?' + SUMMARY_TABLE_ID + r'\b[^>]*>', re.IGNORECASE)
+INNER_TAG_RE = re.compile(r'<(?!/?t[dhr][\s>])[^>]*>', re.IGNORECASE) # Tags dentro das células (<span>, <a>...)
+ROW_RE = re.compile(r'<tr[^>]*>(.*?)</tr>', re.IGNORECASE | re.DOTALL)
+CELL_RE = re.compile(r'<t[dh][^>]*>([^<]*)</t[dh]>', re.IGNORECASE)
+
+
+def _absolute_url(href, base_url):
+    prefix = base_url.rstrip('/')
+    if href.startswith('/'): return prefix + href
+    if href.startswith('http'): return href
+    return prefix + '/' + href.lstrip('/')
+
+# --- Limpeza numérica (formato brasileiro), compartilhada com rank_fiis ---
+def clean_numeric_value(value):
+    if isinstance(value, (int, float)): return float(value)
+    if isinstance(value, str):
+        try: cleaned = value.replace('R$', '').replace('.', '').replace(',', '.').replace('%', '').strip(); return float(cleaned) if cleaned else np.nan
+        except ValueError: return np.nan
+    return np.nan
+
+# Versão vetorizada de clean_numeric_value (mesmo resultado), usada na limpeza do resumo.
+# As operações de texto rodam em kernels do Arrow (pyarrow já é dependência) em vez de um loop Python por célula.
+def clean_numeric_text(text):
+    # 'R$', separador de milhar e '%' são descartados; ',' vira '.'; vazio vira nulo
+    for junk in ('R$', '.', '%'): text = pc.replace_substring(text, junk, '')
+    text = pc.utf8_trim_whitespace(pc.replace_substring(text, ',', '.'))
+    text = pc.if_else(pc.equal(text, ''), pa.scalar(None, pa.string()), text)
+    try: return pc.cast(text, pa.float64()).to_numpy(zero_copy_only=False)
+    except pa.ArrowInvalid: return pd.to_numeric(pd.Series(text.to_pandas()), errors='coerce').to_numpy(dtype=float) # Há texto não numérico
+
+def clean_numeric_series(series):
+    # Fast path: read_html (decimal=',', thousands='.') já entrega colunas numéricas -> só converte para float
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series): return series.astype(float)
+    try: return pd.Series(clean_numeric_text(pa.array(series, type=pa.string(), from_pandas=True)), index=series.index, dtype=float)
+    except (pa.ArrowInvalid, pa.ArrowTypeError): pass # Coluna mista (texto + números já convertidos)
+    is_str = series.map(type) == str
+    result = pd.Series(clean_numeric_text(pa.array(series.where(is_str, None), type=pa.string(), from_pandas=True)), index=series.index, dtype=float)
+    non_str = ~is_str & series.notna() # Células já numéricas (int/float) em coluna object
+    if non_str.any(): result[non_str] = pd.to_numeric(series[non_str], errors='coerce')
+    return result
+
+def _osc_value(text):
+    value = clean_numeric_value(text)
+    return np.nan if pd.isna(value) else value / 100.0
+
+# --- Backend lxml (uma passada) ---
+def parse_details_lxml(html_text, base_url):
+    import lxml.html
+    root = lxml.html.document_fromstring(html_text)
+    report_date = "N/A"; download_link = None; fnet_docs_url = None
+    temp_osc = {'osc_dia': np.nan, 'osc_mes': np.nan, 'osc_12m': np.nan}; report_found = False
+    for el in root.iter('td', 'a'):
+        if el.tag == 'a':
+            # 3. Link "Pesquisar Documentos" (FNET): primeiro <a> cujo único texto casa com o padrão
+            if fnet_docs_url is None and len(el) == 0 and el.text and FNET_LINK_TEXT_RE.match(el.text):
+                href = el.get('href')
+                fnet_docs_url = _absolute_url(href, base_url) if href and not href.startswith('http') else href
+            continue
+        if 'label' not in (el.get('class') or '').split(): continue
+        label_text = ''.join(part.strip() for part in el.itertext())
+        if not report_found and 'relatório' in label_text.lower():
+            # 1. Data e link do último relatório (primeiro label com "relatório")
+            report_found = True; value_td = el.getnext()
+            while value_td is not None and value_td.tag != 'td': value_td = value_td.getnext()
+            if value_td is not None:
+                imgs = value_td.findall('.//img')
+                img = next((i for i in imgs if i.get('alt') == 'Download'), None)
+                if img is None: img = next((i for i in imgs if DOWNLOAD_IMG_RE.search(i.get('src') or '')), None)
+                if img is not None:
+                    parent_link = next((a for a in img.iterancestors('a') if a.get('href') is not None), None)
+                    if parent_link is not None: download_link = _absolute_url(parent_link.get('href'), base_url)
+                date_match = DATE_RE.search(' '.join(part.strip() for part in value_td.itertext() if part.strip()))
+                if date_match: report_date = date_match.group(1)
+        elif label_text in OSC_LABELS_MAP:
+            # 2. Oscilações: próximo <td class="data"> e seu primeiro <span>
+            value_td = el.getnext()
+            while value_td is not None and not (value_td.tag == 'td' and 'data' in (value_td.get('class') or '').split()): value_td = value_td.getnext()
+            span = value_td.find('.//span') if value_td is not None else None
+            if span is not None:
+                value = _osc_value(''.join(span.itertext()).strip())
+                if not pd.isna(value): temp_osc[OSC_LABELS_MAP[label_text]] = value
+    return report_date, download_link, temp_osc['osc_dia'], temp_osc['osc_mes'], temp_osc['osc_12m'], fnet_docs_url
+
+# --- Backend BeautifulSoup/html5lib (lógica original de fetch_fii_details) ---
+def parse_details_bs4(html_text, base_url):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_text, 'html5lib')
+    report_date = "N/A"; download_link = None; fnet_docs_url = None
+
+    # 1. Busca Data e Link do Último Relatório
+    label_td_report = None; all_labels = soup.find_all('td', class_='label')
+    for label in all_labels:
+        if 'relatório' in label.get_text(strip=True).lower(): label_td_report = label; break
+    if label_td_report:
+        value_td_report = label_td_report.find_next_sibling('td') # Não precisa classe aqui
+        if value_td_report:
+            img_tag = value_td_report.find('img', alt='Download')
+            if not img_tag: img_tag = value_td_report.find('img', src=DOWNLOAD_IMG_RE)
+            if img_tag:
+                parent_link = img_tag.find_parent('a', href=True)
+                if parent_link: download_link = _absolute_url(parent_link['href'], base_url)
+            cell_text_report = value_td_report.get_text(separator=' ', strip=True)
+            date_match = DATE_RE.search(cell_text_report)
+            if date_match: report_date = date_match.group(1)
+
+    # 2. Busca Oscilações
+    temp_osc = {'osc_dia': np.nan, 'osc_mes': np.nan, 'osc_12m': np.nan}
+    for label in all_labels:
+        label_text = label.get_text(strip=True)
+        if label_text in OSC_LABELS_MAP:
+            value_td_osc = label.find_next_sibling('td', class_='data')
+            value_span = value_td_osc.find('span') if value_td_osc else None
+            if value_span:
+                numeric_value = _osc_value(value_span.get_text(strip=True))
+                if not pd.isna(numeric_value): temp_osc[OSC_LABELS_MAP[label_text]] = numeric_value
+
+    # 3. Busca Link "Pesquisar Documentos" para FNET
+    link_pesquisar = soup.find('a', string=FNET_LINK_TEXT_RE)
+    if link_pesquisar:
+        fnet_docs_url = link_pesquisar.get('href')
+        if fnet_docs_url and not fnet_docs_url.startswith('http'):
+            # Adiciona o domínio base se for um link relativo (embora deva ser absoluto)
+            fnet_docs_url = base_url.rstrip('/') + '/' + fnet_docs_url.lstrip('/')
+    return report_date, download_link, temp_osc['osc_dia'], temp_osc['osc_mes'], temp_osc['osc_12m'], fnet_docs_url
+
+DETAIL_PARSERS = {'lxml': parse_details_lxml, 'bs4': parse_details_bs4}
+
+def parse_details(html_text, base_url, backend=None):
+    # Usa o backend configurado; se falhar (ou lxml não estiver instalado), cai para o BeautifulSoup
+    backend = backend or DETAIL_PARSER
+    try: return DETAIL_PARSERS[backend](html_text, base_url)
+    except Exception as e:
+        if backend == 'bs4': raise
+        logging.debug(f"Parser '{backend}' falhou ({e}); usando BeautifulSoup.")
+        return parse_details_bs4(html_text, base_url)
+
+
+# --- Página de resumo (fii_resultado.php) ---
+def page_charset(body, content_type=None):
+    # Charset do cabeçalho Content-Type ou do <meta> (início da página); ISO-8859-1 lido como cp1252, como nos navegadores
+    match = re.search(r'charset=["\']?([\w-]+)', content_type or '', re.IGNORECASE)
+    charset = match.group(1) if match else None
+    if charset is None:
+        meta = CHARSET_RE.search(body[:4096])
+        charset = meta.group(1).decode('ascii') if meta else DEFAULT_CHARSET
+    charset = charset.lower()
+    return 'cp1252' if charset in ('iso-8859-1', 'latin-1', 'latin1', 'us-ascii', 'ascii') else charset
+
+def decode_page(body, content_type=None):
+    # Bytes -> texto em uma única decodificação (substitui response.apparent_encoding, que roda o chardet na página toda)
+    if isinstance(body, str): return body
+    try: return body.decode(page_charset(body, content_type), errors='replace')
+    except LookupError: return body.decode(DEFAULT_CHARSET, errors='replace') # Charset desconhecido declarado
+
+def _table_html(text):
+    # Trecho da tabela tabelaResultado, sem as tags internas das células (só tr/td/th sobram)
+    start = SUMMARY_TABLE_RE.search(text)
+    if start is None: raise ValueError(f"Tabela '{SUMMARY_TABLE_ID}' não encontrada na página de resumo.")
+    end = text.lower().find('</table>', start.end())
+    return INNER_TAG_RE.sub('', text[start.end():end if end >= 0 else len(text)])
+
+def parse_summary_direct(body, content_type=None):
+    # Uma passada por expressões regulares só sobre a tabela tabelaResultado (sem montar DOM nem procurar outras
+    # tabelas). Papel/Segmento ficam como texto; as demais colunas saem float64 (vírgula decimal, ponto de milhar
+    # e '%' removidos; percentuais na unidade da página, ex.: 9.33 para "9,33%"), como o read_html + limpeza.
+    table = _table_html(decode_page(body, content_type))
+    if '&' in table: table = html.unescape(table) # Entidades (&amp;, &nbsp;...) só se existirem; tags já removidas
+    rows = ROW_RE.findall(table)
+    columns = [c.strip() for c in CELL_RE.findall(rows[0])] if rows else []
+    if 'Papel' not in columns: raise ValueError(f"Cabeçalho inesperado na tabela '{SUMMARY_TABLE_ID}': {columns}")
+    width = len(columns); cells = []
+    for row in rows[1:]:
+        values = CELL_RE.findall(row)
+        if len(values) == width: cells.extend(values) # Linhas fora do esquema (ex.: rodapé) são ignoradas
+    data = {}
+    for i, name in enumerate(columns):
+        column = cells[i::width]
+        data[name] = np.array([c.strip() for c in column], dtype=object) if name in SUMMARY_TEXT_COLUMNS else clean_numeric_text(pa.array(column, type=pa.string()))
+    return pd.DataFrame(data, columns=columns)
+
+def parse_summary_read_html(body, content_type=None):
+    # Comportamento original: detecção genérica de tabelas do pandas, primeira tabela da página
+    tables = pd.read_html(io.StringIO(decode_page(body, content_type)), decimal=',', thousands='.')
+    if not tables: raise ValueError("Nenhuma tabela encontrada na página de resumo.")
+    df = tables[0]; df.columns = df.columns.str.strip()
+    return df
+
+SUMMARY_PARSERS = {'direct': parse_summary_direct, 'read_html': parse_summary_read_html}
+
+def parse_summary(body, content_type=None, backend=None):
+    # Usa o backend configurado; se a página fugir do esquema conhecido, cai para o read_html
+    backend = backend or SUMMARY_PARSER
+    try: return SUMMARY_PARSERS[backend](body, content_type)
+    except Exception as e:
+        if backend == 'read_html': raise
+        logging.warning(f"Parser de resumo '{backend}' falhou ({e}); usando pd.read_html.")
+        return parse_summary_read_html(body, content_type)
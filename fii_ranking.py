@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Motor de ranking: matriz de ranks (NumPy int) montada uma vez por conjunto de dados; mudança de pesos
+# = um produto matriz-vetor + argsort/argpartition, com a permutação em cache até os dados mudarem
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+RANK_COLUMNS = ['Rank_PVP', 'Rank_DY', 'Rank_Liquidez', 'Rank_Vacancia'] # Ordem dos pesos (pvp, dy, liq, vac)
+SCORE_COLUMN = 'Score_Ponderado'
+MAX_CACHED_ENGINES = 8 # Conjuntos de dados distintos mantidos em memória
+MAX_CACHED_ORDERS = 64 # Vetores de pesos memorizados por motor
+DEFAULT_WEIGHTS = {'pvp': 7, 'dy': 10, 'liquidez': 3, 'vacancia': 2} # Pesos padrão na ordem de RANK_COLUMNS (mesmos dos sliders do app)
+
+
+def build_rank_matrix(df):
+    # n x 4 (int64). Rank ausente vale n + 1, como no cálculo original do score
+    n = len(df); max_rank = n + 1
+    matrix = np.zeros((n, len(RANK_COLUMNS)), dtype=np.int64)
+    for j, col in enumerate(RANK_COLUMNS):
+        if col in df.columns: matrix[:, j] = df[col].astype('Float64').fillna(max_rank).to_numpy(dtype=np.int64)
+    return matrix
+
+def fingerprint(df, rank_matrix=None):
+    # Identifica o conjunto de dados (tickers + ranks); qualquer mudança gera um motor novo
+    digest = hashlib.sha1((build_rank_matrix(df) if rank_matrix is None else rank_matrix).tobytes())
+    digest.update('\0'.join(df['Papel'].astype(str)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RankingEngine:
+    def __init__(self, df, rank_matrix=None):
+        self.rank_matrix = build_rank_matrix(df) if rank_matrix is None else rank_matrix; self.n = len(self.rank_matrix)
+        self._orders = OrderedDict(); self._lock = threading.Lock()
+
+    def scores(self, weights):
+        return self.rank_matrix @ np.asarray(weights, dtype=np.int64)
+
+    def order(self, weights, top_n=None):
+        # Posições (iloc) ordenadas por score crescente; empate desfeito pela ordem original (estável).
+        # top_n usa argpartition: O(n) para separar os N melhores + ordenação só deles.
+        weights = tuple(int(w) for w in weights); top_n = None if top_n is None or top_n >= self.n else max(0, int(top_n))
+        key = (weights, top_n)
+        with self._lock:
+            if key in self._orders: self._orders.move_to_end(key); return self._orders[key]
+        scores = self.scores(weights)
+        if top_n is None: positions = np.argsort(scores, kind='stable')
+        else:
+            composite = scores * self.n + np.arange(self.n) # Chave única = (score, posição original)
+            positions = np.argpartition(composite, top_n - 1)[:top_n] if top_n else np.empty(0, dtype=np.intp)
+            positions = positions[np.argsort(composite[positions])]
+        result = (positions, scores[positions])
+        with self._lock:
+            self._orders[key] = result
+            while len(self._orders) > MAX_CACHED_ORDERS: self._orders.popitem(last=False)
+        return result
+
+    def page(self, weights, page, page_size, top_n=None):
+        # Página `page` (0 = primeira) do ranking limitado aos top_n: argpartition só até o fim da página pedida.
+        # Devolve (posições, scores, total de linhas paginadas)
+        total = self.n if top_n is None else min(self.n, max(0, int(top_n)))
+        start = min(max(0, int(page)) * page_size, total); stop = min(start + page_size, total)
+        positions, scores = self.order(weights, top_n=stop)
+        return positions[start:stop], scores[start:stop], total
+
+    def ranked_page(self, df, weights, page, page_size, top_n=None):
+        positions, scores, total = self.page(weights, page, page_size, top_n)
+        ranked = df.iloc[positions].assign(**{SCORE_COLUMN: pd.array(scores, dtype='Int64')})
+        return ranked, total
+
+    def ranked_frame(self, df, weights, top_n=None):
+        # df ordenado pelo score (menor = melhor) com a coluna Score_Ponderado
+        positions, scores = self.order(weights, top_n)
+        ranked = df.iloc[positions].assign(**{SCORE_COLUMN: pd.array(scores, dtype='Int64')})
+        return ranked
+
+
+_ENGINES = OrderedDict(); _ENGINES_LOCK = threading.Lock()
+
+def get_engine(df, key=None):
+    # Motor memoizado. key = (versão do universo, filtros) quando o chamador a tem: acerto sem montar a matriz
+    # de ranks nem o hash; sem key (dado sem versão), cai no fingerprint do conteúdo.
+    rank_matrix = None
+    if key is None: rank_matrix = build_rank_matrix(df); key = fingerprint(df, rank_matrix)
+    else: key = ('versao', key)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is not None: _ENGINES.move_to_end(key); return engine
+    engine = RankingEngine(df, rank_matrix)
+    with _ENGINES_LOCK:
+        _ENGINES[key] = engine
+        while len(_ENGINES) > MAX_CACHED_ENGINES: _ENGINES.popitem(last=False)
+    return engine
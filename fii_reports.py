@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+# Ingestão dos relatórios gerenciais (PDF) linkados em "Link Download Relatório": download para um cache
+# endereçado por conteúdo (sha256), pulando tickers cujo "Data Último Relatório" não mudou; extração de texto,
+# campos-chave e tabelas com PyMuPDF em um pool de processos (memória limitada por worker); resultados em um
+# índice SQLite local (fii_relatorios.sqlite) para o ranking juntar campos derivados dos relatórios por ticker.
+# Os workers (spawn) só importam este módulo e o PyMuPDF; pandas e rank_fiis são importados sob demanda.
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import fii_http
+import fii_metrics
+
+# --- Configurações ---
+REPORTS_DIR = "relatorios" # PDFs em relatorios/<sha[:2]>/<sha>.pdf (mesmo PDF para dois tickers/datas = um arquivo)
+REPORTS_DB_FILE = "fii_relatorios.sqlite"
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1))) # Processos de extração
+WORKER_MAX_TASKS = 50 # Relatórios por processo antes de reciclá-lo (devolve memória fragmentada / vazada pelo MuPDF)
+WORKER_MEMORY_MB = 1024 # Limite de espaço de endereçamento por worker (RLIMIT_AS; só Unix). None = sem limite
+MAX_PDF_BYTES = 30 * 1024 * 1024 # Relatórios maiores são ignorados
+MAX_PAGES = 60 # Páginas lidas por relatório (relatórios gerenciais trazem o essencial nas primeiras)
+MAX_TEXT_CHARS = 200_000 # Texto guardado por relatório
+TABLE_MAX_PAGES = 6 # Páginas em que se procuram tabelas (find_tables é o passo mais caro)
+TABLE_MAX_ROWS = 40 # Linhas guardadas por tabela
+MAX_TABLES = 8 # Tabelas-chave guardadas por relatório
+TABLE_KEYWORDS = re.compile(r'rendimento|dividendo|distribui|vac[âa]ncia|inadimpl|resultado|receita|cotistas', re.IGNORECASE)
+DOWNLOAD_TIMEOUT = 60
+HTTP_SCOPE = 'relatorios' # Escopo em fii_http: taxa e circuitos próprios (FNET lento/fora do ar não trava a raspagem do Fundamentus)
+
+_NUMBER = r'(\d{1,3}(?:\.\d{3})*(?:,\d+)?|\d+(?:,\d+)?)'
+# Campo -> (regex com o número no grupo 1, tipo). 'percentage' vira fração (0.035 = 3,5%), como no resto do pipeline
+REPORT_FIELDS = {
+    'Rendimento por Cota (Relatório)': (re.compile(r'(?:rendimentos?|dividendos?|distribui[çc][ãa]o)\s+(?:m[ée]di[oa]\s+)?(?:por|/)\s*cota[^\d%]{0,40}?' + _NUMBER, re.IGNORECASE), 'float'),
+    'Vacância Física (Relatório)': (re.compile(r'vac[âa]ncia\s+f[íi]sica[^\d%]{0,40}?' + _NUMBER + r'\s*%', re.IGNORECASE), 'percentage'),
+    'Inadimplência (Relatório)': (re.compile(r'inadimpl[êe]ncia[^\d%]{0,40}?' + _NUMBER + r'\s*%', re.IGNORECASE), 'percentage'),
+    'Cotistas (Relatório)': (re.compile(r'(?:n[úu]mero|n[º°o]\.?|quantidade|total)\s+de\s+cotistas[^\d%]{0,40}?' + _NUMBER, re.IGNORECASE), 'integer'),
+    'VP por Cota (Relatório)': (re.compile(r'valor\s+patrimonial\s+(?:por|/)\s*cota[^\d%]{0,40}?' + _NUMBER, re.IGNORECASE), 'float'),
+}
+FIELD_COLUMNS = list(REPORT_FIELDS)
+
+
+# --- Extração (roda nos workers) ---
+def _br_number(text, kind):
+    value = float(text.replace('.', '').replace(',', '.'))
+    return value / 100 if kind == 'percentage' else int(value) if kind == 'integer' else value
+
+def extract_fields(text):
+    # Primeira ocorrência de cada campo-chave no texto do relatório (ausente = não entra no dict)
+    fields = {}
+    for name, (pattern, kind) in REPORT_FIELDS.items():
+        match = pattern.search(text)
+        if match:
+            try: fields[name] = _br_number(match.group(1), kind)
+            except ValueError: continue
+    return fields
+
+def _init_worker(memory_mb):
+    logging.getLogger().setLevel(logging.WARNING)
+    if not memory_mb: return
+    try: import resource
+    except ImportError: return # Windows: sem limite por processo
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+
+def extract_report(path):
+    # Texto (páginas separadas por \f), campos-chave e tabelas com palavras-chave de um PDF em disco.
+    # Uma página por vez e nada além dos limites acima fica em memória; o store do MuPDF é esvaziado no fim.
+    import pymupdf
+    # 'transitorio': falha que pode não se repetir (memória), não registrada no store para o PDF ser tentado de novo
+    start = time.perf_counter(); result = {'paginas': 0, 'texto': '', 'campos': {}, 'tabelas': [], 'erro': None, 'transitorio': False}
+    doc = None
+    try:
+        doc = pymupdf.open(path); parts = []; size = 0
+        for number in range(min(doc.page_count, MAX_PAGES)):
+            page = doc.load_page(number); result['paginas'] += 1
+            want_tables = number < TABLE_MAX_PAGES and len(result['tabelas']) < MAX_TABLES
+            text = page.get_text('text') if size < MAX_TEXT_CHARS or want_tables else ''
+            if size < MAX_TEXT_CHARS: parts.append(text[:MAX_TEXT_CHARS - size]); size += len(parts[-1])
+            if want_tables and TABLE_KEYWORDS.search(text): # find_tables só em páginas que citam os indicadores
+                for table in page.find_tables().tables:
+                    rows = [[(cell or '').strip() for cell in row] for row in table.extract()[:TABLE_MAX_ROWS]]
+                    if rows and TABLE_KEYWORDS.search(' '.join(' '.join(r) for r in rows[:3])):
+                        result['tabelas'].append({'pagina': number + 1, 'linhas': rows})
+                        if len(result['tabelas']) >= MAX_TABLES: break
+        result['texto'] = '\f'.join(parts); result['campos'] = extract_fields(result['texto'])
+    except MemoryError: result['erro'] = f"Memória insuficiente (limite de {WORKER_MEMORY_MB} MB por worker)"; result['transitorio'] = True
+    except Exception as e: result['erro'] = f"{type(e).__name__}: {e}"
+    finally:
+        if doc is not None: doc.close()
+        pymupdf.TOOLS.store_shrink(100)
+    result['segundos'] = time.perf_counter() - start
+    return result
+
+
+# --- Store local (SQLite indexado) ---
+class ReportStore:
+    # relatorios: relatório atual de cada ticker (data, URL, sha256); extracoes: resultado por conteúdo (sha256)
+    def __init__(self, filename=None):
+        self.filename = filename or REPORTS_DB_FILE; self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.filename, check_same_thread=False, isolation_level=None) # Autocommit
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS relatorios (
+            papel TEXT PRIMARY KEY, data_relatorio TEXT, url TEXT, sha256 TEXT NOT NULL, tamanho INTEGER, baixado_em REAL NOT NULL)""")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS extracoes (
+            sha256 TEXT PRIMARY KEY, paginas INTEGER, texto TEXT, campos TEXT, tabelas TEXT, segundos REAL, erro TEXT, extraido_em REAL NOT NULL)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_relatorios_sha ON relatorios(sha256)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_relatorios_data ON relatorios(data_relatorio)")
+
+    def current(self, papeis):
+        # Papel -> (data ISO, sha256) dos relatórios já ingeridos com extração concluída
+        papeis = list(papeis); found = {}
+        with self._lock:
+            for start in range(0, len(papeis), 500):
+                chunk = papeis[start:start + 500]
+                query = f"SELECT r.papel, r.data_relatorio, r.sha256 FROM relatorios r JOIN extracoes e ON e.sha256 = r.sha256 WHERE r.papel IN ({','.join('?' * len(chunk))})"
+                found.update({p: (d, s) for p, d, s in self._conn.execute(query, chunk)})
+        return found
+
+    def extracted(self, hashes):
+        hashes = list(hashes); found = set()
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                found.update(row[0] for row in self._conn.execute(f"SELECT sha256 FROM extracoes WHERE sha256 IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def set_report(self, papel, report_date, url, sha256, size):
+        with self._lock: self._conn.execute("INSERT OR REPLACE INTO relatorios VALUES (?, ?, ?, ?, ?, ?)", (papel, report_date, url, sha256, size, time.time()))
+
+    def save_extraction(self, sha256, result):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO extracoes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (sha256, result['paginas'], result['texto'], json.dumps(result['campos'], ensure_ascii=False),
+                                json.dumps(result['tabelas'], ensure_ascii=False), result['segundos'], result['erro'], time.time()))
+
+    def fields(self, papeis=None):
+        # [(papel, data ISO, paginas, campos dict)] dos relatórios atuais (opcionalmente só dos tickers dados)
+        query = "SELECT r.papel, r.data_relatorio, e.paginas, e.campos FROM relatorios r JOIN extracoes e ON e.sha256 = r.sha256"
+        with self._lock:
+            if papeis is None: rows = self._conn.execute(query).fetchall()
+            else:
+                papeis = list(papeis); rows = []
+                for start in range(0, len(papeis), 500):
+                    chunk = papeis[start:start + 500]
+                    rows += self._conn.execute(query + f" WHERE r.papel IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+        return [(p, d, n, json.loads(c or '{}')) for p, d, n, c in rows]
+
+    def report(self, papel):
+        # Texto e tabelas do relatório atual de um ticker (ou None)
+        with self._lock:
+            row = self._conn.execute("SELECT r.data_relatorio, r.url, r.sha256, e.paginas, e.texto, e.campos, e.tabelas, e.erro FROM relatorios r JOIN extracoes e ON e.sha256 = r.sha256 WHERE r.papel = ?", (papel,)).fetchone()
+        if not row: return None
+        return {'data': row[0], 'url': row[1], 'sha256': row[2], 'paginas': row[3], 'texto': row[4], 'campos': json.loads(row[5] or '{}'), 'tabelas': json.loads(row[6] or '[]'), 'erro': row[7]}
+
+    def close(self):
+        with self._lock: self._conn.close()
+
+_STORE = None; _STORE_LOCK = threading.Lock()
+
+def get_store():
+    # Store compartilhado pelo processo (criado na primeira utilização)
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None: _STORE = ReportStore()
+    return _STORE
+
+
+# --- Download (cache endereçado por conteúdo) ---
+def cache_path(sha256, base_dir=None):
+    return os.path.join(base_dir or REPORTS_DIR, sha256[:2], sha256 + '.pdf')
+
+def _iso_date(value):
+    # "dd/mm/aaaa" (formato do Fundamentus) -> "aaaa-mm-dd"; N/A/vazio -> None
+    try: return datetime.datetime.strptime(str(value).strip(), '%d/%m/%Y').date().isoformat()
+    except ValueError: return None
+
+def _pdf_bytes(body):
+    # O FNET às vezes entrega o PDF em base64 (texto) em vez de binário
+    if body[:5] == b'%PDF-': return body
+    try: decoded = base64.b64decode(body.strip(), validate=False)
+    except (binascii.Error, ValueError): return None
+    return decoded if decoded[:5] == b'%PDF-' else None
+
+def _download(job, headers, base_dir):
+    # job = (papel, data ISO, url) -> (papel, data, url, sha256, tamanho, erro)
+    papel, report_date, url = job
+    try:
+        response = fii_http.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT, use_cache=False, scope=HTTP_SCOPE) # PDFs ficam no cache por conteúdo, não no cache HTTP
+        if response.status_code >= 400: return papel, report_date, url, None, 0, f"HTTP {response.status_code}"
+        body = _pdf_bytes(response.content)
+        if body is None: return papel, report_date, url, None, 0, "Resposta não é um PDF"
+        if len(body) > MAX_PDF_BYTES: return papel, report_date, url, None, len(body), f"PDF maior que {MAX_PDF_BYTES // 2**20} MB"
+        sha256 = hashlib.sha256(body).hexdigest(); path = cache_path(sha256, base_dir)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True); tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f: f.write(body)
+            os.replace(tmp_path, path) # Escrita atômica
+        return papel, report_date, url, sha256, len(body), None
+    except Exception as e: return papel, report_date, url, None, 0, str(e)
+
+
+# --- Pipeline ---
+def report_jobs(df):
+    # (papel, data ISO, url) dos FIIs com link e data de relatório conhecidos
+    import fii_compact # pandas/pyarrow só no processo principal (os workers de extração não precisam)
+    df = fii_compact.expand(df) # Link completo a partir do id guardado no formato compacto
+    if df is None or df.empty or not {'Papel', 'Data Último Relatório', 'Link Download Relatório'}.issubset(df.columns): return []
+    jobs = {}
+    for papel, date, url in zip(df['Papel'], df['Data Último Relatório'], df['Link Download Relatório']):
+        report_date = _iso_date(date)
+        if report_date and isinstance(url, str) and url.startswith(('http://', 'https://')): jobs.setdefault(str(papel), (str(papel), report_date, url))
+    return list(jobs.values())
+
+def ingest(df, workers=None, headers=None, store=None, base_dir=None, progress_callback=None):
+    # Baixa e extrai os relatórios dos FIIs de `df` (com detalhes já buscados). Relatório com a mesma data do já
+    # ingerido não vai à rede; PDF idêntico a um já extraído (outra data/ticker) não é extraído de novo.
+    # Falhas de download e de extração transitórias (memória, worker que caiu) não ficam registradas: a próxima
+    # execução tenta de novo. Só falhas determinísticas (PDF inválido/corrompido) ficam gravadas. O relatório novo só
+    # substitui o atual do ticker depois que sua extração existe (já feita ou recém-gravada); até lá vale o anterior.
+    # Devolve estatísticas da execução (inclui páginas/s da extração).
+    store = store or get_store()
+    if headers is None:
+        import rank_fiis
+        headers = rank_fiis.get_headers()
+    jobs = report_jobs(df); known = store.current(j[0] for j in jobs)
+    pending = [j for j in jobs if known.get(j[0], (None,))[0] != j[1]]
+    stats = {'relatorios': len(jobs), 'inalterados': len(jobs) - len(pending), 'baixados': 0, 'reaproveitados': 0, 'extraidos': 0, 'falhas': 0, 'paginas': 0, 'bytes': 0, 'segundos_extracao': 0.0, 'paginas_por_segundo': None}
+    if not pending: logging.info(f"Relatórios: {len(jobs)} inalterados, nada a baixar."); return stats
+
+    with fii_metrics.stage('relatorios.download'):
+        downloads = fii_http.fetch_concurrent(lambda job: _download(job, headers, base_dir), pending)
+    to_extract = {} # sha256 -> [(papel, data, url, sha256, tamanho)] dos relatórios baixados com esse conteúdo
+    for papel, report_date, url, sha256, size, error in downloads:
+        if error: stats['falhas'] += 1; logging.warning(f"Relatório de {papel} não baixado ({url}): {error}"); continue
+        stats['baixados'] += 1; stats['bytes'] += size
+        to_extract.setdefault(sha256, []).append((papel, report_date, url, sha256, size))
+    already = store.extracted(to_extract)
+    for sha in already:
+        for report in to_extract[sha]: store.set_report(*report)
+    stats['reaproveitados'] = sum(len(to_extract[sha]) for sha in already)
+    todo = [sha for sha in to_extract if sha not in already]
+    fii_metrics.METRICS.count('relatorios_baixados', stats['baixados'])
+
+    if todo:
+        workers = max(1, min(workers or MAX_WORKERS, len(todo))); start = time.perf_counter()
+        import multiprocessing
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker, initargs=(WORKER_MEMORY_MB,), max_tasks_per_child=WORKER_MAX_TASKS) as pool:
+            futures = {pool.submit(extract_report, cache_path(sha, base_dir)): sha for sha in todo}
+            for done, future in enumerate(as_completed(futures), start=1):
+                sha = futures[future]
+                try: result = future.result()
+                except Exception as e: result = {'paginas': 0, 'texto': '', 'campos': {}, 'tabelas': [], 'segundos': 0.0, 'erro': f"Worker falhou: {e}", 'transitorio': True}
+                if result['erro']: stats['falhas'] += 1; logging.warning(f"Extração de {to_extract[sha][0][0]} falhou{' (nova tentativa na próxima execução)' if result['transitorio'] else ''}: {result['erro']}")
+                else: stats['extraidos'] += 1; stats['paginas'] += result['paginas']
+                if not result['transitorio']: # Falha determinística também fica registrada (não reextrai o mesmo PDF)
+                    store.save_extraction(sha, result)
+                    for report in to_extract[sha]: store.set_report(*report)
+                if progress_callback: progress_callback(done, len(todo))
+        elapsed = time.perf_counter() - start
+        stats['segundos_extracao'] = round(elapsed, 3); stats['paginas_por_segundo'] = round(stats['paginas'] / elapsed, 1) if elapsed > 0 else None
+        fii_metrics.METRICS.add_stage('relatorios.extracao', elapsed, items=stats['paginas'])
+    logging.info(f"Relatórios: {stats['inalterados']} inalterados, {stats['baixados']} baixados ({stats['reaproveitados']} já extraídos), {stats['extraidos']} extraídos, {stats['falhas']} falhas; {stats['paginas']} páginas a {stats['paginas_por_segundo'] or 0} páginas/s.")
+    return stats
+
+
+# --- Campos para o ranking ---
+def report_fields(papeis=None, store=None):
+    # DataFrame (uma linha por ticker) com a data do relatório ingerido, páginas e os campos-chave extraídos
+    import pandas as pd
+    rows = [{'Papel': p, 'Data Relatório Ingerido': d, 'Páginas Relatório': n, **fields} for p, d, n, fields in (store or get_store()).fields(papeis)]
+    frame = pd.DataFrame(rows, columns=['Papel', 'Data Relatório Ingerido', 'Páginas Relatório'] + FIELD_COLUMNS)
+    frame['Data Relatório Ingerido'] = pd.to_datetime(frame['Data Relatório Ingerido'], format='%Y-%m-%d')
+    return frame.astype({c: 'float64' for c in FIELD_COLUMNS})
+
+def join_report_fields(df, store=None):
+    # Junta (left) os campos derivados dos relatórios ao ranking, por Papel; ordem e índice das linhas são preservados
+    if df is None or df.empty: return df
+    fields = report_fields(df['Papel'].astype(str).unique(), store).set_index('Papel')
+    return df.drop(columns=[c for c in fields.columns if c in df.columns]).join(fields, on='Papel')
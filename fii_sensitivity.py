@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Sensibilidade do ranking aos pesos: milhares de vetores de pesos avaliados de uma vez, como um único produto
+# matricial sobre a matriz de ranks do motor (Rank_PVP/Rank_DY/Rank_Liquidez/Rank_Vacancia). Para cada FII:
+# distribuição da posição (percentis, melhor/pior), frequência no Top 10 e volatilidade (desvio-padrão) da posição.
+# As estatísticas saem de uma matriz de contagens FII x posição (um bincount), sem ordenar as posições de cada FII.
+import time
+
+import numpy as np
+import pandas as pd
+
+import fii_ranking
+
+# --- Configurações ---
+DEFAULT_SAMPLES = 10_000 # Vetores de pesos por análise
+DEFAULT_SPREAD = 2 # Variação máxima (±) de cada peso em torno dos pesos atuais; None = pesos uniformes em 0..10
+WEIGHT_RANGE = (0, 10) # Mesma faixa dos sliders do app
+TOP_K = 10
+PERCENTILES = (5, 25, 50, 75, 95)
+MAX_CELLS = 20_000_000 # Limite de FIIs x amostras por análise (filtros amplos reduzem as amostras)
+MAX_FIIS = 3000 # Acima disso a matriz de contagens (FIIs x posições) fica grande demais para o modo interativo
+
+
+def sample_weights(base=None, n_samples=DEFAULT_SAMPLES, spread=DEFAULT_SPREAD, seed=0):
+    # k x 4 (int) com pesos inteiros na faixa dos sliders. Com base e spread: base ± spread (vizinhança dos pesos atuais);
+    # sem: uniforme na faixa toda. Vetores só de zeros (score constante) são sorteados de novo.
+    rng = np.random.default_rng(seed); low, high = WEIGHT_RANGE; k = len(fii_ranking.RANK_COLUMNS)
+    if base is None or spread is None: draw = lambda m: rng.integers(low, high + 1, size=(m, k))
+    else:
+        base = np.asarray(base, dtype=np.int64)
+        draw = lambda m: np.clip(base + rng.integers(-spread, spread + 1, size=(m, k)), low, high)
+    weights = draw(n_samples); zero = ~weights.any(axis=1)
+    while zero.any(): weights[zero] = draw(int(zero.sum())); zero = ~weights.any(axis=1)
+    return weights
+
+def position_counts(rank_matrix, weights):
+    # n x n: quantas amostras colocaram cada FII (linha) em cada posição (coluna, 0 = melhor). Um produto n x 4 @ 4 x k,
+    # um argsort por coluna e um bincount. Empate desfeito pela ordem original, como em RankingEngine.order.
+    n = len(rank_matrix); weights = np.asarray(weights)
+    max_key = (int(rank_matrix.max(initial=0)) * int(weights.sum(axis=1).max(initial=0)) + 1) * max(n, 1)
+    dtype = np.int32 if max_key < np.iinfo(np.int32).max else np.int64 # int32: metade da memória e mais rápido
+    keys = rank_matrix.astype(dtype) @ weights.T.astype(dtype)
+    keys *= n; keys += np.arange(n, dtype=dtype)[:, None] # Chave única = (score, posição original)
+    order = np.argsort(keys, axis=0) # order[posição, amostra] = FII
+    order *= n; order += np.arange(n)[:, None]
+    return np.bincount(order.ravel(), minlength=n * n).reshape(n, n)
+
+def analyze(df, weights=None, n_samples=DEFAULT_SAMPLES, spread=DEFAULT_SPREAD, top_k=TOP_K, seed=0):
+    # (estatísticas por FII, info). Posições exibidas começam em 1. weights = pesos atuais (posição de referência e
+    # centro da vizinhança); a ordem das linhas segue a mediana da posição e depois a frequência no Top K.
+    start = time.perf_counter()
+    if df is None or df.empty: return pd.DataFrame(columns=['Papel']), {'amostras': 0, 'fiis': 0, 'segundos': 0.0, 'vizinhanca': spread}
+    engine = fii_ranking.get_engine(df) # Reaproveita a matriz de ranks já montada para o conjunto filtrado
+    if engine.n > MAX_FIIS: raise ValueError(f"Análise limitada a {MAX_FIIS} FIIs ({engine.n} passaram pelos filtros); restrinja os filtros.")
+    samples = sample_weights(weights, max(1, min(n_samples, MAX_CELLS // max(engine.n, 1))), spread, seed)
+    counts = position_counts(engine.rank_matrix, samples); k = len(samples)
+    cumulative = counts.cumsum(axis=1); slots = np.arange(1, engine.n + 1) # Posições exibidas começam em 1
+    stats = pd.DataFrame({'Papel': df['Papel'].astype(str).to_numpy()})
+    if weights is not None:
+        current = np.empty(engine.n, dtype=np.int64); current[engine.order(weights)[0]] = slots
+        stats['Posição Atual'] = current
+    for p in PERCENTILES: # Percentil "lower": menor posição cuja contagem acumulada passa do índice do percentil
+        stats[f"P{p}" if p != 50 else 'Mediana'] = (cumulative > int(p / 100 * (k - 1))).argmax(axis=1) + 1
+    seen = counts > 0
+    stats['Melhor'] = seen.argmax(axis=1) + 1; stats['Pior'] = engine.n - seen[:, ::-1].argmax(axis=1)
+    mean = counts @ slots / k
+    stats['Volatilidade'] = np.sqrt(np.maximum(counts @ (slots.astype(float) ** 2) / k - mean ** 2, 0))
+    stats[f"Freq. Top {top_k}"] = cumulative[:, min(top_k, engine.n) - 1] / k
+    stats = stats.sort_values(['Mediana', f"Freq. Top {top_k}"], ascending=[True, False], kind='stable').reset_index(drop=True)
+    info = {'amostras': k, 'fiis': engine.n, 'segundos': time.perf_counter() - start, 'vizinhanca': None if weights is None or spread is None else spread}
+    return stats, info
+
+def top_k_stability(stats, top_k=TOP_K):
+    # Quantos FIIs aparecem no Top K em pelo menos uma amostra e quantos em todas (núcleo estável)
+    freq = stats[f"Freq. Top {top_k}"]
+    return {'alguma_vez': int((freq > 0).sum()), 'sempre': int((freq >= 1).sum())}
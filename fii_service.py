@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# Serviço de snapshot do universo compartilhado por todas as sessões do processo (no app: um singleton via
+# st.cache_resource). Leituras nunca bloqueiam depois da primeira carga; dado vencido é servido enquanto uma
+# atualização roda em segundo plano (stale-while-revalidate); pedidos simultâneos de atualização viram uma
+# única busca (single-flight); uma thread de fundo atualiza em intervalo fixo enquanto houver leitores.
+# A cada atualização, só os tickers com linha do resumo alterada (fii_diff) perdem os detalhes memoizados;
+# na primeira carga, os detalhes dos inalterados vêm do último snapshot em disco. Cada versão nova publicada
+# (botão, agendamento ou stale-while-revalidate) grava o snapshot diário em Parquet (fii_snapshots).
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import fii_diff
+import fii_snapshots
+import rank_fiis
+
+# --- Configurações ---
+REFRESH_INTERVAL = rank_fiis.UNIVERSE_MAX_AGE # Atualização agendada (s)
+STALE_AFTER = rank_fiis.UNIVERSE_MAX_AGE # Idade (s) a partir da qual uma leitura dispara atualização em segundo plano
+MIN_REFRESH_INTERVAL = 60 # Pedidos explícitos ("Atualizar") dentro deste intervalo reaproveitam o dado atual
+IDLE_TIMEOUT = 2 * 3600 # Sem leituras por este tempo, a thread de fundo para de buscar (não raspa o site à toa)
+
+
+def load_universe():
+    # Busca + preparo do resumo; None em falha (sem cair para um dado antigo, que o serviço já guarda)
+    return rank_fiis.prepare_universe(rank_fiis.fetch_summary_data(rank_fiis.URL_FII_LIST))
+
+
+class UniverseService:
+    def __init__(self, loader=None, refresh_interval=REFRESH_INTERVAL, stale_after=STALE_AFTER, idle_timeout=IDLE_TIMEOUT, track_changes=True, save_snapshots=True):
+        self._loader = loader or load_universe; self.track_changes = track_changes; self.save_snapshots = save_snapshots; self.last_changes = None
+        self.refresh_interval = refresh_interval; self.stale_after = stale_after; self.idle_timeout = idle_timeout
+        self._lock = threading.Lock(); self._inflight = None
+        self._universe = None; self._timestamp = 0.0; self._version = 0; self._last_read = 0.0
+        self._stats = {'refreshes': 0, 'failures': 0, 'collapsed': 0, 'last_error': None, 'last_duration': None}
+        self._stop = threading.Event(); self._thread = None
+
+    # --- Leitura ---
+    def snapshot(self):
+        # (universo, timestamp, versão) sem bloquear; se vencido, agenda uma atualização e devolve o atual
+        with self._lock:
+            self._last_read = time.time()
+            universe, timestamp, version = self._universe, self._timestamp, self._version
+        if universe is not None and self.age() >= self.stale_after: self.refresh(wait=False)
+        return universe, timestamp, version
+
+    def age(self):
+        with self._lock: return float('inf') if self._universe is None else time.time() - self._timestamp
+
+    # --- Atualização (single-flight) ---
+    def refresh(self, wait=True, timeout=None, min_interval=0):
+        # Junta-se à busca em andamento, se houver; senão inicia uma. Com min_interval, um dado mais novo
+        # que isso é devolvido sem ir à rede. wait=False devolve o Future da busca (ou None se não buscou).
+        with self._lock:
+            if self._universe is not None and time.time() - self._timestamp < min_interval:
+                future = None
+            elif self._inflight is not None:
+                future = self._inflight; self._stats['collapsed'] += 1
+            else:
+                future = self._inflight = Future()
+                threading.Thread(target=self._run, args=(future,), name="fii-universe-refresh", daemon=True).start()
+            current = self._universe
+        if future is None: return current if wait else None
+        return future.result(timeout) if wait else future
+
+    def _run(self, future):
+        start = time.perf_counter(); universe = None
+        try: universe = self._loader()
+        except Exception as e:
+            logging.error(f"Atualização do universo falhou: {e}")
+            with self._lock: self._stats['last_error'] = str(e)
+        if universe is not None and self.track_changes: self._apply_changes(universe)
+        with self._lock:
+            if universe is not None:
+                self._universe = universe; self._timestamp = time.time(); self._version += 1
+                self._stats['refreshes'] += 1; self._stats['last_error'] = None
+            else: self._stats['failures'] += 1
+            self._stats['last_duration'] = time.perf_counter() - start
+            self._inflight = None; result = self._universe
+        future.set_result(result) # Em falha, quem espera recebe o último dado bom (ou None)
+        if universe is not None and self.save_snapshots: self._save_snapshot(universe) # Depois de liberar quem espera
+
+    def _save_snapshot(self, universe):
+        # Histórico diário (uma gravação por versão publicada; a última do dia substitui as anteriores), com os
+        # detalhes já memoizados. Falha aqui só é registrada no log.
+        try: fii_snapshots.write_snapshot(rank_fiis.snapshot_frame(universe))
+        except Exception as e: logging.warning(f"Falha ao gravar o snapshot diário: {e}")
+
+    def _apply_changes(self, universe):
+        # Detalhes: invalida só os tickers alterados desde o universo anterior; na primeira carga, reaproveita
+        # os do último snapshot persistido para os inalterados. Falhas aqui nunca impedem a atualização.
+        with self._lock: previous = self._universe
+        try:
+            if previous is None:
+                snapshot_date = fii_snapshots.latest_snapshot_date()
+                if snapshot_date is None: return
+                previous = fii_snapshots.read_snapshots(start=snapshot_date, end=snapshot_date)
+                fii_diff.seed_unchanged_details(previous, universe, os.path.getmtime(fii_snapshots.snapshot_path(snapshot_date)))
+            else: fii_diff.invalidate_changed_details(previous, universe)
+            changed, added, removed = fii_diff.changed_tickers(previous, universe)
+            self.last_changes = {'alterados': len(changed), 'novos': len(added), 'removidos': len(removed)}
+        except Exception as e: logging.warning(f"Falha ao comparar com o universo anterior: {e}")
+
+    # --- Thread de fundo ---
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive(): return self
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="fii-universe-scheduler", daemon=True); self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join(timeout=5)
+
+    def _loop(self):
+        # Só atualiza depois da primeira carga e enquanto alguém estiver lendo
+        while not self._stop.wait(self.refresh_interval):
+            with self._lock: loaded = self._universe is not None; idle = time.time() - self._last_read > self.idle_timeout
+            if loaded and not idle:
+                try: self.refresh(wait=True)
+                except Exception as e: logging.error(f"Atualização agendada falhou: {e}")
+
+    def status(self):
+        with self._lock:
+            return {**self._stats, 'version': self._version, 'timestamp': self._timestamp or None, 'refreshing': self._inflight is not None,
+                    'fiis': 0 if self._universe is None else len(self._universe), 'mudancas': self.last_changes}
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# Snapshots históricos do universo de FIIs em Parquet particionado por data (hive: data=AAAA-MM-DD).
+# Leitura via pyarrow.dataset com memory-map, projeção de colunas e filtros (ticker/data) empurrados ao scan.
+# pyarrow.dataset/parquet/fs são importados sob demanda (listar datas não precisa deles; o app inicia mais rápido).
+import datetime
+import functools
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+# --- Configurações ---
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_FILENAME = "universo.parquet"
+PARTITION_KEY = "data"
+
+
+@functools.lru_cache(maxsize=None)
+def partitioning():
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([(PARTITION_KEY, pa.date32())]), flavor='hive')
+
+
+def _as_date(value):
+    if value is None or isinstance(value, datetime.date) and not isinstance(value, datetime.datetime): return value
+    if isinstance(value, datetime.datetime): return value.date()
+    return datetime.date.fromisoformat(str(value)[:10])
+
+def snapshot_path(snapshot_date, base_dir=None):
+    return os.path.join(base_dir or SNAPSHOT_DIR, f"{PARTITION_KEY}={_as_date(snapshot_date).isoformat()}", SNAPSHOT_FILENAME)
+
+def write_snapshot(df, snapshot_date=None, base_dir=None):
+    # Um arquivo por dia; um novo refresh no mesmo dia substitui o anterior (escrita atômica)
+    if df is None or df.empty: logging.warning("Snapshot vazio, nada para salvar."); return None
+    snapshot_date = _as_date(snapshot_date) or datetime.date.today()
+    path = snapshot_path(snapshot_date, base_dir); tmp_path = path + ".tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        import pyarrow.parquet as pq
+        df = df.drop(columns=[PARTITION_KEY], errors='ignore')
+        df = df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)}) # Texto simples: mesmo schema dos arquivos já gravados
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+        logging.info(f"Snapshot {snapshot_date} salvo em '{path}' ({len(df)} FIIs).")
+        return path
+    except Exception as e:
+        logging.error(f"Erro ao salvar snapshot {snapshot_date}: {e}")
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        return None
+
+def open_dataset(base_dir=None):
+    # Dataset memory-mapped com o schema unificado de todos os snapshots (colunas podem mudar com o tempo)
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    base_dir = base_dir or SNAPSHOT_DIR
+    if not os.path.isdir(base_dir): return None
+    filesystem = pafs.LocalFileSystem(use_mmap=True)
+    dataset = ds.dataset(base_dir, format='parquet', partitioning=partitioning(), filesystem=filesystem, exclude_invalid_files=True)
+    fragments = list(dataset.get_fragments())
+    if not fragments: return None
+    schema = pa.unify_schemas([f.physical_schema for f in fragments] + [partitioning().schema], promote_options='permissive')
+    return ds.dataset(base_dir, schema=schema, format='parquet', partitioning=partitioning(), filesystem=filesystem, exclude_invalid_files=True)
+
+def list_snapshot_dates(base_dir=None):
+    base_dir = base_dir or SNAPSHOT_DIR
+    if not os.path.isdir(base_dir): return []
+    dates = []
+    for name in os.listdir(base_dir):
+        if name.startswith(PARTITION_KEY + "=") and os.path.exists(os.path.join(base_dir, name, SNAPSHOT_FILENAME)):
+            try: dates.append(_as_date(name.split("=", 1)[1]))
+            except ValueError: continue
+    return sorted(dates)
+
+def read_snapshots(columns=None, tickers=None, start=None, end=None, base_dir=None, as_table=False):
+    # Lê snapshots com projeção (columns) e predicados (tickers, intervalo de datas inclusivo) no scan
+    import pyarrow.dataset as ds
+    dataset = open_dataset(base_dir)
+    if dataset is None: return None
+    expression = None
+    def _and(expr, new): return new if expr is None else expr & new
+    if tickers is not None: expression = _and(expression, ds.field('Papel').isin(list(tickers)))
+    if start is not None: expression = _and(expression, ds.field(PARTITION_KEY) >= _as_date(start))
+    if end is not None: expression = _and(expression, ds.field(PARTITION_KEY) <= _as_date(end))
+    if columns is not None:
+        columns = [c for c in dict.fromkeys([PARTITION_KEY, 'Papel'] + list(columns)) if c in dataset.schema.names]
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table if as_table else table.to_pandas()
+
+def latest_snapshot_date(before=None, base_dir=None):
+    # Data do snapshot mais recente (opcionalmente estritamente anterior a `before`) ou None
+    dates = list_snapshot_dates(base_dir)
+    if before is not None: dates = [d for d in dates if d < _as_date(before)]
+    return dates[-1] if dates else None
+
+def read_latest_snapshot(before=None, columns=None, base_dir=None):
+    # Snapshot mais recente (opcionalmente estritamente anterior a `before`)
+    date = latest_snapshot_date(before, base_dir)
+    if date is None: return None
+    return read_snapshots(columns=columns, start=date, end=date, base_dir=base_dir)
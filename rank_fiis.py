@@ -4,53 +4,56 @@ import requests
 import numpy as np
 import logging
 import warnings
+import threading
 import time
-import re # <--- NOVO (Importado para usar regex na busca do link)
-import html
-from bs4 import BeautifulSoup
-import json
 import os
-import io
+import fii_classification
+import fii_compact
+import fii_export
+import fii_http
+import fii_metrics
+import fii_parsers
+from fii_parsers import clean_numeric_series # Limpeza numérica vive nos parsers
+import fii_snapshots
 # import streamlit as st # Removido - O cache @st.cache_data não está mais ativo aqui
 
 # --- Configurações ---
 URL_FII_LIST = "https://www.fundamentus.com.br/fii_resultado.php"
-BASE_URL_FUNDAMENTUS = "https://www.fundamentus.com.br/"
+BASE_URL_FUNDAMENTUS = fii_compact.FUNDAMENTUS_BASE_URL
 EXCEL_OUTPUT_FILENAME = "ranking_fiis_completo.xlsx" # Nome indicando dados completos
 HTML_OUTPUT_FILENAME = "ranking_fiis_com_abas.html"
 FII_TYPES_JSON_FILE = "fii_types.json"
 MIN_PVP = 0.7; MAX_PVP = 1.05; MIN_LIQUIDEZ = 400000; MIN_DY = 0.08; MAX_DY = 0.135
-REQUEST_DELAY = 0.3
-SCRIPT_VERSION = "0.93" # <--- MODIFICADO (Versão incrementada)
+MAX_CONCURRENT_REQUESTS = fii_http.MAX_CONCURRENT_REQUESTS # Detalhes buscados em paralelo (pacing pelo token bucket de fii_http)
+SCRIPT_VERSION = "0.94" # <--- MODIFICADO (Busca concorrente de detalhes)
 
 # Configuração logging e warnings
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 warnings.simplefilter(action='ignore', category=FutureWarning); warnings.simplefilter(action='ignore', category=UserWarning); warnings.filterwarnings("ignore", category=UserWarning, module='bs4')
 
-# Variável Global para Tipos/Segmentos
+# Variável Global para Tipos/Segmentos (dict bruto do JSON) e a tabela compilada usada na classificação
 FII_SEGMENT_DATA = {}
+FII_CLASSIFICATION_TABLE = None; _FII_TYPES_LOADED_FROM = None # Arquivo carregado: prepare_universe recompila se ele mudar
 
 # --- Funções Auxiliares (Idênticas à sua versão) ---
 def carregar_tipos_do_json(filename=FII_TYPES_JSON_FILE):
-    global FII_SEGMENT_DATA; FII_SEGMENT_DATA = {} # Reseta
+    global FII_SEGMENT_DATA, FII_CLASSIFICATION_TABLE, _FII_TYPES_LOADED_FROM
+    FII_SEGMENT_DATA = {}; FII_CLASSIFICATION_TABLE = None; _FII_TYPES_LOADED_FROM = None # Reseta
     try:
         if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f: FII_SEGMENT_DATA = json.load(f)
+            FII_SEGMENT_DATA, FII_CLASSIFICATION_TABLE = fii_classification.load_classification(filename); _FII_TYPES_LOADED_FROM = filename
             logging.info(f"'{filename}' carregado ({len(FII_SEGMENT_DATA)} tickers).")
-            if FII_SEGMENT_DATA:
-                first_key = next(iter(FII_SEGMENT_DATA));
-                # Validação mínima da estrutura JSON
-                if not isinstance(FII_SEGMENT_DATA[first_key], dict):
-                     logging.warning(f"Estrutura JSON '{filename}' inválida."); FII_SEGMENT_DATA = {}
-        else: logging.warning(f"'{filename}' não encontrado."); FII_SEGMENT_DATA = {}
-    except Exception as e: logging.error(f"Erro ao carregar/ler '{filename}': {e}."); FII_SEGMENT_DATA = {}
-
-def clean_numeric_value(value):
-    if isinstance(value, (int, float)): return float(value)
-    if isinstance(value, str):
-        try: cleaned = value.replace('R$', '').replace('.', '').replace(',', '.').replace('%', '').strip(); return float(cleaned) if cleaned else np.nan
-        except ValueError: return np.nan
-    return np.nan
+        else: logging.warning(f"'{filename}' não encontrado.")
+    except ValueError as e: logging.warning(f"Estrutura JSON '{filename}' inválida: {e}.")
+    except Exception as e: logging.error(f"Erro ao carregar/ler '{filename}': {e}.")
+
+def _current_classification_table():
+    # Tabela compilada; se o JSON mudou em disco desde a carga, recompila (o stat é o único custo no caminho comum)
+    global FII_SEGMENT_DATA, FII_CLASSIFICATION_TABLE
+    if _FII_TYPES_LOADED_FROM:
+        try: FII_SEGMENT_DATA, FII_CLASSIFICATION_TABLE = fii_classification.load_classification(_FII_TYPES_LOADED_FROM)
+        except Exception as e: logging.warning(f"Falha ao recarregar '{_FII_TYPES_LOADED_FROM}' ({e}); mantendo a classificação anterior.")
+    return FII_CLASSIFICATION_TABLE
 
 # format_value_br_string não é usada pelo app.py, mantida para execução standalone
 def format_value_br_string(value, format_type="float", decimals=2):
@@ -70,201 +73,238 @@ def get_headers(): return { 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64;
 def fetch_summary_data(url):
     logging.info(f"Buscando dados de resumo: {url}")
     try:
-        response = requests.get(url, headers=get_headers(), timeout=45, verify=True)
-        response.raise_for_status(); response.encoding = response.apparent_encoding
-        # Usar io.StringIO é mais robusto para read_html
-        tables = pd.read_html(io.StringIO(response.text), decimal=',', thousands='.')
-        if tables:
-            df = tables[0]; df.columns = df.columns.str.strip()
-            logging.info(f"Tabela de resumo encontrada com {len(df)} FIIs.")
-            return df
-        logging.error("Nenhuma tabela encontrada na página de resumo."); return None
+        with fii_metrics.stage('resumo.busca'): response = fii_http.get(url, headers=get_headers(), timeout=45)
+        response.raise_for_status()
+        with fii_metrics.stage('resumo.parse'): df = fii_parsers.parse_summary(response.content, response.headers.get('Content-Type')) # Tabela tabelaResultado, colunas já numéricas
+        logging.info(f"Tabela de resumo encontrada com {len(df)} FIIs.")
+        return df
     except requests.exceptions.Timeout: logging.error(f"Timeout (Resumo): {url}"); return None
     except requests.exceptions.RequestException as e: logging.error(f"Erro Requisição (Resumo): {e}"); return None
     except Exception as e: logging.error(f"Erro inesperado fetch/parse (Resumo): {e}"); return None
 
-# --- fetch_fii_details MODIFICADO para buscar o Link FNET ---
-def fetch_fii_details(fii_url):
+# --- fetch_fii_details: download + parser plugável (fii_parsers; lxml por padrão, BeautifulSoup como fallback) ---
+def fetch_fii_details(fii_url, raise_errors=False):
+    # raise_errors=True: falhas de download (rede, HTTP, circuito aberto) sobem como fii_http.FetchError em vez de
+    # virarem "N/A", para o chamador não memoizar dado vazio e tentar de novo depois. Erro de parse continua "N/A".
     logging.debug(f"Buscando detalhes de: {fii_url}")
-    report_date = "N/A"; download_link = None; fnet_docs_url = None # <--- NOVO: inicializa link FNET
+    report_date = "N/A"; download_link = None; fnet_docs_url = None
     osc_dia, osc_mes, osc_12m = np.nan, np.nan, np.nan
     try:
-        time.sleep(REQUEST_DELAY)
-        response = requests.get(fii_url, headers=get_headers(), timeout=30, verify=True)
-        response.raise_for_status(); response.encoding = response.apparent_encoding
-        soup = BeautifulSoup(response.text, 'html5lib')
-
-        # 1. Busca Data e Link do Último Relatório (como antes)
-        label_td_report = None; all_labels = soup.find_all('td', class_='label')
-        for label in all_labels:
-            if 'relatório' in label.get_text(strip=True).lower(): label_td_report = label; break
-        if label_td_report:
-            value_td_report = label_td_report.find_next_sibling('td') # Não precisa classe aqui
-            if value_td_report:
-                img_tag = value_td_report.find('img', alt='Download')
-                if not img_tag: img_tag = value_td_report.find('img', src=re.compile(r'download', re.IGNORECASE))
-                if img_tag:
-                    parent_link = img_tag.find_parent('a', href=True)
-                    if parent_link:
-                        href = parent_link['href']
-                        dl_prefix = BASE_URL_FUNDAMENTUS.rstrip('/')
-                        if href.startswith('/'): download_link = dl_prefix + href
-                        elif href.startswith('http'): download_link = href
-                        else: download_link = dl_prefix + '/' + href.lstrip('/')
-                cell_text_report = value_td_report.get_text(separator=' ', strip=True)
-                date_match = re.search(r'(\d{2}/\d{2}/\d{4})', cell_text_report)
-                if date_match: report_date = date_match.group(1)
-
-        # 2. Busca Oscilações (como antes)
-        osc_labels_map = {'Dia': 'osc_dia', 'Mês': 'osc_mes', '12 meses': 'osc_12m'}; temp_osc = {'osc_dia': np.nan, 'osc_mes': np.nan, 'osc_12m': np.nan}
-        for label in all_labels:
-            label_text = label.get_text(strip=True)
-            if label_text in osc_labels_map:
-                osc_key = osc_labels_map[label_text]; value_td_osc = label.find_next_sibling('td', class_='data')
-                if value_td_osc:
-                    value_span = value_td_osc.find('span');
-                    if value_span: numeric_value = clean_numeric_value(value_span.get_text(strip=True));
-                    if not pd.isna(numeric_value): temp_osc[osc_key] = numeric_value / 100.0
-        osc_dia, osc_mes, osc_12m = temp_osc['osc_dia'], temp_osc['osc_mes'], temp_osc['osc_12m']
-
-        # 3. Busca Link "Pesquisar Documentos" para FNET <--- NOVO
-        link_pesquisar = soup.find('a', string=re.compile(r'^\s*Pesquisar Documentos\s*$', re.IGNORECASE))
-        if link_pesquisar:
-            fnet_docs_url = link_pesquisar.get('href')
-            if fnet_docs_url and not fnet_docs_url.startswith('http'):
-                # Adiciona o domínio base se for um link relativo (embora deva ser absoluto)
-                fnet_docs_url = BASE_URL_FUNDAMENTUS.rstrip('/') + '/' + fnet_docs_url.lstrip('/')
-            logging.debug(f"Link FNET encontrado: {fnet_docs_url}")
-        else:
-            logging.debug("Link 'Pesquisar Documentos' não encontrado.")
-
+        response = fii_http.get(fii_url, headers=get_headers(), timeout=30)
+        if response.status_code >= 400: raise fii_http.FetchError(fii_url, f"HTTP {response.status_code}", status=response.status_code, retryable=False)
+        with fii_metrics.stage('detalhes.parse'):
+            html_text = fii_parsers.decode_page(response.content, response.headers.get('Content-Type')) # Charset declarado, sem chardet
+            report_date, download_link, osc_dia, osc_mes, osc_12m, fnet_docs_url = fii_parsers.parse_details(html_text, BASE_URL_FUNDAMENTUS)
+    except requests.exceptions.RequestException as e:
+        if raise_errors: raise
+        logging.warning(f"Erro ao buscar detalhes {fii_url}: {e}")
     except Exception as e: logging.warning(f"Erro parse/extração detalhes {fii_url}: {e}")
     logging.debug(f"Retornando: Data='{report_date}', LinkDL='{download_link}', FNET='{fnet_docs_url}', Osc={osc_dia},{osc_mes},{osc_12m}")
-    # Retorna o novo link FNET
-    return report_date, download_link, osc_dia, osc_mes, osc_12m, fnet_docs_url # <--- MODIFICADO
+    return report_date, download_link, osc_dia, osc_mes, osc_12m, fnet_docs_url
 
-# --- process_data MODIFICADO para incluir o Link FNET ---
-def process_data(df):
+def _fetch_details_or_error(fii_url):
+    # (detalhes, None) ou (None, FetchError): uma falha não derruba o lote inteiro em fetch_concurrent
+    try: return fetch_fii_details(fii_url, raise_errors=True), None
+    except requests.exceptions.RequestException as e: return None, e
+
+# --- Pipeline em dois estágios ---
+# Estágio 1: "universo" com TODOS os FIIs limpos/classificados (rede só no resumo; memoizado pelo fii_service) e
+#            detalhes buscados sob demanda, memoizados por ticker (só tickers nunca vistos vão à rede).
+# Estágio 2: filter_and_rank, função pura e vetorizada sobre o universo (milissegundos, sem rede).
+UNIVERSE_MAX_AGE = 15 * 60 # Idade máxima (s) do universo no fii_service antes de buscar o resumo de novo
+DETAILS_MAX_AGE = 12 * 3600 # Idade máxima (s) dos detalhes memoizados por ticker
+
+_DETAILS_BY_TICKER = {}; _DETAILS_LOCK = threading.Lock() # papel -> (timestamp, tupla de fetch_fii_details)
+_DETAILS_IN_FLIGHT = {} # papel -> threading.Event da busca em andamento (sessões concorrentes não repetem a busca)
+_EMPTY_DETAILS = ("N/A", None, np.nan, np.nan, np.nan, None) # Mesmo formato da tupla de fetch_fii_details
+_DETAILS_FAILURES = {} # papel -> (timestamp, mensagem) da última falha transitória (não memoizada; nova tentativa na próxima passada)
+_DETAILS_GENERATION = 0 # Incrementada a cada mudança no memo de detalhes (quem memoiza saídas com detalhes a usa na chave)
+
+def details_generation():
+    with _DETAILS_LOCK: return _DETAILS_GENERATION
+
+def detail_url(papel): return BASE_URL_FUNDAMENTUS + 'detalhes.php?papel=' + papel
+
+def prepare_universe(df):
+    # Limpeza, conversão e classificação de todos os FIIs do resumo (sem filtros e sem rede)
     if df is None or df.empty: logging.error("DataFrame de entrada vazio."); return None
     logging.info("Iniciando limpeza e conversão...")
-    df_processed = df.copy()
-    cols_to_remove = ['Preço do m2', 'Aluguel por m2', 'Cap Rate']; df_processed.drop(columns=[col for col in cols_to_remove if col in df_processed.columns], errors='ignore', inplace=True)
+    stage_start = time.perf_counter()
+    cols_to_remove = ['Preço do m2', 'Aluguel por m2', 'Cap Rate']; df_processed = df.drop(columns=[col for col in cols_to_remove if col in df.columns]) # drop já devolve um frame novo (sem df.copy() antes)
     columns_to_convert = { 'Cotação': 'float', 'FFO Yield': 'percentage', 'Dividend Yield': 'percentage','P/VP': 'float', 'Valor de Mercado': 'float', 'Liquidez': 'float', 'Qtd de imóveis': 'integer', 'Vacância Média': 'percentage' }
     for col, type in columns_to_convert.items():
         if col in df_processed.columns:
-            numeric_col = df_processed[col].apply(clean_numeric_value)
+            numeric_col = clean_numeric_series(df_processed[col])
             if type == 'percentage': df_processed[col] = pd.to_numeric(numeric_col / 100.0, errors='coerce')
             elif type == 'integer': df_processed[col] = pd.to_numeric(numeric_col, errors='coerce').astype('Int64')
             else: df_processed[col] = pd.to_numeric(numeric_col, errors='coerce')
     if 'Papel' not in df_processed.columns: logging.error("Coluna 'Papel' não encontrada."); return None
     df_processed['Papel'] = df_processed['Papel'].astype(str)
+    fii_metrics.METRICS.add_stage('limpeza', time.perf_counter() - stage_start); stage_start = time.perf_counter()
+
+    # Segmento/Tipo: um join com a tabela compilada do JSON (aliases de segmento já resolvidos)
+    table = _current_classification_table()
+    if table is None: logging.warning("JSON não carregado. Usando segmentos originais e Tipo 'Indefinido'.")
+    fii_classification.classify(df_processed, table)
+    fii_metrics.METRICS.add_stage('classificacao', time.perf_counter() - stage_start)
 
-    # Tratamento Segmento (com JSON - lógica da sua versão)
-    if 'Segmento' not in df_processed.columns: df_processed['Segmento'] = 'Não Classificado'
-    # Adiciona coluna Tipo baseado no JSON
-    if FII_SEGMENT_DATA:
-        logging.info("Adicionando/Atualizando 'Tipo' e 'Segmento' com JSON...")
-        def get_fii_info(ticker, key):
-            data = FII_SEGMENT_DATA.get(str(ticker))
-            return data.get(key, None) if isinstance(data, dict) else None
-
-        # Atualiza Segmento
-        original_segment_col = df_processed['Segmento'].copy() if 'Segmento' in df_processed.columns else None
-        df_processed['Segmento_JSON'] = df_processed['Papel'].apply(lambda x: get_fii_info(x, 'segmento_original'))
-        if original_segment_col is not None:
-            df_processed['Segmento_JSON'].fillna(original_segment_col, inplace=True)
-        df_processed['Segmento'] = df_processed['Segmento_JSON']
-        df_processed.drop(columns=['Segmento_JSON'], inplace=True)
-
-        # Adiciona/Atualiza Tipo
-        df_processed['Tipo'] = df_processed['Papel'].apply(lambda x: get_fii_info(x, 'tipo'))
-        df_processed['Tipo'].fillna('Indefinido', inplace=True) # Garante que a coluna Tipo exista
-
-        df_processed['Segmento'] = df_processed['Segmento'].fillna('Não Classificado').replace('', 'Não Classificado')
-        logging.info("Colunas 'Segmento' e 'Tipo' atualizadas/adicionadas.")
-    else:
-        logging.warning("JSON não carregado. Usando segmentos originais e Tipo 'Indefinido'.")
-        if 'Segmento' in df_processed.columns: df_processed['Segmento'] = df_processed['Segmento'].fillna('Não Classificado').replace('', 'Não Classificado')
-        else: df_processed['Segmento'] = 'Não Classificado'
-        df_processed['Tipo'] = 'Indefinido' # Cria a coluna Tipo se não veio do JSON
-
-    # Filtragem
     required_cols = ['Papel', 'P/VP', 'Liquidez', 'Dividend Yield'];
     if not all(col in df_processed.columns for col in required_cols): logging.error("Colunas essenciais para filtro faltando."); return None
     df_processed.dropna(subset=required_cols, inplace=True)
     logging.info(f"Dados após limpeza: {df_processed.shape[0]} FIIs.")
+    return df_processed
+
+def filter_universe(universe, min_pvp, max_pvp, min_dy, max_dy, min_liquidez):
+    # Filtro vetorizado; não altera o universo
+    if universe is None: return None
     logging.info(f"Aplicando filtros...")
-    filtered_df = df_processed[(df_processed['P/VP'] >= MIN_PVP) & (df_processed['P/VP'] <= MAX_PVP) & (df_processed['Liquidez'] >= MIN_LIQUIDEZ) & (df_processed['Dividend Yield'] >= MIN_DY) & (df_processed['Dividend Yield'] <= MAX_DY)].copy()
+    with fii_metrics.stage('filtro'):
+        mask = universe['P/VP'].between(min_pvp, max_pvp) & (universe['Liquidez'] >= min_liquidez) & universe['Dividend Yield'].between(min_dy, max_dy)
+        filtered_df = universe[mask]
     logging.info(f"FIIs após filtragem: {filtered_df.shape[0]}")
-    if filtered_df.empty: logging.warning("Nenhum FII passou pelos filtros."); return filtered_df
+    if filtered_df.empty: logging.warning("Nenhum FII passou pelos filtros.")
+    return filtered_df
 
-    # --- Busca e Adição de Detalhes (Método da sua versão funcional) ---
-    logging.info("Buscando detalhes...")
-    # <--- MODIFICADO: Adiciona 'Link Documentos FNET' ao dicionário
-    details_data = {'Data Último Relatório': [], 'Link Download Relatório': [], 'Osc. Dia': [], 'Osc. Mês': [], 'Osc. 12 Meses': [], 'URL Detalhes': [], 'Link Documentos FNET': []}
-    original_indices = filtered_df.index.tolist() # Guarda índice original
-    papel_list = filtered_df['Papel'].tolist()
-    for i, idx in enumerate(original_indices):
-        papel = papel_list[i]
-        fii_url = BASE_URL_FUNDAMENTUS + 'detalhes.php?papel=' + papel
-        if (i + 1) % 10 == 0 or (i + 1) == len(original_indices): logging.info(f"Detalhes FII {i+1}/{len(original_indices)}: {papel}...")
-        # <--- MODIFICADO: Recebe o link FNET retornado
-        date, link, o_d, o_m, o_12, fnet_link = fetch_fii_details(fii_url)
-        # Adiciona aos dicionários
-        details_data['Data Último Relatório'].append(date)
-        details_data['Link Download Relatório'].append(link)
-        details_data['Osc. Dia'].append(o_d)
-        details_data['Osc. Mês'].append(o_m)
-        details_data['Osc. 12 Meses'].append(o_12)
-        details_data['URL Detalhes'].append(fii_url)
-        details_data['Link Documentos FNET'].append(fnet_link) # <--- NOVO: Adiciona o link FNET
-
-    # Adiciona as colunas ao DataFrame usando as listas e o índice original
-    logging.info("Adicionando detalhes ao DataFrame...")
-    for col, data_list in details_data.items():
-        # Garante que a coluna seja criada mesmo se data_list estiver vazia (improvável aqui)
-        if col not in filtered_df.columns:
-             dtype = float if col.startswith("Osc.") else str
-             filtered_df[col] = pd.Series(dtype=dtype, index=filtered_df.index)
-        # Atribui a Series alinhada pelo índice original
-        filtered_df[col] = pd.Series(data_list, index=original_indices)
-    # --- Fim Adição de Detalhes ---
-    logging.info("Busca e adição de detalhes concluída.")
-
-    # --- Calcular Ranks Individuais (ADICIONADO AQUI) ---
+def compute_ranks(df_calc):
+    # --- Calcular Ranks Individuais (sobre o conjunto filtrado) ---
     logging.info("Calculando Rankings Individuais...")
-    df_calc = filtered_df # Usa o dataframe que agora tem os detalhes
-    df_calc['Rank_PVP'] = df_calc['P/VP'].rank(method='first', ascending=True).astype('Int64')
-    df_calc['Rank_DY'] = df_calc['Dividend Yield'].rank(method='first', ascending=False).astype('Int64')
-    if 'Liquidez' in df_calc.columns: df_calc['Rank_Liquidez'] = df_calc['Liquidez'].rank(method='first', ascending=False).astype('Int64')
-    else: df_calc['Rank_Liquidez'] = pd.NA
-    if 'Vacância Média' in df_calc.columns: df_calc['Rank_Vacancia'] = df_calc['Vacância Média'].rank(method='first', ascending=True, na_option='top').astype('Int64')
-    else: df_calc['Rank_Vacancia'] = pd.NA
-    # --- Fim Cálculo de Ranks ---
+    with fii_metrics.stage('ranking'): return _compute_ranks(df_calc)
+
+def _compute_ranks(df_calc):
+    # Frame novo via assign: o filtro devolve uma seleção do universo, que não é alterada
+    ranks = {'Rank_PVP': df_calc['P/VP'].rank(method='first', ascending=True).astype('Int64'), 'Rank_DY': df_calc['Dividend Yield'].rank(method='first', ascending=False).astype('Int64')}
+    ranks['Rank_Liquidez'] = df_calc['Liquidez'].rank(method='first', ascending=False).astype('Int64') if 'Liquidez' in df_calc.columns else pd.NA
+    ranks['Rank_Vacancia'] = df_calc['Vacância Média'].rank(method='first', ascending=True, na_option='top').astype('Int64') if 'Vacância Média' in df_calc.columns else pd.NA
+    return df_calc.assign(**ranks)
 
+def filter_and_rank(universe, min_pvp, max_pvp, min_dy, max_dy, min_liquidez):
+    # Estágio 2: função pura (sem rede, sem globais) -> FIIs filtrados com Rank_* calculados
+    filtered_df = filter_universe(universe, min_pvp, max_pvp, min_dy, max_dy, min_liquidez)
+    if filtered_df is None or filtered_df.empty: return filtered_df
+    return compute_ranks(filtered_df)
+
+def missing_details(papeis, max_age=DETAILS_MAX_AGE):
+    # Tickers sem detalhes memoizados (ou vencidos) -> os únicos que precisam ir à rede
+    now = time.time()
+    with _DETAILS_LOCK: return [p for p in dict.fromkeys(papeis) if p not in _DETAILS_BY_TICKER or (now - _DETAILS_BY_TICKER[p][0]) >= max_age]
+
+def fetch_missing_details(papeis, progress_callback=None):
+    global _DETAILS_GENERATION
+    missing = missing_details(papeis)
+    if not missing: return 0
+    # Single-flight por ticker: busca só os que ninguém está buscando e espera pelos demais
+    done_event = threading.Event()
+    with _DETAILS_LOCK:
+        waiting = {_DETAILS_IN_FLIGHT[p] for p in missing if p in _DETAILS_IN_FLIGHT}
+        mine = [p for p in missing if p not in _DETAILS_IN_FLIGHT]
+        for papel in mine: _DETAILS_IN_FLIGHT[papel] = done_event
+    try:
+        if mine:
+            logging.info(f"Buscando detalhes de {len(mine)} FIIs ainda não vistos...")
+            def log_progress(done, total):
+                if done % 10 == 0 or done == total: logging.info(f"Detalhes FII {done}/{total}...")
+                if progress_callback: progress_callback(done, total)
+            # Busca concorrente (limite de requisições em voo + token bucket compartilhado); resultados na ordem pedida
+            start = time.perf_counter()
+            results = fii_http.fetch_concurrent(_fetch_details_or_error, [detail_url(p) for p in mine], max_workers=MAX_CONCURRENT_REQUESTS, progress_callback=log_progress)
+            fii_metrics.METRICS.add_stage('detalhes.busca', time.perf_counter() - start, items=len(mine))
+            now = time.time()
+            failed = {papel: error for papel, (_, error) in zip(mine, results) if error is not None and getattr(error, 'retryable', True)}
+            with _DETAILS_LOCK:
+                _DETAILS_GENERATION += 1
+                # Falhas definitivas (ex.: 404) ficam memoizadas como "N/A"; transitórias não, para irem à rede de novo
+                _DETAILS_BY_TICKER.update({papel: (now, _EMPTY_DETAILS if error is not None else result) for papel, (result, error) in zip(mine, results) if papel not in failed})
+                for papel in mine: _DETAILS_FAILURES.pop(papel, None)
+                _DETAILS_FAILURES.update({papel: (now, str(error)) for papel, error in failed.items()})
+            if failed:
+                fii_metrics.METRICS.count('detalhes_falhos', len(failed))
+                logging.warning(f"Detalhes indisponíveis para {len(failed)} FIIs (nova tentativa na próxima atualização): {', '.join(sorted(failed)[:10])}{'...' if len(failed) > 10 else ''}")
+    finally:
+        with _DETAILS_LOCK:
+            for papel in mine: _DETAILS_IN_FLIGHT.pop(papel, None)
+        done_event.set()
+    if waiting: logging.info(f"Aguardando detalhes já em busca por outra sessão...")
+    for event in waiting: event.wait()
+    return len(mine)
+
+def invalidate_details(papeis):
+    # Descarta detalhes memoizados (ex.: resumo do ticker mudou); a próxima passada os busca de novo, revalidando
+    # a página no cache HTTP (senão o cache em disco devolveria a mesma página por até 12 h)
+    global _DETAILS_GENERATION
+    papeis = list(papeis)
+    with _DETAILS_LOCK:
+        dropped = sum(_DETAILS_BY_TICKER.pop(p, None) is not None for p in papeis)
+        if dropped: _DETAILS_GENERATION += 1
+    fii_http.expire_cached(detail_url(p) for p in papeis)
+    return dropped
+
+def seed_details(df, timestamp):
+    # Memoiza detalhes já conhecidos (ex.: de um snapshot) sem ir à rede; não sobrescreve entradas mais novas
+    if df is None or df.empty: return 0
+    cols = ['Data Último Relatório', 'Link Download Relatório', 'Osc. Dia', 'Osc. Mês', 'Osc. 12 Meses', 'Link Documentos FNET']
+    df = fii_compact.expand(df) # Memo guarda a tupla do parser (links completos, data "dd/mm/aaaa")
+    frame = df.reindex(columns=['Papel'] + cols).astype(object).where(df.reindex(columns=['Papel'] + cols).notna(), None)
+    global _DETAILS_GENERATION
+    seeded = 0
+    with _DETAILS_LOCK:
+        for papel, date, link, o_d, o_m, o_12, fnet in frame.itertuples(index=False, name=None):
+            if papel in _DETAILS_BY_TICKER and _DETAILS_BY_TICKER[papel][0] >= timestamp: continue
+            _DETAILS_BY_TICKER[papel] = (timestamp, (date or "N/A", link, *(np.nan if v is None else float(v) for v in (o_d, o_m, o_12)), fnet)); seeded += 1
+        if seeded: _DETAILS_GENERATION += 1
+    return seeded
+
+def detail_failures(papeis=None):
+    # Tickers cuja última busca de detalhes falhou de forma transitória -> mensagem (filtrados por papeis, se dados)
+    with _DETAILS_LOCK: failures = {p: msg for p, (_, msg) in _DETAILS_FAILURES.items()}
+    return failures if papeis is None else {p: failures[p] for p in papeis if p in failures}
+
+def attach_details(df, fetch_missing=True, progress_callback=None):
+    # Junta os detalhes memoizados às linhas de df (buscando antes apenas os que faltam)
+    if df is None or df.empty: return df
+    if fetch_missing: fetch_missing_details(df['Papel'].tolist(), progress_callback=progress_callback)
+    logging.info("Adicionando detalhes ao DataFrame...")
+    with _DETAILS_LOCK: details = [_DETAILS_BY_TICKER[p][1] if p in _DETAILS_BY_TICKER else _EMPTY_DETAILS for p in df['Papel']]
+    date, link, o_d, o_m, o_12, fnet_link = zip(*details)
+    columns = {'Data Último Relatório': fii_compact.report_dates(date).to_numpy(), **{col: np.array(values, dtype=float) for col, values in zip(['Osc. Dia', 'Osc. Mês', 'Osc. 12 Meses'], [o_d, o_m, o_12])}}
+    for (id_col, prefix), values in zip(fii_compact.LINK_COLUMNS.values(), [link, fnet_link]): columns[id_col] = fii_compact.link_ids(values, prefix, df.index)
+    return df.drop(columns=list(fii_compact.LINK_COLUMNS) + [fii_compact.DETAIL_URL_COLUMN], errors='ignore').assign(**columns) # Compacto: URLs montadas só na exibição (fii_compact.expand)
+
+def snapshot_frame(universe):
+    # Universo completo + detalhes já conhecidos (sem rede), para persistir em fii_snapshots (formato expandido,
+    # o mesmo dos arquivos já gravados). Tickers cujos detalhes nunca foram buscados ficam com data nula (em vez de "N/A").
+    if universe is None or universe.empty: return universe
+    df = fii_compact.expand(order_columns(attach_details(universe, fetch_missing=False)))
+    with _DETAILS_LOCK: known = df['Papel'].isin(list(_DETAILS_BY_TICKER)).to_numpy()
+    return df.assign(**{'Data Último Relatório': df['Data Último Relatório'].where(known, None)})
+
+def order_columns(df_calc):
     # --- Reorganizar Colunas Finais (SEM ordenar por score aqui) ---
     logging.info("Reorganizando colunas...")
-    # <--- MODIFICADO: Adiciona 'Link Documentos FNET' à ordem das colunas
-    first_col=['Papel']; middle_cols_order=['Segmento','Tipo','Cotação','FFO Yield','Dividend Yield','P/VP','Valor de Mercado','Liquidez','Qtd de imóveis','Vacância Média','Osc. Dia','Osc. Mês','Osc. 12 Meses']; detail_cols=['Data Último Relatório','Link Download Relatório', 'Link Documentos FNET']; rank_cols=['Rank_PVP','Rank_DY','Rank_Liquidez','Rank_Vacancia']; last_cols=['URL Detalhes']
+    first_col=['Papel']; middle_cols_order=['Segmento','Tipo','Cotação','FFO Yield','Dividend Yield','P/VP','Valor de Mercado','Liquidez','Qtd de imóveis','Vacância Média','Osc. Dia','Osc. Mês','Osc. 12 Meses']; detail_cols=['Data Último Relatório','Link Download Relatório', 'Link Documentos FNET', 'ID Relatório', 'CNPJ FNET']; rank_cols=['Rank_PVP','Rank_DY','Rank_Liquidez','Rank_Vacancia']; last_cols=['URL Detalhes']
     middle_cols=[col for col in middle_cols_order if col in df_calc.columns]; detail_cols_present=[col for col in detail_cols if col in df_calc.columns]; existing_rank_cols=[col for col in rank_cols if col in df_calc.columns]
     final_ordered_cols = first_col + middle_cols + detail_cols_present + existing_rank_cols + last_cols
     final_ordered_cols = [col for col in final_ordered_cols if col in df_calc.columns] # Garante só existentes
-    final_df_output = df_calc[final_ordered_cols]
+    return df_calc[final_ordered_cols]
 
+# --- process_data: atalho compatível (resumo bruto -> filtros globais -> detalhes -> ranks) ---
+def process_data(df):
+    universe = prepare_universe(df)
+    if universe is None: return None
+    filtered_df = filter_and_rank(universe, MIN_PVP, MAX_PVP, MIN_DY, MAX_DY, MIN_LIQUIDEZ)
+    if filtered_df.empty: return filtered_df
+    logging.info("Buscando detalhes...")
+    final_df_output = order_columns(attach_details(filtered_df))
     logging.info(f"Processamento concluído. Retornando {len(final_df_output)} FIIs.")
     return final_df_output
 
 
 # --- Funções de Salvamento e Bloco __main__ ---
-# (Mantidos como na versão anterior, mas save_to_excel foi ajustado para renomear ranks)
+# (Mantidos como na versão anterior; save_to_excel renomeia ranks/score via fii_export)
 def save_to_excel(df, filename):
     if df is None or df.empty: logging.warning("DataFrame vazio, nada para salvar."); return
     logging.info(f"Salvando dados em '{filename}'...")
     try:
-        df_save = df.copy()
-        df_save.rename(columns={ 'Rank_PVP': 'Rank P/VP (Menor Melhor)', 'Rank_DY': 'Rank DY (Maior Melhor)', 'Rank_Liquidez': 'Rank Liquidez (Maior Melhor)', 'Rank_Vacancia': 'Rank Vacancia (Menor Melhor)' }, inplace=True, errors='ignore') # errors='ignore' se rank não existir
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            df_save.to_excel(writer, index=False, sheet_name='Ranking FIIs')
+        with fii_metrics.stage('exportacao'): fii_export.write_xlsx(fii_export.export_frame(df), filename) # Escrita em streaming (openpyxl write_only)
         logging.info(f"Arquivo Excel '{filename}' salvo.")
     except ImportError: logging.error("Biblioteca 'openpyxl' não encontrada.");
     except Exception as e: logging.error(f"Erro ao salvar Excel: {e}")
@@ -277,18 +317,21 @@ if __name__ == "__main__":
     logging.warning("AVISO: Rodando em modo standalone com filtros padrão.")
     raw_df = fetch_summary_data(URL_FII_LIST)
     if raw_df is not None:
-        processed_df = process_data(raw_df) # Usa filtros padrão globais
-        if processed_df is not None:
-            if not processed_df.empty:
+        universe = prepare_universe(raw_df) # Preparado uma vez: filtro/ranking e snapshot usam o mesmo universo
+        if universe is not None:
+            filtered_df = filter_and_rank(universe, MIN_PVP, MAX_PVP, MIN_DY, MAX_DY, MIN_LIQUIDEZ) # Usa filtros padrão globais
+            if not filtered_df.empty:
+                processed_df = order_columns(attach_details(filtered_df))
                 # Adiciona score simples e ordena para teste standalone
-                processed_df['Score_Exemplo'] = (10 * processed_df['Rank_DY'].fillna(len(processed_df)+1) + 7 * processed_df['Rank_PVP'].fillna(len(processed_df)+1)).astype('Int64')
-                processed_df.sort_values(by='Score_Exemplo', ascending=True, inplace=True, na_position='last')
+                processed_df = processed_df.assign(Score_Exemplo=(10 * processed_df['Rank_DY'].fillna(len(processed_df)+1) + 7 * processed_df['Rank_PVP'].fillna(len(processed_df)+1)).astype('Int64'))
+                processed_df = processed_df.sort_values(by='Score_Exemplo', ascending=True, na_position='last')
                 # Mostra as primeiras linhas com a nova coluna no console
                 print("\n--- Exemplo de Dados Processados (com Link FNET) ---")
-                print(processed_df[['Papel', 'Link Documentos FNET', 'Score_Exemplo']].head())
+                print(fii_compact.expand(processed_df)[['Papel', 'Link Documentos FNET', 'Score_Exemplo']].head())
                 print("----------------------------------------------------\n")
                 save_to_excel(processed_df, EXCEL_OUTPUT_FILENAME) # Salva Excel com ranks e score
             else: logging.warning("Nenhum FII atendeu aos critérios padrão.")
+            fii_snapshots.write_snapshot(snapshot_frame(universe)) # Histórico em Parquet (data=AAAA-MM-DD): universo inteiro, independe dos filtros
         else: logging.error("Erro no processamento dos dados.")
     else: logging.error("Não foi possível obter os dados de resumo.")
     logging.info("--- Script Finalizado ---")
\ No newline at end of file